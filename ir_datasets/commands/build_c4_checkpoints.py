@@ -7,76 +7,146 @@ import hashlib
 import json
 import pickle
 import argparse
+import contextlib
 import ir_datasets
 
 
 _logger = ir_datasets.log.easy()
 
 
+CHECKPOINT_FREQ = 1500
+
+# the sources file is re-written after this many files are finished (and at the end), so that an interrupted
+# build keeps most of its results
+SOURCES_WRITE_FREQ = 100
+
+
+class HashingReader:
+    # Reads a file, keeping the md5 and size of what was read (so that the file is only read once)
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.md5 = hashlib.md5()
+        self.size = 0
+
+    def read(self, size=-1):
+        result = self.file.read(size)
+        self.md5.update(result)
+        self.size += len(result)
+        return result
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
 def process(args):
+    # Returns (source_file, source, None), or (source_file, None, error) if the file could not be processed
+    source_file, output_file, show_progress = args
+    try:
+        return source_file, build_checkpoint(source_file, output_file, show_progress), None
+    except Exception as ex:
+        return source_file, None, repr(ex)
+
+
+def build_checkpoint(source_file, output_file, show_progress=False):
+    # A single pass over the file that builds the checkpoints and finds its line count, md5, and size. The
+    # checkpoints are not written if output_file is None.
     lz4 = ir_datasets.lazy_libs.lz4_frame()
-    source_file, output_file = args
     checkpoint_data = []
-    with ir_datasets.lazy_libs.zlib_state().GzipStateFile(str(source_file), keep_last_state=True) as f, _logger.pbar_raw(desc='building checkpoint') as pbar:
+    reader = HashingReader(source_file)
+    with ir_datasets.lazy_libs.zlib_state().GzipStateFile(reader, keep_last_state=True) as f, \
+         (_logger.pbar_raw(desc='building checkpoint') if show_progress else contextlib.nullcontext()) as pbar:
         idx = 0
         while not f.eof():
-            if idx % 1500 == 0:
+            if idx % CHECKPOINT_FREQ == 0:
                 state, pos = f.last_state, f.last_state_pos
                 offset = f.output_pos - f.last_state_output_pos
                 checkpoint_data.append((pos, state, offset))
-            f.readline()
+            if not f.readline():
+                break
             idx += 1
-            pbar.update(1)
-    with lz4.frame.LZ4FrameFile(output_file, mode='a', block_linked=True, compression_level=lz4.frame.COMPRESSIONLEVEL_MAX, auto_flush=True) as fout:
-        pickle.dump(checkpoint_data, fout)
-    return source_file
+            if pbar is not None:
+                pbar.update(1)
+        while reader.read(1024 * 1024): # anything after the end of the gzip stream
+            pass
+    if output_file is not None:
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        with ir_datasets.util.finialized_file(str(output_file), 'wb') as fout, \
+             lz4.frame.LZ4FrameFile(fout, mode='wb', block_linked=True, compression_level=lz4.frame.COMPRESSIONLEVEL_MAX, auto_flush=True) as fchk:
+            pickle.dump(checkpoint_data, fchk)
+    return {
+        "name": f"en.noclean.{source_file.name}",
+        "url": f"https://huggingface.co/datasets/allenai/c4/resolve/main/en.noclean/{source_file.name}",
+        "expected_md5": reader.md5.hexdigest().lower(),
+        "size_hint": reader.size,
+        "checkpoint_freq": CHECKPOINT_FREQ,
+        "doc_count": idx,
+    }
+
+
+def read_sources(path):
+    if not os.path.exists(path):
+        return {}
+    with gzip.open(path, 'rt') as f:
+        return {source['name']: source for source in json.load(f)}
+
+
+def write_sources(path, sources):
+    with ir_datasets.util.finialized_file(path, 'wb') as f, gzip.open(f, 'wt') as fout:
+        json.dump(sorted(sources.values(), key=lambda s: s['name']), fout)
 
 
 def main(args):
     parser = argparse.ArgumentParser(prog='ir_datasets build_c4_checkpoints', description='Buildes gzip checkpoint files for C4 documents.')
     parser.add_argument('source_dir')
     parser.add_argument('output_dir')
-    parser.add_argument('--skip_last', action='store_true')
-    parser.add_argument('--sources_file')
+    parser.add_argument('--skip_last', action='store_true', help='do not build checkpoints for the last file (it is still included in the sources file)')
+    parser.add_argument('--sources_file', help='also write the sources (line counts, md5s, and sizes) to this file (as SOURCES_FILE.gz), merged with the sources already in it')
+    parser.add_argument('--processes', default=1, type=int)
     args = parser.parse_args(args)
     source_dir = Path(args.source_dir)
     output_dir = Path(args.output_dir)
     all_source_files = source_dir.rglob('*.json.gz')
     all_source_files = sorted(all_source_files)
-    if args.sources_file:
-        sources = []
-        for file in _logger.pbar(all_source_files, desc='building sources file', unit='file'):
-            try:
-                count = 0
-                with gzip.open(file, 'rb') as f:
-                    for line in f:
-                        count += 1
-                h = hashlib.new('md5')
-                h.update(open(file, 'rb').read())
-                md5 = h.hexdigest().lower()
-                size = os.path.getsize(file)
-                sources.append({
-                    "name": f"en.noclean.{file.name}",
-                    "url": f"https://huggingface.co/datasets/allenai/c4/resolve/main/en.noclean/{file.name}",
-                    "expected_md5": md5,
-                    "size_hint": size,
-                    "checkpoint_freq": 1500,
-                    "doc_count": count,
-                })
-            except Exception as ex:
-                print(file, ex)
-        with gzip.open(args.sources_file + '.gz', 'wt') as f:
-            json.dump(sources, f)
     all_source_files = [f.relative_to(source_dir) for f in all_source_files]
-    if args.skip_last:
-        all_source_files = all_source_files[:-1]
-    process_args = [(source_dir/f, output_dir/f'{f}.chk.pkl.lz4') for f in all_source_files]
-    process_args = [a for a in process_args if not a[1].exists()]
+    sources_path = args.sources_file + '.gz' if args.sources_file else None
+    sources = read_sources(sources_path) if sources_path else {}
+    process_args = [(source_dir/f, output_dir/f'{f}.chk.pkl.lz4', args.processes == 1) for f in all_source_files]
+    if args.skip_last and process_args:
+        # the last file gets no checkpoints, but (like the others) is still in the sources file
+        source_file, _, show_progress = process_args.pop()
+        if sources_path and f'en.noclean.{source_file.name}' not in sources:
+            process_args.append((source_file, None, show_progress))
+    # files are (re-)processed if they are missing a checkpoint file or (when writing sources) a source
+    process_args = [a for a in process_args if a[1] is None or not a[1].exists() or (sources_path and f'en.noclean.{a[0].name}' not in sources)]
+    errors = 0
     with _logger.pbar_raw(total=len(process_args), unit='file') as pbar:
-        for src in map(process, process_args):
-            pbar.update(1)
-            pbar.set_postfix(file=str(src)[-20:])
-
+        if args.processes == 1:
+            results = map(process, process_args)
+        else:
+            pool = multiprocessing.Pool(args.processes)
+            results = pool.imap_unordered(process, process_args)
+        try:
+            for i, (src, source, error) in enumerate(results):
+                if error is not None:
+                    errors += 1
+                    _logger.warn(f'{src}: {error}')
+                else:
+                    sources[source['name']] = source
+                if sources_path and (i + 1) % SOURCES_WRITE_FREQ == 0:
+                    write_sources(sources_path, sources)
+                pbar.update(1)
+                pbar.set_postfix(file=str(src)[-20:])
+        finally:
+            if args.processes != 1:
+                pool.terminate()
+            if sources_path:
+                write_sources(sources_path, sources)
+    if errors:
+        _logger.error(f'{errors} file(s) failed; run the command again to retry them')
+        sys.exit(1)
 
 if __name__ == '__main__':
     main(sys.argv[1:])
@@ -1,4 +1,7 @@
+import os
 import sys
+import json
+import time
 import multiprocessing
 from pathlib import Path
 import argparse
@@ -8,13 +11,62 @@ import ir_datasets
 _logger = ir_datasets.log.easy()
 
 
+# per-file results are appended to this file in output_dir as each file finishes, so that an interrupted build can
+# be resumed without losing the stats (and record counts) of the files that were already indexed
+STATS_FILE = 'build_stats.jsonl'
+
+
 def process(args):
-    source_file, output_file, cw09 = args
+    source_file, output_file, rel_file, cw09, verify = args
     index = ir_datasets.indices.ClueWebWarcIndex(str(source_file), str(output_file), warc_cw09=cw09)
     output_file.parent.mkdir(parents=True, exist_ok=True)
-    if not index.built():
-        index.build()
-    return source_file
+    start = time.perf_counter()
+    try:
+        count = index.build()
+        seconds = time.perf_counter() - start
+        failures = index.verify(sample=verify) if verify > 0 else []
+    except Exception as ex:
+        if output_file.exists():
+            output_file.unlink()
+        return {'file': rel_file, 'error': repr(ex)}
+    if failures:
+        output_file.unlink() # re-built on the next run
+        doc_id, error = failures[0]
+        return {'file': rel_file, 'error': f'{len(failures)} checkpoint(s) failed verification (e.g., {doc_id}: {error})'}
+    size = os.path.getsize(source_file)
+    return {'file': rel_file, 'docs': count, 'bytes': size, 'seconds': round(seconds, 3), 'docs_per_sec': round(count / seconds, 1), 'mb_per_sec': round(size / seconds / 1024 / 1024, 2), 'verified': verify}
+
+
+def read_stats(path):
+    stats = {}
+    if path.exists():
+        with path.open('rt') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    stats[record['file']] = record # later records replace earlier ones
+    return stats
+
+
+def write_record_counts(counts_dir, all_source_files, stats, cw09=False):
+    # Writes the record counts in the layout read by _docs_warc_file_counts: one <top_dir>_counts.txt file per
+    # top-level directory, with a "<prefix><path> <count>" line per source file. The prefix is stripped when read:
+    # ClueWeb12's recordcounts directory uses "./", and ClueWeb09's record_counts directory uses "../".
+    prefix = '../' if cw09 else './'
+    by_dir = {}
+    missing = 0
+    for f in all_source_files:
+        record = stats.get(str(f))
+        if record is None or 'docs' not in record:
+            missing += 1
+            continue
+        by_dir.setdefault(f.parts[0], []).append(f'{prefix}{Path(*f.parts[1:]).as_posix()} {record["docs"]}\n')
+    counts_dir.mkdir(parents=True, exist_ok=True)
+    for top_dir, lines in by_dir.items():
+        with ir_datasets.util.finialized_file(str(counts_dir/f'{top_dir}_counts.txt'), 'wt') as fout:
+            fout.writelines(lines)
+    if missing:
+        _logger.warn(f'no record counts for {missing} file(s) (not built yet, failed, or built without {STATS_FILE})')
 
 
 def main(args):
@@ -23,23 +75,49 @@ def main(args):
     parser.add_argument('output_dir')
     parser.add_argument('--processes', default=1, type=int)
     parser.add_argument('--cw09', action='store_true')
+    parser.add_argument('--verify', default=8, type=int, help='number of checkpoints of each file to check by seeking to them (0 to skip)')
+    parser.add_argument('--counts_dir', help='directory to write the record counts to (default: output_dir/recordcounts, or output_dir/record_counts with --cw09)')
     args = parser.parse_args(args)
     source_dir = Path(args.source_dir)
     output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
     all_source_files = [f.relative_to(source_dir) for f in source_dir.rglob('*.warc.gz')]
     all_source_files = sorted(all_source_files)
-    process_args = [(source_dir/f, output_dir/f'{f}.chk.lz4', args.cw09) for f in all_source_files]
+    process_args = [(source_dir/f, output_dir/f'{f}.chk.lz4', str(f), args.cw09, args.verify) for f in all_source_files]
     process_args = [a for a in process_args if not a[1].exists()]
-    with _logger.pbar_raw(total=len(process_args), unit='file') as pbar:
+    stats_path = output_dir/STATS_FILE
+    stats = read_stats(stats_path)
+    errors = 0
+    start = time.perf_counter()
+    with _logger.pbar_raw(total=len(process_args), unit='file') as pbar, stats_path.open('at') as f_stats:
         if args.processes == 1:
-            for src in map(process, process_args):
-                pbar.update(1)
-                pbar.set_postfix(file=str(src))
+            results = map(process, process_args)
         else:
-            with multiprocessing.Pool(args.processes) as pool:
-                for src in pool.imap_unordered(process, process_args):
-                    pbar.update(1)
-                    pbar.set_postfix(file=src.relative_to(source_dir))
+            pool = multiprocessing.Pool(args.processes)
+            results = pool.imap_unordered(process, process_args)
+        try:
+            for result in results:
+                f_stats.write(json.dumps(result) + '\n')
+                f_stats.flush()
+                stats[result['file']] = result
+                if 'error' in result:
+                    errors += 1
+                    _logger.warn(f'{result["file"]}: {result["error"]}')
+                pbar.update(1)
+                pbar.set_postfix(file=result['file'])
+        finally:
+            if args.processes != 1:
+                pool.terminate()
+    built = [stats[a[2]] for a in process_args if 'error' not in stats[a[2]]]
+    if built:
+        docs, size = sum(r['docs'] for r in built), sum(r['bytes'] for r in built)
+        elapsed = time.perf_counter() - start
+        _logger.info(f'indexed {len(built)} file(s) in {elapsed:.1f}s: {docs} docs ({docs / elapsed:.0f}/s), {size / 1024 / 1024:.1f}MB ({size / elapsed / 1024 / 1024:.2f}MB/s); per-file stats in {stats_path}')
+    counts_dir = Path(args.counts_dir) if args.counts_dir else output_dir/('record_counts' if args.cw09 else 'recordcounts')
+    write_record_counts(counts_dir, all_source_files, stats, cw09=args.cw09)
+    if errors:
+        _logger.error(f'{errors} file(s) failed; run the command again to retry them')
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -86,14 +86,14 @@ def main(args):
     args = parser.parse_args(args)
     try:
         if args.datasets:
-            top_level_datasets = {d for d in ir_datasets.registry._registered if '/' not in d}
+            top_level_datasets = {d for d in ir_datasets.registry if '/' not in d}
             for dataset in args.datasets:
                 if dataset not in top_level_datasets:
                     print(f'Skipping unknown dataset {dataset}')
                 else:
                     clean(dataset, args.yes, list=args.list, human=args.H)
         elif args.list:
-            for dataset in ir_datasets.registry._registered:
+            for dataset in list(ir_datasets.registry):
                 if '/' not in dataset:
                     clean(dataset, list=True, human=args.H)
         else:
@@ -11,6 +11,7 @@ def main_docs(dataset, args):
     assert hasattr(dataset, 'docs_handler'), f"{args.dataset} does not provide docs"
     exporter = DEFAULT_EXPORTERS[args.format]
     exporter = exporter(dataset.docs_cls(), args.out, args.fields)
+    set_columnar_args(exporter, args)
     for doc in dataset.docs_iter():
         exporter.next(doc)
     exporter.flush()
@@ -20,6 +21,7 @@ def main_queries(dataset, args):
     assert hasattr(dataset, 'queries_handler'), f"{args.dataset} does not provide queries"
     exporter = DEFAULT_EXPORTERS[args.format]
     exporter = exporter(dataset.queries_cls(), args.out, args.fields)
+    set_columnar_args(exporter, args)
     for query in dataset.queries_iter():
         exporter.next(query)
     exporter.flush()
@@ -29,6 +31,7 @@ def main_qrels(dataset, args):
     assert hasattr(dataset, 'qrels_handler'), f"{args.dataset} does not provide qrels"
     exporter = QRELS_EXPORTERS[args.format]
     exporter = exporter(dataset.qrels_cls(), args.out, args.fields)
+    set_columnar_args(exporter, args)
     for qrel in dataset.qrels_iter():
         exporter.next(qrel)
     exporter.flush()
@@ -38,6 +41,7 @@ def main_scoreddocs(dataset, args):
     assert hasattr(dataset, 'scoreddocs_handler'), f"{args.dataset} does not provide scoreddocs"
     exporter = SCOREDDOCS_EXPORTERS[args.format]
     exporter = exporter(dataset.scoreddocs_cls(), args.out, args.fields)
+    set_columnar_args(exporter, args)
     if hasattr(exporter, 'runtag'):
         exporter.runtag = args.runtag
     for scoreddoc in dataset.scoreddocs_iter():
@@ -49,6 +53,7 @@ def main_docpairs(dataset, args):
     assert hasattr(dataset, 'docpairs_handler'), f"{args.dataset} does not provide docpairs"
     exporter = DEFAULT_EXPORTERS[args.format]
     exporter = exporter(dataset.docpairs_cls(), args.out, args.fields)
+    set_columnar_args(exporter, args)
     for query in dataset.docpairs_iter():
         exporter.next(query)
     exporter.flush()
@@ -134,6 +139,59 @@ class JsonlExporter:
     def flush(self):
         pass
 
+class ParquetExporter:
+    # Writes records in batches of typed columns (one row group per batch)
+    def __init__(self, data_cls, out, fields=None):
+        self.data_cls = data_cls
+        self.out = getattr(out, 'buffer', out) # binary output
+        if fields is None and len(data_cls._fields) > 2:
+            _logger.info(f'No fields supplied. Using all fields: {data_cls._fields}')
+        self.schema, self.fields = ir_datasets.indices.arrow_docstore.arrow_schema(data_cls, fields)
+        self.idxs = [data_cls._fields.index(field) for field in self.fields]
+        self.columns = [[] for _ in self.idxs]
+        self.row_group_size = 10_000
+        self.compression = 'snappy'
+        self.writer = None
+
+    def next(self, record):
+        for column, idx in zip(self.columns, self.idxs):
+            column.append(record[idx])
+        if len(self.columns[0]) >= self.row_group_size:
+            self.write_batch()
+
+    def write_batch(self):
+        pa = ir_datasets.lazy_libs.pyarrow()
+        if self.writer is None:
+            self.writer = self.open_writer()
+        batch = pa.record_batch([pa.array(column, type=field.type) for column, field in zip(self.columns, self.schema)], schema=self.schema)
+        self.writer.write_batch(batch)
+        self.columns = [[] for _ in self.idxs]
+
+    def open_writer(self):
+        return ir_datasets.lazy_libs.pyarrow_parquet().ParquetWriter(self.out, self.schema, compression=self.compression)
+
+    def flush(self):
+        if self.columns[0] or self.writer is None:
+            self.write_batch()
+        self.writer.close()
+        self.writer = None
+
+
+class ArrowExporter(ParquetExporter):
+    # Writes records in the Arrow IPC file format (one record batch per batch of records)
+    def open_writer(self):
+        pa = ir_datasets.lazy_libs.pyarrow()
+        compression = self.compression if self.compression in ('lz4', 'zstd') else None
+        return pa.ipc.new_file(self.out, self.schema, options=pa.ipc.IpcWriteOptions(compression=compression))
+
+
+def set_columnar_args(exporter, args):
+    if hasattr(exporter, 'row_group_size'):
+        exporter.row_group_size = args.row_group_size
+        if args.compression is not None:
+            exporter.compression = args.compression
+
+
 def is_tuple_elip(annotation):
     if hasattr(annotation, '_name') and annotation._name == 'Tuple' and len(annotation.__args__) == 2 and annotation.__args__[1] is Ellipsis:
         if annotation.__args__[0] in (str, int, float) or (hasattr(annotation.__args__[0], '_fields') and all(f in (str, int, float) for f in annotation.__args__[0].__annotations__.values())):
@@ -192,6 +250,8 @@ class TrecRunExporter:
 DEFAULT_EXPORTERS = {
     'tsv': TsvExporter,
     'jsonl': JsonlExporter,
+    'parquet': ParquetExporter,
+    'arrow': ArrowExporter,
 }
 
 QRELS_EXPORTERS = {**DEFAULT_EXPORTERS, 'trec': TrecQrelsExporter}
@@ -231,6 +291,10 @@ def main(args):
     subparser.add_argument('--fields', nargs='+')
     subparser.set_defaults(fn=main_docpairs)
 
+    for subparser in subparsers.choices.values():
+        subparser.add_argument('--row_group_size', type=int, default=10_000, help='number of records per row group/record batch (parquet and arrow formats)')
+        subparser.add_argument('--compression', help='compression codec (parquet and arrow formats; default: snappy for parquet, none for arrow)')
+
     args = parser.parse_args(args)
     dataset = ir_datasets.load(args.dataset)
     try:
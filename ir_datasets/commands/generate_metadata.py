@@ -69,7 +69,7 @@ def main(args):
                     data[dsid] = dataset_metadata
         write_metadata_file(data, args.file)
     else:
-        for dsid in ir_datasets.registry._registered:
+        for dsid in list(ir_datasets.registry):
             dataset = ir_datasets.load(dsid)
             brk = False
             try:
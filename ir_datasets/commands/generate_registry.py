@@ -0,0 +1,32 @@
+import sys
+import json
+import argparse
+from pathlib import Path
+import ir_datasets
+
+
+_logger = ir_datasets.log.easy()
+
+
+def write_registry_file(data, file):
+    with file.open('wt') as f:
+        # one dataset ID prefix per line
+        f.write('{\n')
+        for i, key in enumerate(sorted(data.keys())):
+            if i != 0:
+                f.write(',\n')
+            f.write(f'  "{key}": {json.dumps(data[key])}')
+        f.write('\n}\n')
+
+
+def main(args):
+    parser = argparse.ArgumentParser(prog='ir_datasets generate_registry', description='Generates the manifest of dataset ID prefixes to dataset modules, which is used to import dataset modules lazily')
+    parser.add_argument('--file', help='output file', type=Path, default=Path('ir_datasets/etc/registry.json'))
+    args = parser.parse_args(args)
+    data = ir_datasets.datasets.build_manifest()
+    write_registry_file(data, args.file)
+    _logger.info(f'wrote {len(data)} prefixes to {args.file}')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
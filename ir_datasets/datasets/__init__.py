@@ -1,60 +1,136 @@
+import sys
+import json
+import pkgutil
+import importlib
+import ir_datasets
 from . import base
-from . import antique
-from . import aol_ia
-from . import aquaint
-from . import argsme
-from . import beir
-from . import c4
-from . import car
-from . import clinicaltrials
-from . import clirmatrix
-from . import clueweb09
-from . import clueweb12
-from . import codec
-from . import cord19
-from . import cranfield
-from . import csl
-from . import disks45
-from . import dpr_w100
-from . import codesearchnet
-from . import gov
-from . import gov2
-from . import highwire
-from . import istella22
-from . import kilt
-from . import lotte
-from . import medline
-from . import miracl
-from . import mmarco
-from . import mr_tydi
-from . import msmarco_document
-from . import msmarco_document_v2
-from . import msmarco_passage
-from . import msmarco_passage_v2
-from . import msmarco_qna
-from . import nano_beir
-from . import neumarco
-from . import nfcorpus
-from . import natural_questions
-from . import nyt
-from . import pmc
-from . import touche_image
-from . import touche  # must be after argsme,clueweb12,touche_image
-from . import trec_arabic
-from . import trec_mandarin
-from . import trec_spanish
-from . import trec_robust04
-from . import trec_tot
-from . import tripclick
-from . import tweets2013_ia
-from . import vaswani
-from . import wapo
-from . import wikiclir
-from . import wikir
-from . import trec_fair
-from . import trec_cast # must be after wapo,car,msmarco_passage
-from . import hc4
-from . import neuclir # must be after hc4
-from . import sara
-from . import trec_tot_2025
 
+
+# Dataset modules are imported lazily: the prefix of a dataset ID (the part before the first /) is
+# looked up in etc/registry.json to find the modules that register datasets under it. Iterating over
+# the registry (or looking up an ID that's not in the manifest) imports all of them, in this order.
+MODULES = [
+    'antique',
+    'aol_ia',
+    'aquaint',
+    'argsme',
+    'beir',
+    'c4',
+    'car',
+    'clinicaltrials',
+    'clirmatrix',
+    'clueweb09',
+    'clueweb12',
+    'codec',
+    'cord19',
+    'cranfield',
+    'csl',
+    'disks45',
+    'dpr_w100',
+    'codesearchnet',
+    'gov',
+    'gov2',
+    'highwire',
+    'istella22',
+    'kilt',
+    'lotte',
+    'medline',
+    'miracl',
+    'mmarco',
+    'mr_tydi',
+    'msmarco_document',
+    'msmarco_document_v2',
+    'msmarco_passage',
+    'msmarco_passage_v2',
+    'msmarco_qna',
+    'nano_beir',
+    'neumarco',
+    'nfcorpus',
+    'natural_questions',
+    'nyt',
+    'pmc',
+    'touche_image',
+    'touche', # must be after argsme,clueweb12,touche_image
+    'trec_arabic',
+    'trec_mandarin',
+    'trec_spanish',
+    'trec_robust04',
+    'trec_tot',
+    'tripclick',
+    'tweets2013_ia',
+    'vaswani',
+    'wapo',
+    'wikiclir',
+    'wikir',
+    'trec_fair',
+    'trec_cast', # must be after wapo,car,msmarco_passage
+    'hc4',
+    'neuclir', # must be after hc4
+    'sara',
+    'trec_tot_2025',
+]
+MANIFEST_FILE = 'etc/registry.json'
+
+
+def _import(module):
+    return importlib.import_module(f'{__name__}.{module}')
+
+
+def load_all():
+    for module in MODULES:
+        _import(module)
+
+
+def _registering_module():
+    # finds the dataset module that's currently registering something
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module.startswith(f'{__name__}.') and module != base.__name__:
+            return module[len(__name__)+1:]
+        frame = frame.f_back
+    return None
+
+
+def build_manifest():
+    """
+    Imports all dataset modules and returns the mapping of each dataset ID prefix to the names of the
+    modules that register datasets under it (i.e., the content of etc/registry.json).
+    """
+    registry = ir_datasets.registry
+    manifest = {}
+    def add(name):
+        module = _registering_module()
+        if module is not None:
+            manifest.setdefault(name.lstrip('^').split('/')[0], set()).add(module)
+    register, register_pattern = registry.register, registry.register_pattern
+    def tracked_register(name, obj):
+        add(name)
+        register(name, obj)
+    def tracked_register_pattern(pattern, initializer):
+        add(pattern)
+        register_pattern(pattern, initializer)
+    registry.register, registry.register_pattern = tracked_register, tracked_register_pattern
+    try:
+        load_all()
+    finally:
+        del registry.register, registry.register_pattern
+    return {prefix: [m for m in MODULES if m in modules] for prefix, modules in sorted(manifest.items())} # in import order
+
+
+def _register_lazy():
+    manifest = json.loads(pkgutil.get_data('ir_datasets', MANIFEST_FILE))
+    for prefix, modules in manifest.items():
+        for module in modules:
+            ir_datasets.registry.register_lazy(prefix, lambda module=module: _import(module))
+    ir_datasets.registry.register_lazy_fallback(load_all)
+
+
+def __getattr__(attr):
+    # dataset modules are also available as attributes (e.g., ir_datasets.datasets.vaswani)
+    if attr in MODULES:
+        return _import(attr)
+    raise AttributeError(attr)
+
+
+_register_lazy()
@@ -1,5 +1,4 @@
 from datetime import datetime
-import json
 import pickle
 import re
 import contextlib
@@ -126,7 +125,7 @@ python downloader.py
                 docs = []
                 with LZ4FrameFile(file, 'rb') as fin:
                     for line in fin:
-                        doc = json.loads(line)
+                        doc = ir_datasets.lazy_libs.json_backend().loads(line)
                         docs.append(AolIaDoc(doc['doc_id'], doc['title'], doc['text'], doc['url'], doc['wb_url']))
                         pbar.update()
                 for doc in sorted(docs, key=lambda x: x.doc_id): # sort the documents in each file before adding them to the docstore. This ensures a consistent ordering.
@@ -1,5 +1,8 @@
 import pkgutil
 import contextlib
+import functools
+import inspect
+import dataclasses
 import itertools
 from pathlib import Path
 import ir_datasets
@@ -47,6 +50,8 @@ class Dataset:
             return self._beta_apis['qlogs']
         for cons in self._constituents:
             if hasattr(cons, attr):
+                if attr == 'docs_store':
+                    return _memory_cached_docs_store(getattr(cons, attr))
                 return getattr(cons, attr)
         raise AttributeError(attr)
 
@@ -98,6 +103,29 @@ class Dataset:
         return self.has(ir_datasets.EntityType.qlogs)
 
 
+def _memory_cached_docs_store(docs_store_fn):
+    # applies the in-process document cache (if enabled in the DocstoreOptions) to any docstore. The cached docstores
+    # are kept on the handler (keyed by the arguments), so that each docs_store() call shares the same cache.
+    @functools.wraps(docs_store_fn)
+    def wrapped(*args, **kwargs):
+        try:
+            bound = inspect.signature(docs_store_fn).bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+        except (TypeError, ValueError):
+            arguments = kwargs
+        options = arguments.get('options') or ir_datasets.indices.DEFAULT_DOCSTORE_OPTIONS
+        handler = getattr(docs_store_fn, '__self__', None)
+        if (not options.memory_cache_entries and not options.memory_cache_bytes) or handler is None:
+            return ir_datasets.indices.memory_cache(docs_store_fn(*args, **kwargs), options)
+        key = tuple((name, dataclasses.astuple(value) if name == 'options' else value) for name, value in arguments.items())
+        cache = handler.__dict__.setdefault('_memory_cached_docs_stores', {})
+        if key not in cache:
+            cache[key] = ir_datasets.indices.memory_cache(docs_store_fn(*args, **kwargs), options)
+        return cache[key]
+    return wrapped
+
+
 class _BetaPythonApiDocs:
     def __init__(self, handler):
         self._handler = handler
@@ -117,6 +145,12 @@ class _BetaPythonApiDocs:
     def __repr__(self):
         return f'BetaPythonApiDocs({repr(self._handler)})'
 
+    def shard(self, shard, num_shards):
+        return self._handler.docs_shard(shard, num_shards)
+
+    def parallel_iter(self, workers=None):
+        return self._handler.docs_parallel_iter(workers)
+
     def lookup(self, doc_ids):
         if self._docstore is None:
             self._docstore = self._handler.docs_store()
@@ -321,12 +355,12 @@ class FilteredQrels(BaseQrels):
 
     def qrels_iter(self):
         qids = self._lazy_qids()
-        operator = {
-            'include': (lambda x: x.query_id in qids),
-            'exclude': (lambda x: x.query_id not in qids),
-        }[self._mode]
+        if self._mode == 'include':
+            # qrels_for can select the queries' qrels directly if the handler is compiled (e.g., TrecQrels)
+            yield from self._qrels_handler.qrels_for(qids)
+            return
         for query in self._qrels_handler.qrels_iter():
-            if operator(query):
+            if query.query_id not in qids:
                 yield query
 
     def qrels_defs(self):
@@ -344,12 +378,12 @@ class FilteredScoredDocs(BaseScoredDocs):
 
     def scoreddocs_iter(self):
         qids = self._lazy_qids()
-        operator = {
-            'include': (lambda x: x.query_id in qids),
-            'exclude': (lambda x: x.query_id not in qids),
-        }[self._mode]
+        if self._mode == 'include':
+            # scoreddocs_for can select the queries' records directly if the handler is compiled (e.g., TrecScoredDocs)
+            yield from self._scoreddocs_handler.scoreddocs_for(qids)
+            return
         for query in self._scoreddocs_handler.scoreddocs_iter():
-            if operator(query):
+            if query.query_id not in qids:
                 yield query
 
     def scoreddocs_handler(self):
@@ -1,4 +1,3 @@
-import json
 import codecs
 from typing import NamedTuple, Dict, List
 import ir_datasets
@@ -173,7 +172,7 @@ class BeirDocs(BaseDocs):
     def _docs_iter(self):
         with self._dlc.stream() as stream:
             for line in stream:
-                data = json.loads(line)
+                data = ir_datasets.lazy_libs.json_backend().loads(line)
                 yield self._doc_type(*(_map_field(f, data) for f in self._doc_type._fields))
 
     def docs_cls(self):
@@ -211,7 +210,7 @@ class BeirQueries(BaseQueries):
     def queries_iter(self):
         with self._dlc.stream() as stream:
             for line in stream:
-                data = json.loads(line)
+                data = ir_datasets.lazy_libs.json_backend().loads(line)
                 yield self._query_type(*(_map_field(f, data) for f in self._query_type._fields))
 
     def queries_cls(self):
@@ -2,18 +2,25 @@ import re
 import os
 import json
 import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import NamedTuple, Tuple
 import ir_datasets
 from ir_datasets.util import DownloadConfig, Download, RequestsDownload, TarExtractAll, GzipExtract
 from ir_datasets.formats import BaseDocs, TrecXmlQueries, DocSourceSeekableIter, DocSource, SourceDocIter
 from ir_datasets.datasets.base import Dataset, YamlDocumentation
-from ir_datasets.indices import Docstore, DEFAULT_DOCSTORE_OPTIONS
+from ir_datasets.indices import Docstore, ZlibCheckpointTable, DEFAULT_DOCSTORE_OPTIONS
+from ir_datasets.indices.base import lookup_parallel, lookup_in_request_order
 
 _logger = ir_datasets.log.easy()
 
 NAME = 'c4'
 
+# maximum number of source files that C4Docstore keeps open between lookups
+HANDLE_POOL_SIZE = 64
+
 misinfo_map = {'number': 'query_id', 'query': 'text', 'description': 'description', 'narrative': 'narrative', 'disclaimer': 'disclaimer', 'stance': 'stance', 'evidence': 'evidence'}
 
 
@@ -62,10 +69,21 @@ class C4Source(DocSource):
         return C4SourceIter(self)
 
     def checkpoints(self):
+        # A ZlibCheckpointTable built from the pickled checkpoints on first use, so that later uses only read the
+        # checkpoints they need. (Or the pickled list, if the table cannot be written.)
         if self._checkpoints is None:
             chk_file_name = self.dlc.path().split('/')[-1] + '.chk.pkl.lz4'
-            with ir_datasets.lazy_libs.lz4_frame().frame.open(os.path.join(self.checkpoint_dlc.path(), chk_file_name)) as f:
-                self._checkpoints = pickle.load(f)
+            chk_path = os.path.join(self.checkpoint_dlc.path(), chk_file_name)
+            table = ZlibCheckpointTable(f'{chk_path}.table', chk_path)
+            if not table.built():
+                with ir_datasets.lazy_libs.lz4_frame().frame.open(chk_path) as f:
+                    checkpoints = pickle.load(f)
+                try:
+                    table.build(checkpoints)
+                except OSError as ex:
+                    _logger.warn(f'unable to build checkpoint table {table.path} ({ex!r}); using the pickled checkpoints instead')
+                    table = checkpoints
+            self._checkpoints = table
         return self._checkpoints
 
 
@@ -84,7 +102,7 @@ class C4SourceIter(DocSourceSeekableIter):
         line = self.source_f.readline()
         if not line:
             raise StopIteration()
-        data = json.loads(line)
+        data = ir_datasets.lazy_libs.json_backend().loads(line)
         doc_id = f'{self.source.name}.{self.idx}'
         self.idx += 1
         return C4Doc(doc_id, data['text'], data['url'], data['timestamp'])
@@ -102,7 +120,12 @@ class C4SourceIter(DocSourceSeekableIter):
             checkpoints = self.source.checkpoints()
             effective_checkpoint = min(target_checkpoint, len(checkpoints) - 1)
             pos, state, offset = checkpoints[effective_checkpoint]
-            self.source_f.zseek(pos, state)
+            if state is None:
+                # the start of the file
+                self.source_f.close()
+                self.source_f = ir_datasets.lazy_libs.zlib_state().GzipStateFile(self.source.dlc.path())
+            else:
+                self.source_f.zseek(pos, state)
             self.source_f.read(offset)
             self.idx = effective_checkpoint * self.source.checkpoint_freq
         while idx > self.idx:
@@ -112,33 +135,84 @@ class C4SourceIter(DocSourceSeekableIter):
 
 
 class C4Docstore(Docstore):
-    def __init__(self, docs, options=DEFAULT_DOCSTORE_OPTIONS):
+    def __init__(self, docs, options=DEFAULT_DOCSTORE_OPTIONS, handle_pool_size=HANDLE_POOL_SIZE):
         super().__init__(docs.docs_cls(), 'doc_id', options=options)
         self.docs = docs
+        self.handle_pool_size = handle_pool_size
+        self._sources = None
+        # open source iterators that are not in use, by source name (least recently used first)
+        self._handles = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
 
     def get_many_iter(self, doc_ids):
-        files_to_search = {}
+        doc_ids = list(dict.fromkeys(doc_ids)) # de-duplicated, in the order requested
+        if self._sources is None:
+            self._sources = {source.name: source for source in self.docs._docs_sources()}
+        files_to_search, doc_files = {}, {}
         for doc_id in doc_ids:
-            match = re.match(r'^en.noclean.c4-train.(\d+)-of-07168.(\d+)$', doc_id)
-            if not match:
-                continue
-            file_idx, doc_idx = match.groups()
-            file_idx, doc_idx = int(file_idx), int(doc_idx)
-            if file_idx not in files_to_search:
-                files_to_search[file_idx] = []
-            files_to_search[file_idx].append(doc_idx)
-        sources = self.docs._docs_sources()
-        for file_idx, doc_idxs in files_to_search.items():
-            if file_idx >= len(sources):
+            name, _, doc_idx = doc_id.rpartition('.')
+            if name not in self._sources or not doc_idx.isdigit():
                 continue
-            source = sources[file_idx]
-            doc_idxs = sorted(doc_idxs)
-            with iter(source) as it:
-                for doc_idx in doc_idxs:
-                    it.seek(doc_idx)
-                    res = next(it, StopIteration)
-                    if res is not StopIteration:
-                        yield res
+            if name not in files_to_search:
+                files_to_search[name] = []
+            files_to_search[name].append(int(doc_idx))
+            doc_files[doc_id] = name
+        workers = self._options.lookup_workers
+        if workers > 1 and len(files_to_search) > 1:
+            if self._executor is None:
+                with self._lock:
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(workers)
+            results = lookup_parallel(self._executor, self._fetch, files_to_search.items(), workers)
+            if self._options.lookup_preserve_order:
+                yield from lookup_in_request_order(results, doc_ids, doc_files, self._id_field_idx)
+            else:
+                for name, docs in results:
+                    yield from docs
+        else:
+            for name, doc_idxs in files_to_search.items():
+                yield from self._fetch(name, doc_idxs)[1]
+
+    def _fetch(self, name, doc_idxs):
+        # returns (name, docs) for the given documents of a source, using an open iterator from the pool if there is one
+        with self._lock:
+            it = self._handles.pop(name, None)
+        if it is None:
+            it = iter(self._sources[name])
+        docs = []
+        try:
+            for doc_idx in sorted(doc_idxs):
+                if doc_idx >= len(it.source):
+                    break
+                it.seek(doc_idx)
+                res = next(it, StopIteration)
+                if res is not StopIteration:
+                    docs.append(res)
+        except Exception:
+            it.close()
+            raise
+        self._release(name, it)
+        return name, docs
+
+    def _release(self, name, it):
+        # returns an iterator to the pool, closing the least recently used ones beyond handle_pool_size
+        to_close = []
+        with self._lock:
+            if name in self._handles:
+                to_close.append(it) # another lookup already returned one for this source
+            else:
+                self._handles[name] = it
+            while len(self._handles) > self.handle_pool_size:
+                to_close.append(self._handles.popitem(last=False)[1])
+        for it in to_close:
+            it.close()
+
+    def clear_cache(self):
+        with self._lock:
+            handles, self._handles = list(self._handles.values()), OrderedDict()
+        for it in handles:
+            it.close()
 
 
 class C4Docs(BaseDocs):
@@ -1,4 +1,3 @@
-import json
 import csv
 import gzip
 from typing import NamedTuple
@@ -57,7 +56,7 @@ class CodeSearchNetDocs(BaseDocs):
             for file in sorted(base_path.glob('**/*.gz')):
                 with gzip.open(file, 'rt') as f:
                     for line in f:
-                        data = json.loads(line)
+                        data = ir_datasets.lazy_libs.json_backend().loads(line)
                         yield CodeSearchNetDoc(
                             data['url'], # doc_id = url
                             data['repo'],
@@ -104,7 +103,7 @@ class CodeSearchNetQueries(BaseQueries):
             for file in sorted(base_path.glob(f'**/{self.split}/*.gz')):
                 with gzip.open(file, 'rt') as f:
                     for line in f:
-                        data = json.loads(line)
+                        data = ir_datasets.lazy_libs.json_backend().loads(line)
                         yield GenericQuery(
                             data['url'], # query_id = url
                             data['docstring'], # text = docstring
@@ -132,7 +131,7 @@ class CodeSearchNetQrels(BaseQrels):
             for file in sorted(base_path.glob(f'**/{self.split}/*.gz')):
                 with gzip.open(file, 'rt') as f:
                     for line in f:
-                        data = json.loads(line)
+                        data = ir_datasets.lazy_libs.json_backend().loads(line)
                         yield TrecQrel(
                             query_id=data['url'],
                             doc_id=data['url'],
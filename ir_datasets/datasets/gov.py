@@ -75,8 +75,8 @@ class GovDocs(BaseDocs):
     def docs_path(self, force=True):
         return self.docs_dlc.path(force)
 
-    def docs_iter(self):
-        return iter(self.docs_store())
+    def docs_iter(self, fields=None):
+        return self.docs_store().docs_iter(fields)
 
     def _docs_iter(self):
         dirs = sorted(Path(self.docs_dlc.path()).glob('G??'))
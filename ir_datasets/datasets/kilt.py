@@ -1,4 +1,3 @@
-import json
 import codecs
 from typing import NamedTuple, Tuple
 import ir_datasets
@@ -114,7 +113,7 @@ class KiltDocs(BaseDocs):
     def docs_kilt_raw_iter(self):
         with self._streamer.stream() as stream:
             for doc in stream:
-                yield json.loads(doc)
+                yield ir_datasets.lazy_libs.json_backend().loads(doc)
 
 
 def _init():
@@ -1,4 +1,3 @@
-import json
 import codecs
 from typing import NamedTuple, Dict, List
 import ir_datasets
@@ -25,7 +24,7 @@ class LotteQrels(BaseQrels):
     def qrels_iter(self):
         with self._qrels_dlc.stream() as f:
             for line in f:
-                data = json.loads(line)
+                data = ir_datasets.lazy_libs.json_backend().loads(line)
                 for did in data['answer_pids']:
                     yield TrecQrel(str(data['qid']), str(did), 1, "0")
 
@@ -1,4 +1,3 @@
-import json
 import codecs
 from typing import NamedTuple, Dict
 import ir_datasets
@@ -28,7 +27,7 @@ class MrTydiDocs(BaseDocs):
     def docs_iter(self):
         with self._dlc.stream() as stream:
             for line in stream:
-                data = json.loads(line)
+                data = ir_datasets.lazy_libs.json_backend().loads(line)
                 yield GenericDoc(data['id'], data['contents'])
 
     def docs_cls(self):
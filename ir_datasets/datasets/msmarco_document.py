@@ -1,5 +1,4 @@
 from typing import NamedTuple, List
-import json
 import ir_datasets
 from ir_datasets.indices import PickleLz4FullStore, DEFAULT_DOCSTORE_OPTIONS
 from ir_datasets.util import Cache, DownloadConfig, GzipExtract, Lazy, Migrator
@@ -85,7 +84,7 @@ class MsMarcoAnchorTextDocs(BaseDocs):
     def docs_iter(self):
         with self._dlc.stream() as stream:
             for line in stream:
-                data = json.loads(line)
+                data = ir_datasets.lazy_libs.json_backend().loads(line)
                 yield MsMarcoAnchorTextDocument(data['id'], ' '.join(data['anchors']), data['anchors'])
 
     def docs_cls(self):
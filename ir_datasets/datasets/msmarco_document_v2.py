@@ -2,7 +2,6 @@ import contextlib
 import gzip
 import io
 from pathlib import Path
-import json
 from typing import NamedTuple, Tuple, List
 import tarfile
 import ir_datasets
@@ -50,7 +49,7 @@ class MsMarcoV2Docs(BaseDocs):
                 file = tarf.extractfile(record)
                 with gzip.open(file) as file:
                     for line in file:
-                        data = json.loads(line)
+                        data = ir_datasets.lazy_libs.json_backend().loads(line)
                         yield MsMarcoV2Document(
                             data['docid'],
                             data['url'],
@@ -124,7 +123,7 @@ class MsMarcoV2AnchorTextDocs(BaseDocs):
     def docs_iter(self):
         with self._dlc.stream() as stream:
             for line in stream:
-                data = json.loads(line)
+                data = ir_datasets.lazy_libs.json_backend().loads(line)
                 yield MsMarcoV2AnchorTextDocument(data['id'], ' '.join(data['anchors']), data['anchors'])
 
     def docs_cls(self):
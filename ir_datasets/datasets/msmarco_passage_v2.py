@@ -36,7 +36,7 @@ class MsMarcoV2Passage(NamedTuple):
 
 
 def parse_msmarco_passage(line):
-    data = json.loads(line)
+    data = ir_datasets.lazy_libs.json_backend().loads(line)
     # extract spans in the format of "(123,456),(789,101123)"
     spans = tuple((int(a), int(b)) for a, b in re.findall(r'\((\d+),(\d+)\)', data['spans']))
     return MsMarcoV2Passage(
@@ -239,6 +239,9 @@ class MsMarcoV2PassageIter:
     def __del__(self):
         self.close()
 
+    def seekable(self):
+        return True
+
     def __getitem__(self, key):
         if isinstance(key, slice):
             # it[start:stop:step]
@@ -77,7 +77,7 @@ class NqManager:
                     f_queries, f_qrels, f_scoreddocs = dev_queries, dev_qrels, dev_scoreddocs
                 with ir_datasets.util.GzipExtract(self._dlcs[file_name]).stream() as stream:
                     for line in stream:
-                        data = json.loads(line)
+                        data = ir_datasets.lazy_libs.json_backend().loads(line)
                         qid = str(data['example_id'])
                         # docs
                         if data['document_url'] not in doc_url_to_id:
@@ -164,7 +164,7 @@ class NqQrels(BaseQrels):
     def qrels_iter(self):
         with self.dlc.stream() as stream:
             for line in stream:
-                data = json.loads(line)
+                data = ir_datasets.lazy_libs.json_backend().loads(line)
                 yield NqQrel(**data)
 
     def qrels_cls(self):
@@ -1,5 +1,4 @@
 import gzip
-import json
 from functools import lru_cache
 
 import ir_datasets
@@ -26,7 +25,7 @@ def get_ids(dlcs):
     ids = []
     for dlc in dlcs:
         with GzipExtract(dlc).stream() as f:
-            ids += [ json.loads(line)['id'] for line in f ]
+            ids += [ ir_datasets.lazy_libs.json_backend().loads(line)['id'] for line in f ]
     return set(ids)
 
 class FilteredExctractedCCDocs(ExctractedCCDocs):
@@ -332,7 +332,7 @@ class SegmentedDocs(BaseTransformedDocs):
         # Process files
         with self._segments_dl.stream() as fin, gzip.open(fin) as offsets_stream:
             for doc, data_json in zip(self._docs, offsets_stream):
-                data = json.loads(data_json)
+                data = ir_datasets.lazy_libs.json_backend().loads(data_json)
                 assert (
                     doc.doc_id == data["id"]
                 ), f"Error in processing offsets, docids differ: expected {data['id']} (offset), got {doc.doc_id} (document)"
@@ -1,4 +1,3 @@
-import json
 import codecs
 from typing import NamedTuple, Dict, List, Optional
 import ir_datasets
@@ -114,13 +113,13 @@ class FairTrecDocs(BaseDocs):
         def _metadata_iter():
             with self._mlc.stream() as stream2:
                 for metadata_line in stream2:
-                    yield json.loads(metadata_line)
+                    yield ir_datasets.lazy_libs.json_backend().loads(metadata_line)
         textifier =  ir_datasets.lazy_libs.pyautocorpus().Textifier()
         metadata_iter = _metadata_iter()
         next_metadata = None
         with self._dlc.stream() as stream1:
             for line in stream1:
-                data1 = json.loads(line)
+                data1 = ir_datasets.lazy_libs.json_backend().loads(line)
                 if next_metadata is None:
                     next_metadata = next(metadata_iter, None)
                 if next_metadata is not None:
@@ -179,7 +178,7 @@ class FairTrecQueries(BaseQueries):
     def queries_iter(self):
         with self._dlc.stream() as stream:
             for line in stream:
-                data = json.loads(line)
+                data = ir_datasets.lazy_libs.json_backend().loads(line)
                 if self._qtype is FairTrecEvalQuery:
                     yield FairTrecEvalQuery(str(data['id']), data['title'], data["keywords"], data["scope"])
                 elif self._qtype is FairTrecQuery:
@@ -203,7 +202,7 @@ class FairTrecQrels(BaseQrels):
     def qrels_iter(self):
         with self._qrels_dlc.stream() as stream:
             for line in stream:
-                data = json.loads(line)
+                data = ir_datasets.lazy_libs.json_backend().loads(line)
                 for rlDoc in data["rel_docs"]:
                     yield TrecQrel(str(data["id"]), str(rlDoc), 1, "0")
 
@@ -230,11 +229,11 @@ class JsonlDocs(BaseDocs):
         metadata = {}
         with self._metadata_dlc.stream() as stream:
             for line in _logger.pbar(stream, desc='pre-loading metadata', total=6460238):
-                doc = json.loads(line)
+                doc = ir_datasets.lazy_libs.json_backend().loads(line)
                 metadata[doc['page_id']] = doc
         with self._dlc.stream() as stream:
             for line in stream:
-                doc = json.loads(line)
+                doc = ir_datasets.lazy_libs.json_backend().loads(line)
                 if doc['id'] in metadata:
                     doc.update(metadata[doc['id']])
                 yield self._doc_type(**{dest: self._doc_type.__annotations__[dest](doc.get(src)) if 'typing' not in str(self._doc_type.__annotations__[dest]) else doc.get(src) for dest, src in self._field_map.items()})
@@ -8,7 +8,7 @@ from ir_datasets.formats import BaseDocs, TrecQrels, JsonlQueries
 from ir_datasets.indices import PickleLz4FullStore, DEFAULT_DOCSTORE_OPTIONS
 import os
 import gzip
-import json
+import ir_datasets
 from tqdm import tqdm
 from typing import NamedTuple
 
@@ -46,7 +46,7 @@ class JsonlWithOffsetsDocsStore(Docstore):
     def offsets_iter(self):
         with gzip.open(self.__offsets.path(), "rt") as f:
             for i in f:
-                i = json.loads(i)
+                i = ir_datasets.lazy_libs.json_backend().loads(i)
                 yield JsonlDocumentOffset(doc_id=i["id"], offset_start=i["offset_start"], offset_end=i["offset_end"])
 
     def docs_dict(self):
@@ -73,7 +73,7 @@ class JsonlWithOffsetsDocsStore(Docstore):
 class TrecToT2025DocsStore(JsonlWithOffsetsDocsStore):
     def get_many_iter(self, doc_ids):
         for i in super().get_many_iter(doc_ids):
-            yield TrecToT2025Doc._from_json(json.loads(i))
+            yield TrecToT2025Doc._from_json(ir_datasets.lazy_libs.json_backend().loads(i))
 
 
 class JsonlDocumentsWithOffsets(BaseDocs):
@@ -84,7 +84,7 @@ class JsonlDocumentsWithOffsets(BaseDocs):
     def docs_iter(self):
         with gzip.open(self.__docs.path()) as f:
             for l in f:
-                yield TrecToT2025Doc._from_json(json.loads(l))
+                yield TrecToT2025Doc._from_json(ir_datasets.lazy_libs.json_backend().loads(l))
 
     def docs_cls(self):
         return TrecToT2025Doc
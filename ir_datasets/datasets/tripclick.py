@@ -1,5 +1,4 @@
 from pathlib import Path
-import json
 import re
 import os
 import io
@@ -124,7 +123,7 @@ class TripClickQlogs(BaseQlogs):
         for file in sorted(Path(self.dlc.path()).glob('logs/*.json')):
             with file.open('rt') as fin:
                 for line in fin:
-                    record = json.loads(line)
+                    record = ir_datasets.lazy_libs.json_backend().loads(line)
                     time = re.match(r'^/Date\(([0-9]+)\)/$', record['DateCreated']).group(1)
                     query_norm = re.sub(r'\b(AND|OR)\b', ' ', record['Keywords']).replace('title:', ' ')
                     query_norm = ' '.join(ir_datasets.util.ws_tok(query_norm))
@@ -266,12 +266,12 @@ class TweetsDocstore(Docstore):
                         break # bummer, can't find a doc_id...
                     if len(line) < 64: # checkpoints lines can be at most ~60 characters. Tweets lines always be longer than this.
                         # It's a checkpoint line! Are we looking for anything in this range?
-                        rng = json.loads(line)
+                        rng = ir_datasets.lazy_libs.json_backend().loads(line)
                         start, end = rng['start'], rng['end']
                         block_docids = set(d for d in doc_ids if start <= d <= end)
                     elif block_docids:
                         # Is this record a tweet we're looking for?
-                        data = json.loads(line)
+                        data = ir_datasets.lazy_libs.json_backend().loads(line)
                         if data['id'] in block_docids:
                             yield self.tweets_docs._docs_source_to_doc(line, data)
                             block_docids.discard(data['id'])
@@ -335,7 +335,7 @@ class Tweets2013IaDocs(BaseDocs):
                         # Loop through the tweets in each file
                         with bz2.open(tarf.extractfile(record)) as f:
                             for line in f:
-                                data = json.loads(line)
+                                data = ir_datasets.lazy_libs.json_backend().loads(line)
                                 if 'id' not in data:
                                     continue # e.g., "delete" records
                                 out_file = self._id2file(data['id'])
@@ -398,7 +398,7 @@ class Tweets2013IaDocs(BaseDocs):
         lz4 = ir_datasets.lazy_libs.lz4_frame()
         with lz4.frame.LZ4FrameFile(Path(self._docs_base_path) / source_file) as fin:
             for line in fin:
-                data = json.loads(line)
+                data = ir_datasets.lazy_libs.json_backend().loads(line)
                 if 'id' in data:
                     yield self._docs_source_to_doc(line, data)
 
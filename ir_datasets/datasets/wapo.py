@@ -1,5 +1,4 @@
 import io
-import json
 import tarfile
 from typing import NamedTuple, Tuple, Optional
 import ir_datasets
@@ -134,7 +133,7 @@ class WapoDocs(BaseDocs):
                         continue
                     file = tarf.extractfile(member)
                     for line in file:
-                        doc_json = json.loads(line)
+                        doc_json = ir_datasets.lazy_libs.json_backend().loads(line)
                         yield doc_json
 
     def docs_store(self, field='doc_id', options=DEFAULT_DOCSTORE_OPTIONS):
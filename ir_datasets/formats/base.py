@@ -1,7 +1,9 @@
 import hashlib
 import json
 import types
+import pickle
 import itertools
+import multiprocessing
 from typing import NamedTuple
 import ir_datasets
 
@@ -198,6 +200,32 @@ def qrels_dict(qrels_handler):
 BaseQrels.EXTENSIONS['qrels_dict'] = qrels_dict
 
 
+def qrels_for(qrels_handler, query_ids):
+    """
+    Iterates over the qrels of the given query ID(s), in their usual order.
+    """
+    if isinstance(query_ids, str):
+        query_ids = (query_ids,)
+    query_ids = set(query_ids)
+    for qrel in qrels_handler.qrels_iter():
+        if qrel.query_id in query_ids:
+            yield qrel
+BaseQrels.EXTENSIONS['qrels_for'] = qrels_for
+
+
+def scoreddocs_for(scoreddocs_handler, query_ids):
+    """
+    Iterates over the scored documents of the given query ID(s), in their usual order.
+    """
+    if isinstance(query_ids, str):
+        query_ids = (query_ids,)
+    query_ids = set(query_ids)
+    for scoreddoc in scoreddocs_handler.scoreddocs_iter():
+        if scoreddoc.query_id in query_ids:
+            yield scoreddoc
+BaseScoredDocs.EXTENSIONS['scoreddocs_for'] = scoreddocs_for
+
+
 def hasher(iter_fn, hashfn=hashlib.md5):
     def wrapped(self):
         h = hashfn()
@@ -215,6 +243,84 @@ BaseScoredDocs.EXTENSIONS['scoreddocs_hash'] = hasher('scoreddocs_iter')
 BaseDocPairs.EXTENSIONS['docpairs_hash'] = hasher('docpairs_iter')
 
 
+def _seekable(it):
+    # Whether it[start:stop] jumps directly to start, rather than reading through everything before it. Iterators
+    # opt in by providing seekable() (e.g., built docstores, DocSource iterators, and files with a built index).
+    return callable(getattr(it, 'seekable', None)) and it.seekable()
+
+
+def _docs_seekable_iter(docs_handler):
+    # returns (docs_iter, count), where count is None if docs_iter cannot jump directly to a given index
+    it = docs_handler.docs_iter()
+    if isinstance(it, ir_datasets.util.DocstoreSplitter):
+        # @use_docstore: slicing uses the docstore, so build it here once (rather than when it's first sliced)
+        it.docs_store.build()
+        it = docs_handler.docs_iter()
+    if not _seekable(it):
+        return it, None
+    count = docs_handler.docs_count() # after docs_iter(), since some handlers only know the count once the sources are loaded
+    if count is None and hasattr(it, '__len__'):
+        count = len(it)
+    return it, count
+
+
+def docs_shard(self, shard, num_shards):
+    """
+    Returns an iterator over the shard-th of num_shards contiguous ranges of documents. Seekable docs_iters
+    (e.g., built docstores, or collections with checkpoints) jump straight to the start of the range, so
+    each shard can be processed independently (e.g., in separate processes or on separate machines).
+    """
+    assert 0 <= shard < num_shards
+    it, count = _docs_seekable_iter(self)
+    if count is None:
+        _logger.info('docs_iter is not seekable; each shard will need to read through all the documents')
+        return itertools.islice(it, shard, None, num_shards)
+    return it[shard * count // num_shards:(shard + 1) * count // num_shards]
+
+
+_parallel_docs_handler = None
+
+
+def _parallel_docs_init(docs_handler):
+    global _parallel_docs_handler
+    _parallel_docs_handler = docs_handler
+
+
+def _parallel_docs_chunk(chunk):
+    start, stop = chunk
+    return list(_parallel_docs_handler.docs_iter()[start:stop])
+
+
+def docs_parallel_iter(self, workers=None, chunk_size=10000):
+    """
+    Iterates over the documents (in their usual order), parsing chunks of chunk_size documents in a pool
+    of workers. Only a bounded number of chunks are in flight at once, to limit memory usage. Falls back
+    on docs_iter if it is not seekable.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    it, count = _docs_seekable_iter(self)
+    if count is not None and workers > 1 and multiprocessing.get_start_method() != 'fork':
+        # the handler is sent to the workers by pickling it (rather than by forking)
+        try:
+            pickle.dumps(self)
+        except Exception as ex:
+            _logger.info(f'docs handler cannot be sent to {multiprocessing.get_start_method()} workers ({ex!r}); documents will be read from a single process')
+            workers = 1
+    if count is None or workers <= 1:
+        if count is None:
+            _logger.info('docs_iter is not seekable; documents will be read from a single process')
+        yield from it
+        return
+    chunks = ((start, min(start + chunk_size, count)) for start in range(0, count, chunk_size))
+    with multiprocessing.Pool(workers, _parallel_docs_init, (self,)) as pool:
+        for docs in ir_datasets.util.bounded_imap(pool, _parallel_docs_chunk, chunks, workers * 2):
+            yield from docs
+
+
+BaseDocs.EXTENSIONS['docs_shard'] = docs_shard
+BaseDocs.EXTENSIONS['docs_parallel_iter'] = docs_parallel_iter
+
+
 def _calc_metadata(iter_fn, metadata_fields=(), count_by_value_field=None):
     def wrapped(self, verbose=True, hashfn=hashlib.sha256):
         count = 0
@@ -381,6 +487,9 @@ class SourceDocIter:
     def __del__(self):
         self.close()
 
+    def seekable(self):
+        return True
+
     def __getitem__(self, key):
         if isinstance(key, slice):
             # it[start:stop:step]
@@ -1,5 +1,5 @@
 import codecs
-import json
+import ir_datasets
 from . import TrecQrels, TrecQrel
 from .base import GenericQuery, BaseQueries
 
@@ -17,7 +17,7 @@ class CLIRMatrixQueries(BaseQueries):
                 if line == '\n':
                     continue #ignore blank lines
 
-                j = json.loads(line)
+                j = ir_datasets.lazy_libs.json_backend().loads(line)
                 qid = j["src_id"]
                 query = j["src_query"]
                 yield GenericQuery(qid, query)
@@ -40,7 +40,7 @@ class CLIRMatrixQrels(TrecQrels):
                 if line == '\n':
                     continue # ignore blank lines
 
-                j = json.loads(line)
+                j = ir_datasets.lazy_libs.json_backend().loads(line)
 
                 qid = j["src_id"]
                 for did, score in j["tgt_results"]:
@@ -1,5 +1,4 @@
 from typing import Dict, NamedTuple
-import json
 
 import ir_datasets
 from ir_datasets.formats.base import BaseDocs, BaseQueries
@@ -64,7 +63,7 @@ class ExctractedCCDocs(BaseDocs):
         for dlc in docs_dlc:
             with dlc.stream() as f:
                 for line in f:
-                    line = json.loads(line)
+                    line = ir_datasets.lazy_libs.json_backend().loads(line)
                     line['doc_id'] = line['id']
                     del line['id']
                     yield ExctractedCCDoc(**line)
@@ -184,7 +183,7 @@ class ExctractedCCQueries(BaseQueries):
     def _internal_queries_iter(self, dlc):
         with dlc.stream() as f:
             for line in f:
-                line = json.loads(line)
+                line = ir_datasets.lazy_libs.json_backend().loads(line)
                 if not self._filter_lwq or self._subset_lang_three in line['languages_with_qrels']:
                     yield self._produce_query(line)
     
@@ -1,7 +1,7 @@
 import sys
 import codecs
 import contextlib
-import json
+import operator
 from typing import Tuple
 import io
 import ir_datasets
@@ -9,6 +9,9 @@ from .base import GenericDoc, GenericQuery, GenericDocPair, BaseDocs, BaseQuerie
 from ir_datasets.indices import PickleLz4FullStore, DEFAULT_DOCSTORE_OPTIONS
 
 
+BATCH_HINT = 1024 * 1024 # bytes of lines to decode at a time
+
+
 class _JsonlBase:
     def __init__(self, dlcs, cls, datatype, mapping=None):
         super().__init__()
@@ -24,11 +27,25 @@ class _JsonlBase:
         return self._dlcs[0].path(force)
 
     def _iter(self):
+        loads_lines = ir_datasets.lazy_libs.json_backend().loads_lines
+        fields = getattr(self._cls, '_fields', None)
+        if issubclass(self._cls, tuple) and fields is not None and set(fields) == set(self._mapping):
+            # NamedTuple: skip the keyword argument handling of cls(**kwargs)
+            get_fields = operator.itemgetter(*(self._mapping[f] for f in fields))
+            if len(fields) == 1:
+                make = lambda data: tuple.__new__(self._cls, (get_fields(data),))
+            else:
+                make = lambda data: tuple.__new__(self._cls, get_fields(data))
+        else:
+            make = lambda data: self._cls(**{dockey: data[datakey] for dockey, datakey in self._mapping.items()})
         for dlc in self._dlcs:
             with dlc.stream() as f:
-                for line in f:
-                    data = json.loads(line)
-                    yield self._cls(**{dockey: data[datakey] for dockey, datakey in self._mapping.items()})
+                while True:
+                    lines = f.readlines(BATCH_HINT)
+                    if not lines:
+                        break
+                    for data in loads_lines([line for line in lines if not line.isspace()]):
+                        yield make(data)
 
 
 class JsonlDocs(_JsonlBase, BaseDocs):
@@ -1,6 +1,10 @@
 import io
+import os
+import copy
+import pickle
 import codecs
 import tarfile
+import multiprocessing
 import re
 import gzip
 from glob import glob as fnglob
@@ -9,8 +13,11 @@ from fnmatch import fnmatch
 from pathlib import Path
 from typing import NamedTuple
 import ir_datasets
-from ir_datasets.indices import PickleLz4FullStore, DEFAULT_DOCSTORE_OPTIONS
-from .base import GenericDoc, GenericQuery, GenericScoredDoc, BaseDocs, BaseQueries, BaseScoredDocs, BaseQrels
+from ir_datasets.indices import PickleLz4FullStore, QrelsStore, ScoredDocsStore, DEFAULT_DOCSTORE_OPTIONS
+from .base import GenericDoc, GenericQuery, GenericScoredDoc, BaseDocs, BaseQueries, BaseScoredDocs, BaseQrels, qrels_dict, qrels_for, scoreddocs_for
+
+
+_logger = ir_datasets.log.easy()
 
 
 class TrecDoc(NamedTuple):
@@ -84,7 +91,7 @@ class TrecPrel(NamedTuple):
 CONTENT_TAGS = 'TEXT HEADLINE TITLE HL HEAD TTL DD DATE LP LEADPARA'.split()
 
 class TrecDocs(BaseDocs):
-    def __init__(self, docs_dlc, encoding=None, path_globs=None, content_tags=CONTENT_TAGS, parser='BS4', namespace=None, lang=None, expected_file_count=None, docstore_size_hint=None, count_hint=None, docstore_path=None):
+    def __init__(self, docs_dlc, encoding=None, path_globs=None, content_tags=CONTENT_TAGS, parser='BS4', namespace=None, lang=None, expected_file_count=None, docstore_size_hint=None, count_hint=None, docstore_path=None, parallel=None):
         self._docs_dlc = docs_dlc
         self._encoding = encoding
         self._path_globs = path_globs
@@ -107,6 +114,10 @@ class TrecDocs(BaseDocs):
         self._docstore_size_hint = docstore_size_hint
         self._count_hint = count_hint
         self._docstore_path = docstore_path
+        # number of processes that parse files matching path_globs (0 for one per CPU)
+        if parallel is None:
+            parallel = int(os.environ.get('IR_DATASETS_TREC_PARSE_PROCESSES', '1'))
+        self._parallel = parallel or multiprocessing.cpu_count()
         if expected_file_count is not None:
             assert self._path_globs is not None, "expected_file_count only supported with path_globs"
 
@@ -115,40 +126,77 @@ class TrecDocs(BaseDocs):
 
     @ir_datasets.util.use_docstore
     def docs_iter(self):
-        if Path(self._docs_dlc.path()).is_dir():
-            if self._path_globs:
-                file_count = 0
-                for glob in sorted(self._path_globs):
-                    glob_path = str(Path(self._docs_dlc.path())/glob)
-                    # IMPORTANT: cannot use Path().glob() here because the recusive ** will not follow symlinks.
-                    # Need to use glob.glob instead with recursive=True flag.
-                    for path in sorted(fnglob(glob_path, recursive=True)):
-                        file_count += 1
-                        yield from self._docs_iter(path)
-                if self._expected_file_count is not None:
-                    if file_count != self._expected_file_count:
-                        raise RuntimeError(f'found {file_count} files of the expected {self._expected_file_count} matching the following: {self._path_globs} under {self._docs_dlc.path()}. Make sure that directories are linked such that these globs match the correct number of files.')
+        if self._path_globs:
+            if self._parallel > 1:
+                yield from self._docs_parallel_iter()
             else:
-                yield from self._docs_iter(self._docs_dlc.path())
+                yield from self._docs_sources_iter()
+        elif Path(self._docs_dlc.path()).is_dir():
+            yield from self._docs_iter(self._docs_dlc.path())
         else:
-            if self._path_globs:
-                file_count = 0
-                # tarfile, find globs, open in streaming mode (r|)
-                with self._docs_dlc.stream() as stream:
-                    with tarfile.open(fileobj=stream, mode='r|gz') as tarf:
-                        for block in tarf:
-                            if any(fnmatch(block.name, g) for g in self._path_globs):
-                                file = tarf.extractfile(block)
-                                if block.name.endswith('.gz'):
-                                    file = gzip.GzipFile(fileobj=file)
-                                yield from self._parser(file)
-                                file_count += 1
-                if self._expected_file_count is not None:
-                    if file_count != self._expected_file_count:
-                        raise RuntimeError(f'found {file_count} files of the expected {self._expected_file_count} matching the following: {self._path_globs} under {self._docs_dlc.path()}. Make sure that directories are linked such that these globs match the correct number of files.')
+            with self._docs_dlc.stream() as f:
+                yield from self._parser(f)
+
+    def _docs_sources(self):
+        # Yields (path, None) for each file matching path_globs in a directory, or (name, file) for each one in a tar archive
+        file_count = 0
+        if Path(self._docs_dlc.path()).is_dir():
+            for glob in sorted(self._path_globs):
+                glob_path = str(Path(self._docs_dlc.path())/glob)
+                # IMPORTANT: cannot use Path().glob() here because the recusive ** will not follow symlinks.
+                # Need to use glob.glob instead with recursive=True flag.
+                for path in sorted(fnglob(glob_path, recursive=True)):
+                    file_count += 1
+                    yield path, None
+        else:
+            # tarfile, find globs, open in streaming mode (r|)
+            with self._docs_dlc.stream() as stream:
+                with tarfile.open(fileobj=stream, mode='r|gz') as tarf:
+                    for block in tarf:
+                        if any(fnmatch(block.name, g) for g in self._path_globs):
+                            file = tarf.extractfile(block)
+                            if block.name.endswith('.gz'):
+                                file = gzip.GzipFile(fileobj=file)
+                            yield block.name, file
+                            file_count += 1
+        if self._expected_file_count is not None:
+            if file_count != self._expected_file_count:
+                raise RuntimeError(f'found {file_count} files of the expected {self._expected_file_count} matching the following: {self._path_globs} under {self._docs_dlc.path()}. Make sure that directories are linked such that these globs match the correct number of files.')
+
+    def _docs_sources_iter(self):
+        for path, file in self._docs_sources():
+            if file is None:
+                yield from self._docs_iter(path)
             else:
-                with self._docs_dlc.stream() as f:
-                    yield from self._parser(f)
+                yield from self._parser(file)
+
+    def _parse_handler(self):
+        # A copy of this handler for parsing files in worker processes. It leaves out what's only needed to find the
+        # files or build the docstore (e.g., count_hint is usually a lambda), since it's pickled under spawn.
+        result = copy.copy(self)
+        result._docs_dlc = result._count_hint = result._docstore_size_hint = None
+        result._parser = getattr(result, self._parser.__name__)
+        return result
+
+    def _docs_parallel_iter(self):
+        # Parses each file in a pool of self._parallel processes, yielding the documents in the same order as
+        # the sequential path. Only a bounded number of files are in flight at once, to limit memory usage.
+        handler = self._parse_handler()
+        if multiprocessing.get_start_method() != 'fork':
+            # the handler is sent to the workers by pickling it (rather than by forking)
+            try:
+                pickle.dumps(handler)
+            except Exception as ex:
+                _logger.info(f'docs handler cannot be sent to {multiprocessing.get_start_method()} workers ({ex!r}); files will be parsed in a single process')
+                yield from self._docs_sources_iter()
+                return
+        def sources():
+            for path, file in self._docs_sources():
+                # files from tar archives are read here, since the archive can only be read sequentially
+                yield path, (None if file is None else file.read())
+        with multiprocessing.Pool(self._parallel, _parallel_parse_init, (handler,)) as pool:
+            for docs in ir_datasets.util.bounded_imap(pool, _parallel_parse_source, sources(), self._parallel * 2):
+                yield from docs
 
     def _docs_iter(self, path):
         if Path(path).is_file():
@@ -170,89 +218,76 @@ class TrecDocs(BaseDocs):
 
     def _parser_bs(self, stream):
         BeautifulSoup = ir_datasets.lazy_libs.bs4().BeautifulSoup
-        f = codecs.getreader(self._encoding or 'utf8')(stream, errors='replace')
-        doc_id, doc_markup = None, ''
+        encoding = self._encoding or 'utf8'
+        open_tags, close_tags = _tag_prefixes(self._content_tags)
         in_tag = False
-        for line in f:
-            if line.startswith('<DOCNO>'):
-                doc_id = line.replace('<DOCNO>', '').replace('</DOCNO>\n', '').strip()
-            elif line == '</DOC>\n':
-                soup = BeautifulSoup(f'<OUTER>\n{doc_markup}\n</OUTER>', 'lxml')
-                text = soup.get_text()
-                yield TrecDoc(doc_id, text, doc_markup)
-                doc_id, doc_markup = None, ''
-            else:
-                if in_tag:
-                    doc_markup += line
-                if line.startswith('</'):
-                    if any(line.startswith(f'</{tag}>') for tag in self._content_tags):
+        for doc in trec_doc_splitter(stream):
+            doc_id, doc_markup = None, []
+            for line in doc.splitlines(keepends=True):
+                if line.startswith(b'<DOCNO>'):
+                    doc_id = _line_value(line, b'DOCNO', encoding)
+                else:
+                    if in_tag:
+                        doc_markup.append(line)
+                    if line.startswith(close_tags):
                         in_tag -= 1
-                if line.startswith('<'):
-                    if any(line.startswith(f'<{tag}>') for tag in self._content_tags):
+                    if line.startswith(open_tags):
                         in_tag += 1
                         if in_tag == 1:
-                            doc_markup += line
+                            doc_markup.append(line)
+            doc_markup = b''.join(doc_markup).decode(encoding, errors='replace')
+            soup = BeautifulSoup(f'<OUTER>\n{doc_markup}\n</OUTER>', 'lxml')
+            text = soup.get_text()
+            yield TrecDoc(doc_id, text, doc_markup)
 
     def _parser_text(self, stream):
-        f = codecs.getreader(self._encoding or 'utf8')(stream, errors='replace')
-        doc_id, doc_text = None, ''
+        encoding = self._encoding or 'utf8'
+        open_tags, close_tags = _tag_prefixes(self._content_tags)
         in_tag = False
-        for line in f:
-            if line.startswith('<DOCNO>'):
-                doc_id = line.replace('<DOCNO>', '').replace('</DOCNO>\n', '').strip()
-            elif line == '</DOC>\n':
-                yield GenericDoc(doc_id, doc_text)
-                doc_id, doc_text = None, ''
-            else:
-                if line.startswith('</'):
-                    if any(line.startswith(f'</{tag}>') for tag in self._content_tags):
+        for doc in trec_doc_splitter(stream):
+            doc_id, doc_text = None, []
+            for line in doc.splitlines(keepends=True):
+                if line.startswith(b'<DOCNO>'):
+                    doc_id = _line_value(line, b'DOCNO', encoding)
+                else:
+                    if line.startswith(close_tags):
                         in_tag = False
-                if in_tag:
-                    doc_text += line
-                if line.startswith('<'):
-                    if any(line.startswith(f'<{tag}>') for tag in self._content_tags):
+                    if in_tag:
+                        doc_text.append(line)
+                    if line.startswith(open_tags):
                         in_tag = True
+            yield GenericDoc(doc_id, b''.join(doc_text).decode(encoding, errors='replace'))
 
     def _parser_tut(self, stream):
-        f = codecs.getreader(self._encoding or 'utf8')(stream, errors='replace')
-        doc_id, doc_title, doc_url, doc_text = None, None, None, ''
+        encoding = self._encoding or 'utf8'
         in_tag = False
-        for line in f:
-            if line.startswith('<DOCNO>'):
-                doc_id = line.replace('<DOCNO>', '').replace('</DOCNO>\n', '').strip()
-            if line.startswith('<TITLE>'):
-                doc_title = line.replace('<TITLE>', '').replace('</TITLE>\n', '').strip()
-            if line.startswith('<URL>'):
-                doc_url = line.replace('<URL>', '').replace('</URL>\n', '').strip()
-            elif line == '</DOC>\n':
-                yield TitleUrlTextDoc(doc_id, doc_title, doc_url, doc_text)
-                doc_id, doc_title, doc_url, doc_text = None, None, None, ''
-            else:
-                if line.startswith('</TEXT>'):
-                    in_tag = False
-                if in_tag:
-                    doc_text += line
-                if line.startswith('<TEXT>'):
-                    in_tag = True
+        for doc in trec_doc_splitter(stream):
+            doc_id, doc_title, doc_url, doc_text = None, None, None, []
+            for line in doc.splitlines(keepends=True):
+                if line.startswith(b'<DOCNO>'):
+                    doc_id = _line_value(line, b'DOCNO', encoding)
+                if line.startswith(b'<TITLE>'):
+                    doc_title = _line_value(line, b'TITLE', encoding)
+                if line.startswith(b'<URL>'):
+                    doc_url = _line_value(line, b'URL', encoding)
+                else:
+                    if line.startswith(b'</TEXT>'):
+                        in_tag = False
+                    if in_tag:
+                        doc_text.append(line)
+                    if line.startswith(b'<TEXT>'):
+                        in_tag = True
+            yield TitleUrlTextDoc(doc_id, doc_title, doc_url, b''.join(doc_text).decode(encoding, errors='replace'))
 
     def _parser_sax(self, stream):
         field_defs = []
         field_defs.append({'docno'})
         field_defs.append({'headline', 'title', 'h3', 'h4'})
         field_defs.append({c.lower() for c in CONTENT_TAGS} - field_defs[-1])
-        buffer = bytearray()
-        while True:
-            if b'\n</DOC>' not in buffer:
-                chunk = stream.read1()
-                if chunk == b'':
-                    break
-                buffer.extend(chunk)
-            else:
-                idx = buffer.index(b'\n</DOC>')
-                full_doc = bytes(buffer[:idx+7])
-                doc_id, title, body = ir_datasets.util.html_parsing.sax_html_parser(full_doc, force_encoding=self._encoding or 'utf8', fields=field_defs)
-                yield TrecParsedDoc(doc_id, title, body, full_doc.strip())
-                del buffer[:idx+7]
+        for doc in trec_doc_splitter(stream, end_tag=b'</DOC>'):
+            full_doc = doc + b'</DOC>'
+            doc_id, title, body = ir_datasets.util.html_parsing.sax_html_parser(full_doc, force_encoding=self._encoding or 'utf8', fields=field_defs)
+            yield TrecParsedDoc(doc_id, title, body, full_doc.strip())
 
     def docs_cls(self):
         return self._doc
@@ -284,6 +319,67 @@ class TrecDocs(BaseDocs):
         return self._docs_lang
 
 
+def trec_doc_splitter(stream, end_tag=b'</DOC>\n', read_size=1024*1024):
+    """
+    Splits a stream of TREC SGML documents on lines that start with end_tag, yielding the bytes of each document
+    (everything since the end of the previous one, excluding end_tag). Content after the last end_tag is not a
+    complete document, so it is not yielded. The encoding must be ASCII-compatible (e.g., utf8, latin-1, GB18030).
+    """
+    buffer = b''
+    start, search = 0, 0 # start of the current document, and where to resume looking for end_tag
+    while True:
+        idx = buffer.find(end_tag, search)
+        if idx == -1:
+            chunk = stream.read(read_size)
+            if not chunk:
+                return
+            search = max(len(buffer) - len(end_tag) + 1, start) - start # end_tag may span the chunks
+            buffer = buffer[start:] + chunk
+            start = 0
+        elif idx == start or buffer[idx-1] in b'\r\n':
+            yield buffer[start:idx]
+            start = search = idx + len(end_tag)
+        else:
+            search = idx + 1
+
+
+def _tag_prefixes(tags):
+    # for bytes.startswith, which accepts a tuple of prefixes
+    return tuple(f'<{tag}>'.encode() for tag in tags), tuple(f'</{tag}>'.encode() for tag in tags)
+
+
+def _line_value(line, tag, encoding):
+    # e.g., b'<DOCNO> D100A </DOCNO>\n' -> 'D100A'
+    return line.replace(b'<' + tag + b'>', b'').replace(b'</' + tag + b'>\n', b'').decode(encoding, errors='replace').strip()
+
+
+def _source_file_paths(dlcs):
+    # The paths of the files that dlcs read from, or None if they do not each read a file on disk. (Members of zip
+    # files are not included, since they report the path of the archive.)
+    dlcs = dlcs if isinstance(dlcs, list) else [dlcs]
+    if any(isinstance(dlc, ir_datasets.util.ZipExtract) or not hasattr(dlc, 'path') for dlc in dlcs):
+        return None
+    paths = [str(dlc.path()) for dlc in dlcs]
+    if not all(os.path.isfile(path) for path in paths):
+        return None
+    return paths
+
+
+_parallel_parse_docs = None
+
+
+def _parallel_parse_init(docs):
+    global _parallel_parse_docs
+    _parallel_parse_docs = docs
+
+
+def _parallel_parse_source(source):
+    path, contents = source
+    if contents is None:
+        return list(_parallel_parse_docs._docs_iter(path))
+    return list(_parallel_parse_docs._parser(io.BytesIO(contents)))
+
+
 DEFAULT_QTYPE_MAP = {
     '<num> *(Number:)?': 'query_id',
     '<title> *(Topic:)?': 'title',
@@ -418,15 +514,66 @@ class TrecColonQueries(BaseQueries):
 
 
 class TrecQrels(BaseQrels):
-    def __init__(self, qrels_dlc, qrels_defs, format_3col=False):
+    def __init__(self, qrels_dlc, qrels_defs, format_3col=False, qrels_store_path=None):
         self._qrels_dlc = qrels_dlc
         self._qrels_defs = qrels_defs
         self._format_3col = format_3col
+        self._qrels_store_path = qrels_store_path
+        self._qrels_store_cache = None
 
     def qrels_path(self):
         return self._qrels_dlc.path()
 
     def qrels_iter(self):
+        store = self._qrels_store(build=False)
+        if store is not None:
+            yield from store
+        else:
+            yield from self._qrels_parse_iter()
+
+    def qrels_dict(self):
+        if type(self).qrels_iter is not TrecQrels.qrels_iter:
+            return qrels_dict(self) # subclass reads the qrels differently
+        store = self._qrels_store()
+        if store is not None:
+            return store.as_dict()
+        return qrels_dict(self)
+
+    def qrels_for(self, query_ids):
+        if type(self).qrels_iter is not TrecQrels.qrels_iter:
+            return qrels_for(self, query_ids) # subclass reads the qrels differently
+        store = self._qrels_store()
+        if store is not None:
+            return store.records_for(query_ids)
+        return qrels_for(self, query_ids)
+
+    def _qrels_store(self, build=True):
+        # Qrels that are read from files on disk are compiled into a QrelsStore when they are first looked up
+        # (qrels_dict or qrels_for). Plain iteration only uses the store once it's built, since building it reads
+        # all of the qrels.
+        if self._qrels_store_cache is None:
+            self._qrels_store_cache = False
+            paths = _source_file_paths(self._qrels_dlc)
+            if paths is None:
+                return None
+            store_path = self._qrels_store_path or ir_datasets.util.derived_path(paths, '.qrels.pkl.lz4')
+            self._qrels_store_cache = QrelsStore(store_path, self._qrels_parse_iter, TrecQrel, paths)
+        store = self._qrels_store_cache
+        if store is False:
+            return None
+        if store.built():
+            return store
+        if not build:
+            return None
+        try:
+            store.build()
+        except OSError as ex:
+            _logger.warn(f'unable to build qrels store {store.path} ({ex!r}); qrels will be parsed on each use')
+            self._qrels_store_cache = False
+            return None
+        return store
+
+    def _qrels_parse_iter(self):
         if isinstance(self._qrels_dlc, list):
             for dlc in self._qrels_dlc:
                 yield from self._qrels_internal_iter(dlc)
@@ -511,14 +658,64 @@ class TrecSubQrels(BaseQrels):
 
 
 class TrecScoredDocs(BaseScoredDocs):
-    def __init__(self, scoreddocs_dlc, negate_score=False):
+    def __init__(self, scoreddocs_dlc, negate_score=False, scoreddocs_store_path=None):
         self._scoreddocs_dlc = scoreddocs_dlc
         self._negate_score = negate_score
+        self._scoreddocs_store_path = scoreddocs_store_path
+        self._scoreddocs_store_cache = None
 
     def scoreddocs_path(self):
         return self._scoreddocs_dlc.path()
 
     def scoreddocs_iter(self):
+        store = self._scoreddocs_store(build=False)
+        if store is not None:
+            yield from store
+        else:
+            yield from self._scoreddocs_parse_iter()
+
+    def scoreddocs_for(self, query_ids):
+        if type(self).scoreddocs_iter is not TrecScoredDocs.scoreddocs_iter:
+            return scoreddocs_for(self, query_ids) # subclass reads the scoreddocs differently
+        store = self._scoreddocs_store()
+        if store is not None:
+            return store.records_for(query_ids)
+        return scoreddocs_for(self, query_ids)
+
+    def scoreddocs_count(self):
+        if type(self).scoreddocs_iter is not TrecScoredDocs.scoreddocs_iter:
+            return None
+        store = self._scoreddocs_store(build=False)
+        if store is not None:
+            return len(store)
+        return None
+
+    def _scoreddocs_store(self, build=True):
+        # Scoreddocs that are read from a file on disk are compiled into a ScoredDocsStore when they are first looked
+        # up by query. Plain iteration only uses the store once it's built, since building it reads the whole file.
+        if self._scoreddocs_store_cache is None:
+            self._scoreddocs_store_cache = False
+            paths = _source_file_paths(self._scoreddocs_dlc)
+            if paths is None:
+                return None
+            store_path = self._scoreddocs_store_path or ir_datasets.util.derived_path(paths, '.neg.scoreddocs' if self._negate_score else '.scoreddocs')
+            self._scoreddocs_store_cache = ScoredDocsStore(store_path, self._scoreddocs_parse_iter, GenericScoredDoc, paths)
+        store = self._scoreddocs_store_cache
+        if store is False:
+            return None
+        if store.built():
+            return store
+        if not build:
+            return None
+        try:
+            store.build()
+        except OSError as ex:
+            _logger.warn(f'unable to build scoreddocs store {store.path} ({ex!r}); scoreddocs will be parsed on each use')
+            self._scoreddocs_store_cache = False
+            return None
+        return store
+
+    def _scoreddocs_parse_iter(self):
         with self._scoreddocs_dlc.stream() as f:
             f = codecs.getreader('utf8')(f)
             for line in f:
@@ -1,9 +1,56 @@
+import os
 import contextlib
+import itertools
+from functools import partial
 from typing import Tuple
 import io
 import ir_datasets
+from ir_datasets.util import GzipExtract
 from .base import GenericDoc, GenericQuery, GenericDocPair, BaseDocs, BaseQueries, BaseDocPairs
-from ir_datasets.indices import PickleLz4FullStore, DEFAULT_DOCSTORE_OPTIONS
+from ir_datasets.indices import PickleLz4FullStore, LineOffsetIndex, DocPairsStore, DEFAULT_DOCSTORE_OPTIONS
+
+
+_logger = ir_datasets.log.easy()
+
+
+# with a line index, FileLineIter seeks rather than reads when skipping at least this many lines
+SEEK_LINES = 32
+
+# number of characters that are read at a time when reading lines in bulk
+CHUNK_SIZE = 1024 * 1024
+
+# number of lines in a batch, when lines cannot be read in bulk
+BATCH_SIZE = 1000
+
+
+def line_offset_index(dlc, build=True):
+    """
+    Returns the LineOffsetIndex of dlc's file if dlc streams an uncompressed file on disk and the index is
+    built (or can be built, if build=True). Returns None otherwise.
+    """
+    if isinstance(dlc, list) or not hasattr(dlc, 'path') or not hasattr(dlc, 'stream'):
+        return None
+    path = dlc.path(force=False)
+    if not os.path.isfile(path):
+        return None
+    index = LineOffsetIndex(path)
+    if index.built():
+        return index
+    if not build:
+        return None
+    with dlc.stream() as stream:
+        # only when the stream reads the file directly (e.g., not when dlc decompresses it)
+        try:
+            if not isinstance(stream, io.BufferedReader) or not os.path.samefile(stream.name, path):
+                return None
+        except (OSError, TypeError, AttributeError):
+            return None
+    try:
+        index.build()
+    except OSError as ex:
+        _logger.info(f'unable to build line index for {path} ({ex!r})')
+        return None
+    return index
 
 
 class FileLineIter:
@@ -15,6 +62,7 @@ class FileLineIter:
         self.start = start
         self.stop = stop
         self.step = step
+        self.line_index = None
         self.ctxt = contextlib.ExitStack()
 
     def __next__(self):
@@ -25,7 +73,13 @@ class FileLineIter:
             if isinstance(self.dlc, list):
                 self.stream = io.TextIOWrapper(self.ctxt.enter_context(self.dlc[self.stream_idx].stream()))
             else:
-                self.stream = io.TextIOWrapper(self.ctxt.enter_context(self.dlc.stream()))
+                self.stream = io.TextIOWrapper(self.ctxt.enter_context(self._open_at_start()))
+        if self.start - self.pos > SEEK_LINES and self._line_index() is not None:
+            if self.start >= len(self.line_index):
+                self.ctxt.close()
+                raise StopIteration()
+            self.stream.seek(self.line_index[self.start]) # a byte offset is a valid position for TextIOWrapper
+            self.pos = self.start - 1
         line = ''
         while self.pos < self.start:
             line = self.stream.readline()
@@ -44,12 +98,77 @@ class FileLineIter:
         self.start += self.step
         return line
 
+    def _line_index(self):
+        # The LineOffsetIndex of the file (built the first time it's needed), or None if it cannot have one
+        if self.line_index is None:
+            index = None
+            if not isinstance(self.dlc, (list, GzipExtract)):
+                index = line_offset_index(self.dlc)
+            self.line_index = False if index is None else index
+        return None if self.line_index is False else self.line_index
+
+    def _open_at_start(self):
+        if self.start > SEEK_LINES and isinstance(self.dlc, GzipExtract):
+            # jump to the nearest checkpoint, rather than decompressing everything before start
+            index = self.dlc.checkpoint_index()
+            stream = index.open(self.start) if index is not None else None
+            if stream is not None:
+                self.pos = self.start - 1
+                return stream
+        return self.dlc.stream()
+
     def __iter__(self):
         return self
 
+    def _line_batches(self):
+        # Yields lists of the remaining lines (without line endings, and skipping blank lines), reading the file
+        # in large chunks. This consumes the iterator.
+        if isinstance(self.dlc, list) or self.step != 1:
+            # one line at a time when reading from multiple files or with a step (which seeks between lines)
+            while True:
+                batch = [line.rstrip('\n') for line in itertools.islice(self, BATCH_SIZE)]
+                if not batch:
+                    return
+                yield batch
+        # reads the first line as usual, which opens the file and skips to start
+        first = next(self, None)
+        if first is None:
+            return
+        remaining = None if self.stop is None else self.stop - self.start
+        batch, tail = [first.rstrip('\n')], ''
+        while remaining is None or remaining > 0:
+            chunk = self.stream.read(CHUNK_SIZE) # newlines are already normalized to \n by the TextIOWrapper
+            if chunk:
+                lines = (tail + chunk).split('\n')
+                tail = lines.pop() # incomplete line
+            else:
+                lines = [tail]
+            lines = list(filter(None, lines)) # skip blank lines
+            if remaining is not None:
+                lines = lines[:remaining]
+                remaining -= len(lines)
+            batch.extend(lines)
+            if batch:
+                yield batch
+                batch = []
+            if not chunk:
+                break
+        if batch:
+            yield batch
+        self.ctxt.close()
+
     def __del__(self):
         self.ctxt.close()
 
+    def seekable(self):
+        # only with an index that's already built (otherwise, slicing reads through the file up to the start)
+        if isinstance(self.dlc, list):
+            return False
+        if isinstance(self.dlc, GzipExtract):
+            index = self.dlc.checkpoint_index()
+            return index is not None and index.built()
+        return line_offset_index(self.dlc, build=False) is not None
+
     def __getitem__(self, key):
         if not isinstance(key, slice):
             raise TypeError('key must be slice')
@@ -85,27 +204,77 @@ class TsvIter:
     def __init__(self, cls, line_iter):
         self.cls = cls
         self.line_iter = line_iter
+        self.buffer = None # records from the current batch, in reverse order
+        self._batches = None
+        # resolve the field layout once, rather than for each record
+        self.num_fields = len(cls._fields)
+        last_field = cls.__annotations__[cls._fields[-1]] if hasattr(cls, '__annotations__') else None
+        self.flex_tail = last_field == Tuple[str, ...]
+        if issubclass(cls, tuple) and hasattr(cls, '_make'):
+            self.make = partial(tuple.__new__, cls) # NamedTuple; skips re-checking the number of fields
+        else:
+            self.make = lambda cols: cls(*cols)
 
     def __iter__(self):
         return self
 
     def __next__(self):
-        line = next(self.line_iter)
-        cols = line.rstrip('\n').split('\t')
-        num_cols = len(self.cls._fields)
-        last_field = self.cls.__annotations__[self.cls._fields[-1]] if hasattr(self.cls, '__annotations__') else None
-        if last_field == Tuple[str, ...]:
-            if len(cols) < len(self.cls._fields) - 1:
-                raise RuntimeError(f'expected at least {len(self.cls._fields)-1} fields, got {len(cols)}')
-            if len(cols) == len(self.cls._fields) - 1:
-                cols += ((),)
-            else:
-                cols[len(self.cls._fields)-1] = tuple(cols[len(self.cls._fields)-1:])
-                cols = cols[:len(self.cls._fields)]
+        while not self.buffer:
+            if self._batches is None:
+                self._batches = self._iter_batches()
+            self.buffer = next(self._batches)
+            self.buffer.reverse()
+        return self.buffer.pop()
+
+    def batches(self):
+        """
+        Yields the remaining records in lists (of up to about a megabyte of text each). Lines are read and
+        parsed in bulk.
+        """
+        if self.buffer:
+            buffer, self.buffer = self.buffer[::-1], None
+            yield buffer
+        if self._batches is None:
+            self._batches = self._iter_batches()
+        yield from self._batches
+
+    def _iter_batches(self):
+        if hasattr(self.line_iter, '_line_batches'):
+            line_batches = self.line_iter._line_batches()
         else:
-            if len(cols) != len(self.cls._fields):
-                raise RuntimeError(f'expected {len(self.cls._fields)} fields, got {len(cols)}')
-        return self.cls(*cols)
+            line_batches = iter(lambda: [line.rstrip('\n') for line in itertools.islice(self.line_iter, BATCH_SIZE)], [])
+        for lines in line_batches:
+            records, error = self._parse(lines)
+            if records:
+                yield records
+            if error is not None:
+                raise error
+
+    def _parse(self, lines):
+        # returns (records, error), where records are those that come before the first invalid line (if any)
+        num_fields, make = self.num_fields, self.make
+        if self.flex_tail:
+            records = []
+            for line in lines:
+                cols = line.split('\t')
+                if len(cols) < num_fields - 1:
+                    return records, RuntimeError(f'expected at least {num_fields-1} fields, got {len(cols)}')
+                records.append(make(cols[:num_fields-1] + [tuple(cols[num_fields-1:])]))
+            return records, None
+        if set(map(str.count, lines, itertools.repeat('\t'))) == {num_fields - 1}:
+            # every line has the expected number of columns, so split them all at once and re-group them
+            cols = '\t'.join(lines).split('\t')
+            return list(map(make, zip(*[iter(cols)] * num_fields))), None
+        records = []
+        for line in lines:
+            cols = line.split('\t')
+            if len(cols) != num_fields:
+                return records, RuntimeError(f'expected {num_fields} fields, got {len(cols)}')
+            records.append(make(cols))
+        return records, None
+
+    def seekable(self):
+        return callable(getattr(self.line_iter, 'seekable', None)) and self.line_iter.seekable()
 
     def __getitem__(self, key):
         return TsvIter(self.cls, self.line_iter[key])
@@ -123,12 +292,26 @@ class _TsvBase:
         return self._dlc.path(force)
 
     def _iter(self):
+        start = 1 if self._skip_first_line else 0
         stop = None
         if hasattr(self, f'{self._datatype}_count'):
-            stop = getattr(self, f'{self._datatype}_count')()
-        start = 1 if self._skip_first_line else 0
+            count = getattr(self, f'{self._datatype}_count')()
+            if count is not None:
+                stop = start + count
         return TsvIter(self._cls, FileLineIter(self._dlc, start=start, stop=stop, step=1))
 
+    def _indexed_count(self):
+        # the number of records, if the file's lines are already indexed (so it doesn't need to be read)
+        if isinstance(self._dlc, GzipExtract):
+            index = self._dlc.checkpoint_index()
+            count = index.count() if index is not None else None
+        else:
+            index = line_offset_index(self._dlc, build=False)
+            count = len(index) if index is not None else None
+        if count is not None and self._skip_first_line:
+            count -= 1
+        return count
+
 
 class TsvDocs(_TsvBase, BaseDocs):
     def __init__(self, docs_dlc, doc_cls=GenericDoc, doc_store_index_fields=None, namespace=None, lang=None, skip_first_line=False, docstore_size_hint=None, count_hint=None):
@@ -168,7 +351,7 @@ class TsvDocs(_TsvBase, BaseDocs):
     def docs_count(self):
         if self.docs_store().built():
             return self.docs_store().count()
-        return None
+        return self._indexed_count()
 
     def docs_lang(self):
         return self._docs_lang
@@ -197,14 +380,92 @@ class TsvQueries(_TsvBase, BaseQueries):
 
 
 class TsvDocPairs(_TsvBase, BaseDocPairs):
-    def __init__(self, docpairs_dlc, docpair_cls=GenericDocPair):
+    def __init__(self, docpairs_dlc, docpair_cls=GenericDocPair, docpairs_store_path=None):
         super().__init__(docpairs_dlc, docpair_cls, "docpairs")
+        self._docpairs_store_path = docpairs_store_path
+        self._docpairs_store_cache = None
 
     def docpairs_path(self):
         return self._path()
 
     def docpairs_iter(self):
+        store = self._docpairs_store(build=False)
+        if store is not None:
+            return iter(store)
+        if self._docpairs_store_cache is not False:
+            return DocPairsSplitter(self._iter(), self) # avoid building the store if not needed
         return self._iter()
 
     def docpairs_cls(self):
         return self._cls
+
+    def docpairs_count(self):
+        store = self._docpairs_store(build=False)
+        if store is not None:
+            return len(store)
+        return None
+
+    def _docpairs_store(self, build=True):
+        # Docpairs are compiled into a DocPairsStore when they are first indexed, sliced, counted, or shuffled, if
+        # they are read from a file on disk and each field is a single ID. Plain iteration only uses the store once
+        # it's built, since building it reads the whole file.
+        if self._docpairs_store_cache is None:
+            self._docpairs_store_cache = False
+            dlc = self._dlc
+            if isinstance(dlc, (list, ir_datasets.util.ZipExtract)) or not hasattr(dlc, 'path'):
+                return None
+            annotations = getattr(self._cls, '__annotations__', None)
+            if not annotations or any(t is not str for t in annotations.values()):
+                return None
+            path = str(dlc.path())
+            if not os.path.isfile(path):
+                return None
+            store_path = self._docpairs_store_path or ir_datasets.util.derived_path(path, '.docpairs')
+            self._docpairs_store_cache = DocPairsStore(store_path, self._iter, self._cls, [path])
+        store = self._docpairs_store_cache
+        if store is False:
+            return None
+        if store.built():
+            return store
+        if not build:
+            return None
+        try:
+            store.build()
+        except OSError as ex:
+            _logger.warn(f'unable to build docpairs store {store.path} ({ex!r}); docpairs will be parsed on each use')
+            self._docpairs_store_cache = False
+            return None
+        return store
+
+
+class DocPairsSplitter:
+    """
+    Iterates over the docpairs as they are parsed from the file, but uses the DocPairsStore (building it if needed)
+    for indexing, slicing, len(), and shuffled(seed), like DocstoreSplitter does for docstores.
+    """
+    def __init__(self, it, docpairs):
+        self.it = it
+        self.docpairs = docpairs
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self.it)
+
+    def _store_iter(self):
+        store = self.docpairs._docpairs_store()
+        if store is None:
+            raise RuntimeError('docpairs store could not be built')
+        return iter(store)
+
+    def __getitem__(self, key):
+        if self.docpairs._docpairs_store() is None:
+            return self.docpairs._iter()[key] # slices the file itself
+        return self._store_iter()[key]
+
+    def __len__(self):
+        return len(self._store_iter())
+
+    def shuffled(self, seed=None):
+        return self._store_iter().shuffled(seed)
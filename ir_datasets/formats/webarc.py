@@ -82,7 +82,7 @@ class WarcDocs(BaseDocs):
         return None
 
     def docs_store(self, options=ir_datasets.indices.DEFAULT_DOCSTORE_OPTIONS):
-        docstore = ir_datasets.indices.ClueWebWarcDocstore(self)
+        docstore = ir_datasets.indices.ClueWebWarcDocstore(self, options=options)
         return ir_datasets.indices.CacheDocstore(docstore, f'{self.docs_path(force=False)}.cache', options=options)
 
     def docs_cls(self):
@@ -2,6 +2,15 @@ from .base import Docstore, DEFAULT_DOCSTORE_OPTIONS, DocstoreOptions, FileAcces
 from .indexed_tsv_docstore import IndexedTsvDocstore
 from .zpickle_docstore import ZPickleDocStore
 from .numpy_sorted_index import NumpySortedIndex, NumpyPosIndex
+from .numpy_hash_index import NumpyHashIndex
 from .lz4_pickle import Lz4PickleLookup, PickleLz4FullStore
 from .cache_docstore import CacheDocstore
+from .memory_cache_docstore import MemoryCacheDocstore, memory_cache
 from .clueweb_warc import ClueWebWarcIndex, ClueWebWarcDocstore, WarcIter
+from .gzip_index import GzipCheckpointIndex
+from .line_offset_index import LineOffsetIndex
+from .arrow_docstore import ArrowDocstore
+from .qrels_store import QrelsStore
+from .scoreddocs_store import ScoredDocsStore
+from .docpairs_store import DocPairsStore, DocPairsIter
+from .zlib_checkpoint_table import ZlibCheckpointTable
@@ -0,0 +1,274 @@
+import os
+import bisect
+import typing
+import datetime
+import ir_datasets
+from . import Docstore, NumpySortedIndex, DEFAULT_DOCSTORE_OPTIONS, FileAccess
+
+
+_logger = ir_datasets.log.easy()
+
+
+def arrow_type(annotation):
+    """
+    Returns the pyarrow type for a NamedTuple field annotation, or None if it's not supported.
+    """
+    pa = ir_datasets.lazy_libs.pyarrow()
+    simple_types = {
+        str: pa.string(),
+        int: pa.int64(),
+        float: pa.float64(),
+        bool: pa.bool_(),
+        bytes: pa.binary(),
+        datetime.datetime: pa.timestamp('us'),
+        datetime.date: pa.date32(),
+    }
+    if annotation in simple_types:
+        return simple_types[annotation]
+    origin, args = typing.get_origin(annotation), typing.get_args(annotation)
+    if origin is typing.Union and len(args) == 2 and type(None) in args: # Optional[X]
+        return arrow_type(next(a for a in args if a is not type(None)))
+    if origin in (tuple, list) and args and (origin is list or (len(args) == 2 and args[1] is Ellipsis)): # Tuple[X, ...] or List[X]
+        value_type = arrow_type(args[0])
+        return pa.list_(value_type) if value_type is not None else None
+    if hasattr(annotation, '_fields'): # NamedTuple
+        field_types = [(f, arrow_type(a)) for f, a in annotation.__annotations__.items()]
+        if any(t is None for _, t in field_types):
+            return None
+        return pa.struct(field_types)
+    return None
+
+
+def arrow_schema(data_cls, fields=None):
+    """
+    Returns (schema, fields) for data_cls, excluding fields (with a message) that cannot be represented.
+    """
+    pa = ir_datasets.lazy_libs.pyarrow()
+    fields = fields or data_cls._fields
+    types = [(f, arrow_type(data_cls.__annotations__[f])) for f in fields]
+    field_conflicts = [f for f, t in types if t is None]
+    if field_conflicts:
+        field_conflicts = ', '.join([repr((f, data_cls.__annotations__[f])) for f in field_conflicts])
+        _logger.info(f'Skipping the following fields due to unsupported data types: {field_conflicts}')
+    types = [(f, t) for f, t in types if t is not None]
+    return pa.schema(types), [f for f, _ in types]
+
+
+def _converter(annotation):
+    # builds a function that converts values from to_pylist() back to their python types
+    # (e.g., structs are read as dicts, but should be NamedTuples)
+    origin, args = typing.get_origin(annotation), typing.get_args(annotation)
+    if origin is typing.Union and len(args) == 2 and type(None) in args:
+        convert = _converter(next(a for a in args if a is not type(None)))
+        if convert is None:
+            return None
+        return lambda v: None if v is None else convert(v)
+    if origin in (tuple, list) and args:
+        convert = _converter(args[0])
+        if convert is None:
+            return (lambda v: tuple(v)) if origin is tuple else None
+        return (lambda v: tuple(convert(x) for x in v)) if origin is tuple else (lambda v: [convert(x) for x in v])
+    if hasattr(annotation, '_fields'):
+        converters = [(f, _converter(a)) for f, a in annotation.__annotations__.items()]
+        return lambda v: annotation(*(v[f] if c is None else c(v[f]) for f, c in converters))
+    return None
+
+
+class ArrowDocsIter:
+    def __init__(self, docstore, slice, fields=None):
+        self.docstore = docstore
+        self.slice = slice
+        self.fields = fields
+        self.buffer = None
+
+    def __next__(self):
+        if self.slice.start >= self.slice.stop:
+            raise StopIteration
+        if not self.buffer:
+            # read the next chunk of rows in columnar form
+            step = self.slice.step or 1
+            stop = min(self.slice.start + self.docstore.batch_size * step, self.slice.stop)
+            self.buffer = self.docstore._read_range(self.slice.start, stop, step, self.fields)
+            self.buffer.reverse()
+        self.slice = slice(self.slice.start + (self.slice.step or 1), self.slice.stop, self.slice.step)
+        return self.buffer.pop()
+
+    def __iter__(self):
+        return self
+
+    def seekable(self):
+        return True
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            # it[start:stop:step]
+            new_slice = ir_datasets.util.apply_sub_slice(self.slice, key)
+            return ArrowDocsIter(self.docstore, new_slice, self.fields)
+        elif isinstance(key, int):
+            # it[index]
+            new_slice = ir_datasets.util.slice_idx(self.slice, key)
+            new_it = ArrowDocsIter(self.docstore, new_slice, self.fields)
+            try:
+                return next(new_it)
+            except StopIteration as e:
+                raise IndexError(e)
+        raise TypeError("key must be int or slice")
+
+
+class ArrowDocstore(Docstore):
+    """
+    A read-only docstore over a Parquet or Arrow IPC file (e.g., produced by ``ir_datasets export <ds> docs
+    --format parquet``). Iteration and lookups are performed in columnar form, and only the columns that are
+    needed are read. Lookups use a NumpySortedIndex from the id_field to row numbers, which is built on first
+    use and saved under home_path() (see derived_path).
+    """
+    def __init__(self, path, doc_cls, id_field='doc_id', index_path=None, batch_size=1024, options=DEFAULT_DOCSTORE_OPTIONS):
+        super().__init__(doc_cls, id_field, options=options)
+        self.path = path
+        self.index_path = index_path or ir_datasets.util.derived_path(path, f'.idx.{id_field}')
+        self.batch_size = batch_size
+        self._format = None
+        self._file = None
+        self._idx = None
+        self._converters = {f: _converter(doc_cls.__annotations__[f]) for f in doc_cls._fields}
+
+    def _open(self):
+        if self._file is None:
+            pa = ir_datasets.lazy_libs.pyarrow()
+            with open(self.path, 'rb') as f:
+                magic = f.read(6)
+            if magic[:4] == b'PAR1':
+                self._format = 'parquet'
+                self._file = ir_datasets.lazy_libs.pyarrow_parquet().ParquetFile(self.path, memory_map=self._options.file_access != FileAccess.FILE)
+                offsets = [0]
+                for i in range(self._file.num_row_groups):
+                    offsets.append(offsets[-1] + self._file.metadata.row_group(i).num_rows)
+                self._row_group_offsets = offsets
+            elif magic == b'ARROW1':
+                self._format = 'arrow'
+                source = pa.memory_map(self.path) if self._options.file_access != FileAccess.FILE else pa.OSFile(self.path)
+                self._file = pa.ipc.open_file(source).read_all()
+            else:
+                raise ValueError(f'{self.path} is not a Parquet or Arrow IPC file')
+        return self._file
+
+    def _num_rows(self):
+        f = self._open()
+        return f.metadata.num_rows if self._format == 'parquet' else f.num_rows
+
+    def _to_records(self, table, fields):
+        columns = []
+        for field in fields:
+            if field in table.column_names:
+                column = table.column(field).to_pylist()
+                convert = self._converters[field]
+                if convert is not None:
+                    column = [v if v is None else convert(v) for v in column]
+            else:
+                column = [None] * table.num_rows # field not exported
+            columns.append(column)
+        if fields == self._doc_cls._fields:
+            return [self._doc_cls._make(values) for values in zip(*columns)]
+        return list(zip(*columns))
+
+    def _read_range(self, start, stop, step=1, fields=None):
+        # returns the records in rows [start:stop:step]
+        fields = fields or self._doc_cls._fields
+        f = self._open()
+        if self._format == 'arrow':
+            table = f.slice(start, stop - start).select([c for c in dict.fromkeys(fields) if c in f.column_names])
+        else:
+            pa = ir_datasets.lazy_libs.pyarrow()
+            columns = [c for c in dict.fromkeys(fields) if c in f.schema_arrow.names]
+            tables = []
+            for i in range(f.num_row_groups):
+                rg_start, rg_stop = self._row_group_offsets[i], self._row_group_offsets[i+1]
+                if rg_stop > start and rg_start < stop:
+                    table = f.read_row_group(i, columns=columns)
+                    tables.append(table.slice(max(start - rg_start, 0), min(stop, rg_stop) - max(start, rg_start)))
+            table = pa.concat_tables(tables) if tables else f.schema_arrow.empty_table().select(columns)
+        if step != 1:
+            table = table.take(list(range(0, table.num_rows, step)))
+        return self._to_records(table, fields)
+
+    def _take(self, rows, fields):
+        # returns the records at the (sorted) rows
+        f = self._open()
+        if self._format == 'arrow':
+            return self._to_records(f.select([c for c in dict.fromkeys(fields) if c in f.column_names]).take(rows), fields)
+        columns = [c for c in dict.fromkeys(fields) if c in f.schema_arrow.names]
+        result = []
+        i = 0
+        while i < len(rows):
+            # read each row group only once
+            rg = bisect.bisect_right(self._row_group_offsets, rows[i]) - 1
+            rg_start, rg_stop = self._row_group_offsets[rg], self._row_group_offsets[rg+1]
+            j = i
+            while j < len(rows) and rows[j] < rg_stop:
+                j += 1
+            table = f.read_row_group(rg, columns=columns).take([r - rg_start for r in rows[i:j]])
+            result += self._to_records(table, fields)
+            i = j
+        return result
+
+    def idx(self):
+        if self._idx is None:
+            self._idx = NumpySortedIndex(self.index_path, file_access=self._options.file_access)
+            if len(self._idx) == 0 and self._num_rows() > 0:
+                os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+                with _logger.duration(f'building {self._id_field} index'):
+                    for i, doc_id in enumerate(self._iter_field(self._id_field)):
+                        self._idx.add(doc_id, i)
+                    self._idx.commit()
+        return self._idx
+
+    def _iter_field(self, field):
+        f = self._open()
+        if self._format == 'arrow':
+            yield from f.column(field).to_pylist()
+        else:
+            for batch in f.iter_batches(columns=[field]):
+                yield from batch.column(0).to_pylist()
+
+    def get_many_iter(self, doc_ids):
+        yield from self._get_many(doc_ids, self._doc_cls._fields)
+
+    def _get_many(self, doc_ids, fields):
+        rows = sorted(r for r in self.idx()[list(doc_ids)] if r != -1)
+        if not rows:
+            return []
+        return self._take(rows, fields)
+
+    def get_many(self, doc_ids, field=None):
+        if field is None:
+            return super().get_many(doc_ids)
+        # only read the id & requested columns
+        return {doc_id: value for doc_id, value in self._get_many(doc_ids, (self._id_field, field))}
+
+    def build(self):
+        self.idx()
+
+    def built(self):
+        return os.path.exists(self.path)
+
+    def count(self):
+        return self._num_rows()
+
+    def __iter__(self):
+        return self.docs_iter()
+
+    def docs_iter(self, fields=None):
+        # if fields is provided, yields tuples of only those fields (and only reads those columns)
+        return ArrowDocsIter(self, slice(0, self.count(), 1), tuple(fields) if fields else None)
+
+    def clear_cache(self):
+        self.close()
+        NumpySortedIndex(self.index_path).clear()
+
+    def close(self):
+        if self._idx is not None:
+            self._idx.close()
+            self._idx = None
+        if self._file is not None and self._format == 'parquet':
+            self._file.close()
+        self._file = None
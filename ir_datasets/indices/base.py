@@ -1,6 +1,8 @@
 
+import itertools
 from dataclasses import dataclass, field
 from enum import Enum
+from concurrent.futures import wait, FIRST_COMPLETED
 
 class FileAccess(Enum):
     FILE = 0
@@ -12,6 +14,29 @@ class FileAccess(Enum):
 class DocstoreOptions:
     #: How to access the document content
     file_access: FileAccess = field(default=FileAccess.FILE)
+    #: Number of worker processes used to pickle & compress records when building a docstore
+    build_workers: int = field(default=1)
+    #: Whether docstores that are built locally (PickleLz4FullStore) store each field of a record separately, so that
+    #: lookups of a single field (e.g., get_many(doc_ids, field='url')) skip the others. Only applies when the
+    #: docstore is built; an existing docstore keeps the layout it was built with.
+    field_layout: bool = field(default=False)
+    #: Number of threads used to decompress records in batched lookups
+    lookup_threads: int = field(default=1)
+    #: Number of workers used to search source files concurrently in lookups that span several files (ClueWeb WARC, C4)
+    lookup_workers: int = field(default=1)
+    #: Whether the lookup_workers are threads ('thread') or processes ('process'). C4 always uses threads, which share
+    #: its pool of open files.
+    lookup_worker_type: str = field(default='thread')
+    #: Whether lookups that use lookup_workers return documents in the order they were requested (rather than as
+    #: each source file is finished)
+    lookup_preserve_order: bool = field(default=False)
+    #: Maximum number of documents to keep in an in-process cache (0 for no limit). The in-process cache is only used
+    #: when at least one of memory_cache_entries or memory_cache_bytes is set.
+    memory_cache_entries: int = field(default=0)
+    #: Maximum approximate size (in bytes) of documents to keep in an in-process cache (0 for no limit)
+    memory_cache_bytes: int = field(default=0)
+    #: Eviction policy of the in-process cache ('lru' or 'clock')
+    memory_cache_policy: str = field(default='lru')
 
 
 DEFAULT_DOCSTORE_OPTIONS = DocstoreOptions()
@@ -44,3 +69,40 @@ class Docstore:
 
     def clear_cache(self):
         pass
+
+
+def lookup_parallel(executor, fn, groups, workers):
+    """
+    Yields fn(key, items) for each (key, items) pair of groups, as each one finishes, keeping up to workers*2 of them
+    submitted to executor at a time. (For docstores that look up documents from several source files at once.)
+    """
+    tasks = iter(groups)
+    pending = {executor.submit(fn, key, items) for key, items in itertools.islice(tasks, workers * 2)}
+    try:
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for key, items in itertools.islice(tasks, len(done)):
+                pending.add(executor.submit(fn, key, items))
+            for future in done:
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def lookup_in_request_order(results, doc_ids, doc_groups, id_field_idx=0):
+    """
+    Yields the documents of results ((key, docs) pairs, as each group of documents is finished) in the order of
+    doc_ids. Documents are held back until those requested before them are found (or their groups are finished).
+    doc_groups maps each doc_id to the key of its group.
+    """
+    found, finished = {}, set()
+    doc_ids = iter(doc_ids)
+    next_doc_id = next(doc_ids, None)
+    for key, docs in results:
+        finished.add(key)
+        found.update((doc[id_field_idx], doc) for doc in docs)
+        while next_doc_id is not None and (next_doc_id not in doc_groups or doc_groups[next_doc_id] in finished):
+            if next_doc_id in found:
+                yield found.pop(next_doc_id)
+            next_doc_id = next(doc_ids, None)
@@ -1,7 +1,8 @@
 import os
+from functools import partial
 from contextlib import contextmanager
 import ir_datasets
-from . import Docstore, Lz4PickleLookup, DEFAULT_DOCSTORE_OPTIONS
+from . import Docstore, Lz4PickleLookup, NumpySortedIndex, DEFAULT_DOCSTORE_OPTIONS
 
 
 class CacheDocstore(Docstore):
@@ -9,7 +10,8 @@ class CacheDocstore(Docstore):
         super().__init__(full_store._doc_cls, full_store._id_field, options=options)
         self.full_store = full_store
         self._path = path
-        self.cache = cache_cls(path, self._doc_cls, self._id_field, [self._id_field], file_access=options.file_access)
+        # caches get lots of small transactions, so write them as delta segments of the index
+        self.cache = cache_cls(path, self._doc_cls, self._id_field, [self._id_field], file_access=options.file_access, index_cls=partial(NumpySortedIndex, max_deltas=8))
 
     def get_many_iter(self, doc_ids):
         doc_ids_remaining = set(doc_ids)
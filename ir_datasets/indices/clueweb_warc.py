@@ -1,9 +1,27 @@
 import io
 import os
 import gzip
+import pickle
+import random
+import bisect
+import threading
+from functools import partial
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from contextlib import ExitStack
 import ir_datasets
 from . import Docstore
+from .base import lookup_parallel, lookup_in_request_order
+
+
+_logger = ir_datasets.log.easy()
+
+
+ZDICT_SIZE = 32 * 1024
+
+# number of checkpoint tables that are kept in memory (one per source file)
+CHECKPOINT_TABLE_CACHE_SIZE = 4096
+
 
 class WarcIndexFile:
     def __init__(self, fileobj, mode, doc_id_size=25):
@@ -27,7 +45,7 @@ class WarcIndexFile:
 
     def read(self):
         ldid = self.doc_id_size
-        chunk = self.fileobj.read(ldid + 4 + 4 + 1 + 1 + (32 * 1024) + 4)
+        chunk = self.fileobj.read(ldid + 4 + 4 + 1 + 1 + ZDICT_SIZE + 4)
         if not chunk:
             raise EOFError()
         chunk = io.BytesIO(chunk)
@@ -36,7 +54,7 @@ class WarcIndexFile:
         pos = self.pos + int.from_bytes(chunk.read(4), 'little')
         bits = int.from_bytes(chunk.read(1), 'little')
         byte = int.from_bytes(chunk.read(1), 'little')
-        zdict = chunk.read(32 * 1024)
+        zdict = chunk.read(ZDICT_SIZE)
         out_offset = int.from_bytes(chunk.read(4), 'little')
         state = (zdict, bits, byte)
         self.pos = pos
@@ -65,6 +83,114 @@ class WarcIndexFile:
         self.fileobj.close()
 
 
+class WarcCheckpointTable:
+    """
+    The checkpoints of a WarcIndexFile, split into a sorted table of their doc_ids and positions (held in memory) and
+    their zlib dictionaries (each compressed on its own), so that the checkpoint to start from for a given doc_id is
+    found with a binary search, and only its dictionary is read and decompressed.
+
+    The table file holds the compressed dictionaries, followed by the pickled table and its offset (8 bytes). It is
+    built from the index file on first use, and re-built if the index file changes.
+    """
+    VERSION = 1
+
+    def __init__(self, path, index_path):
+        self.path = path
+        self.index_path = index_path
+        self._table = None
+
+    def _source_info(self):
+        stat = os.stat(self.index_path)
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def _load(self):
+        if self._table is None and os.path.exists(self.path):
+            table = None
+            try:
+                with open(self.path, 'rb') as f:
+                    f.seek(-8, io.SEEK_END)
+                    f.seek(int.from_bytes(f.read(8), 'little'))
+                    table = pickle.load(f)
+            except Exception as ex:
+                _logger.warn(f'unable to read checkpoint table {self.path} ({ex!r}); re-building')
+            if table is not None and table['version'] == self.VERSION and table['source'] == self._source_info():
+                self._table = table
+        return self._table
+
+    def built(self):
+        return self._load() is not None
+
+    def build(self):
+        if self._load() is not None:
+            return
+        lz4 = ir_datasets.lazy_libs.lz4_block()
+        table = {'version': self.VERSION, 'source': self._source_info(), 'doc_ids': [], 'doc_idxs': [], 'pos': [], 'bits': [], 'byte': [], 'out_offsets': [], 'zdict_offsets': [0]}
+        with WarcIndexFile(self.index_path, 'rb') as f_chk, ir_datasets.util.finialized_file(self.path, 'wb') as fout:
+            while f_chk:
+                doc_id, doc_idx, (zdict, bits, byte), pos, out_offset = f_chk.read()
+                fout.write(lz4.block.compress(zdict, store_size=False))
+                table['doc_ids'].append(doc_id)
+                table['doc_idxs'].append(doc_idx)
+                table['pos'].append(pos)
+                table['bits'].append(bits)
+                table['byte'].append(byte)
+                table['out_offsets'].append(out_offset)
+                table['zdict_offsets'].append(fout.tell())
+            pickle.dump(table, fout, protocol=pickle.HIGHEST_PROTOCOL)
+            fout.write(table['zdict_offsets'][-1].to_bytes(8, 'little'))
+        self._table = table
+
+    def find(self, doc_id):
+        """
+        Returns the index of the last checkpoint at or before doc_id, or -1 if doc_id comes before the first one.
+        """
+        return bisect.bisect_right(self._table['doc_ids'], doc_id) - 1
+
+    def doc_id(self, idx):
+        """
+        Returns the doc_id at checkpoint idx, or None if idx is past the last checkpoint.
+        """
+        doc_ids = self._table['doc_ids']
+        return doc_ids[idx] if idx < len(doc_ids) else None
+
+    def checkpoint(self, idx):
+        """
+        Returns the (state, pos, out_offset) of checkpoint idx, like WarcIndexFile.read.
+        """
+        table = self._table
+        start, end = table['zdict_offsets'][idx], table['zdict_offsets'][idx+1]
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            zdict = ir_datasets.lazy_libs.lz4_block().block.decompress(f.read(end - start), uncompressed_size=ZDICT_SIZE)
+        return (zdict, table['bits'][idx], table['byte'][idx]), table['pos'][idx], table['out_offsets'][idx]
+
+
+_checkpoint_tables = OrderedDict()
+_checkpoint_tables_lock = threading.Lock()
+
+
+def checkpoint_table(index_path):
+    """
+    Returns the (built) WarcCheckpointTable of index_path, which is kept in memory for later lookups. Returns None if
+    the table cannot be built (e.g., if the directory of the index is read-only).
+    """
+    with _checkpoint_tables_lock:
+        if index_path in _checkpoint_tables:
+            _checkpoint_tables.move_to_end(index_path)
+            return _checkpoint_tables[index_path]
+    table = WarcCheckpointTable(f'{index_path}.table', index_path)
+    try:
+        table.build()
+    except OSError as ex:
+        _logger.warn(f'unable to build checkpoint table {table.path} ({ex!r}); reading checkpoints from the index instead')
+        table = None
+    with _checkpoint_tables_lock:
+        _checkpoint_tables[index_path] = table
+        while len(_checkpoint_tables) > CHECKPOINT_TABLE_CACHE_SIZE:
+            _checkpoint_tables.popitem(last=False)
+    return table
+
+
 class ClueWebWarcIndex:
     def __init__(self, source_path, index_path, id_field='WARC-TREC-ID', warc_cw09=False):
         self.source_path = source_path
@@ -96,11 +222,70 @@ class ClueWebWarcIndex:
                     if next_checkpoint[2] < 0:
                         next_checkpoint = None # split part way through the header... Skip this doc (will checkpoint in next iteration)
                 doc_idx += 1
+        return doc_idx
 
     def built(self):
         return os.path.exists(self.index_path)
 
+    def verify(self, sample=None, seed=42):
+        """
+        Seeks to (a random sample of) the checkpoints in the index and checks that the first record read from each
+        has the checkpoint's doc_id. Returns a list of (doc_id, error) for the checkpoints that fail.
+        """
+        warc = ir_datasets.lazy_libs.warc_clueweb09() if self.warc_cw09 else ir_datasets.lazy_libs.warc()
+        with WarcIndexFile(self.index_path, 'rb') as f_chk:
+            count = 0
+            while f_chk:
+                f_chk.read()
+                count += 1
+        idxs = range(count)
+        if sample is not None and sample < count:
+            idxs = sorted(random.Random(seed).sample(idxs, sample))
+        failures = []
+        with WarcIndexFile(self.index_path, 'rb') as f_chk:
+            chk_idx = -1
+            for idx in idxs:
+                while chk_idx < idx:
+                    doc_id, doc_idx, state, pos, out_offset = f_chk.read()
+                    chk_idx += 1
+                try:
+                    with self.zlib_state.GzipStateFile(self.source_path) as f:
+                        f.zseek(pos, state)
+                        f.read(out_offset)
+                        found_id = next(d for d in warc.WARCFile(fileobj=f) if d.type != 'warcinfo')[self.id_field]
+                    if found_id != doc_id:
+                        failures.append((doc_id, f'found {found_id}'))
+                except Exception as ex:
+                    failures.append((doc_id, repr(ex)))
+        return failures
+
     def get_many_iter(self, doc_ids, docs_obj):
+        table = checkpoint_table(self.index_path)
+        if table is None:
+            yield from self._get_many_iter_stream(doc_ids, docs_obj)
+            return
+        doc_ids = sorted(set(doc_ids))
+        with self.zlib_state.GzipStateFile(self.source_path) as f:
+            while doc_ids:
+                chk_idx = table.find(doc_ids[0])
+                if chk_idx >= 0:
+                    state, pos, out_offset = table.checkpoint(chk_idx)
+                    f.zseek(pos, state)
+                    f.read(out_offset)
+                next_doc_id = table.doc_id(chk_idx + 1)
+                for doc in docs_obj._docs_ctxt_iter_warc(f):
+                    while doc_ids and doc.doc_id >= doc_ids[0] and (next_doc_id is None or doc_ids[0] < next_doc_id):
+                        if doc.doc_id == doc_ids[0]:
+                            yield doc
+                        doc_ids = doc_ids[1:] # pop -- either not found or found
+                    if not doc_ids or (next_doc_id is not None and doc_ids[0] >= next_doc_id):
+                        break
+                else:
+                    # reached the end of the file; the remaining doc_ids before the next checkpoint are not found
+                    doc_ids = [d for d in doc_ids if next_doc_id is not None and d >= next_doc_id]
+
+    def _get_many_iter_stream(self, doc_ids, docs_obj):
+        # reads through the checkpoints in the index file (when a checkpoint table is not available)
         doc_ids = sorted(set(doc_ids))
         with ExitStack() as stack:
             f = stack.enter_context(self.zlib_state.GzipStateFile(self.source_path))
@@ -137,7 +322,7 @@ class ClueWebWarcDocstore(Docstore):
         self.warc_docs = warc_docs
 
     def get_many_iter(self, doc_ids):
-        result = {}
+        doc_ids = list(dict.fromkeys(doc_ids)) # de-duplicated, in the order requested
         files_to_search = {}
         for doc_id in doc_ids:
             source_file = self.warc_docs._docs_id_to_source_file(doc_id)
@@ -145,19 +330,56 @@ class ClueWebWarcDocstore(Docstore):
                 if source_file not in files_to_search:
                     files_to_search[source_file] = []
                 files_to_search[source_file].append(doc_id)
-        for source_file, doc_ids in files_to_search.items():
-            doc_ids = sorted(doc_ids)
-            checkpoint_file = self.warc_docs._docs_source_file_to_checkpoint(source_file)
-            if checkpoint_file:
-                index = ClueWebWarcIndex(source_file, checkpoint_file)
-                yield from index.get_many_iter(doc_ids, self.warc_docs)
+        workers = self._options.lookup_workers
+        if workers > 1 and len(files_to_search) > 1:
+            if self._options.lookup_worker_type == 'process':
+                executor = ProcessPoolExecutor(workers, initializer=_lookup_init, initargs=(self.warc_docs,))
+                fn = _lookup_source_file
+            elif self._options.lookup_worker_type == 'thread':
+                executor = ThreadPoolExecutor(workers)
+                fn = partial(_lookup_source_file, warc_docs=self.warc_docs)
             else:
-                for doc in self.warc_docs._docs_ctxt_iter_warc(source_file):
-                    if doc_ids[0] == doc.doc_id:
-                        yield doc
-                        doc_ids = doc_ids[1:]
-                        if not doc_ids:
-                            break # file finished
+                raise ValueError(f'unknown lookup_worker_type {self._options.lookup_worker_type!r} (expected thread or process)')
+            try:
+                results = lookup_parallel(executor, fn, files_to_search.items(), workers)
+                if self._options.lookup_preserve_order:
+                    doc_files = {doc_id: source_file for source_file, file_doc_ids in files_to_search.items() for doc_id in file_doc_ids}
+                    yield from lookup_in_request_order(results, doc_ids, doc_files, self._id_field_idx)
+                else:
+                    for source_file, docs in results:
+                        yield from docs
+            finally:
+                executor.shutdown(wait=True, cancel_futures=True)
+        else:
+            for source_file, file_doc_ids in files_to_search.items():
+                yield from _search_source_file(self.warc_docs, source_file, file_doc_ids)
+
+
+def _search_source_file(warc_docs, source_file, doc_ids):
+    doc_ids = sorted(doc_ids)
+    checkpoint_file = warc_docs._docs_source_file_to_checkpoint(source_file)
+    if checkpoint_file:
+        index = ClueWebWarcIndex(source_file, checkpoint_file)
+        yield from index.get_many_iter(doc_ids, warc_docs)
+    else:
+        for doc in warc_docs._docs_ctxt_iter_warc(source_file):
+            if doc_ids[0] == doc.doc_id:
+                yield doc
+                doc_ids = doc_ids[1:]
+                if not doc_ids:
+                    break # file finished
+
+
+_lookup_warc_docs = None
+
+
+def _lookup_init(warc_docs):
+    global _lookup_warc_docs
+    _lookup_warc_docs = warc_docs
+
+
+def _lookup_source_file(source_file, doc_ids, warc_docs=None):
+    return source_file, list(_search_source_file(warc_docs or _lookup_warc_docs, source_file, doc_ids))
 
 class WarcIter:
     def __init__(self, warc_docs, slice):
@@ -236,6 +458,10 @@ class WarcIter:
     def __del__(self):
         self.close()
 
+    def seekable(self):
+        # skips whole files using their record counts, and within files using checkpoints (if available)
+        return True
+
     def __getitem__(self, key):
         if isinstance(key, slice):
             # it[start:stop:step]
@@ -0,0 +1,130 @@
+import os
+import json
+import mmap
+import shutil
+import itertools
+import ir_datasets
+
+
+def write_ids(path, ids, offsets_path=None):
+    # Writes IDs one per line (they never contain newlines, since they are separated by whitespace in the source
+    # files), and optionally the byte offset of each line (int64, ending with the file size)
+    np = ir_datasets.lazy_libs.numpy()
+    data = ''.join(f'{i}\n' for i in ids).encode()
+    with open(path, 'wb') as f:
+        f.write(data)
+    if offsets_path is not None:
+        starts = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == ord('\n')) + 1
+        np.concatenate([[0], starts]).astype(np.int64).tofile(offsets_path)
+
+
+def read_ids(path):
+    with open(path, 'rb') as f:
+        return f.read().decode().split('\n')[:-1]
+
+
+def replace_dir(src, dst):
+    # Moves the directory src to dst, replacing the directory that's there (if any). Readers see either the old or
+    # the new directory (or briefly neither), never a mix of the two.
+    try:
+        os.replace(src, dst)
+        return
+    except OSError:
+        pass # dst exists
+    old = f'{dst}.old{os.getpid()}'
+    shutil.rmtree(old, ignore_errors=True)
+    try:
+        os.replace(dst, old)
+    except FileNotFoundError:
+        pass # moved by another process in the meantime
+    try:
+        os.replace(src, dst)
+    except OSError:
+        # another process put its own copy in place in the meantime; either one will do
+        shutil.rmtree(src, ignore_errors=True)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+class CompiledStore:
+    """
+    Base class of stores that hold a compiled copy of records from source files (ScoredDocsStore and
+    DocPairsStore). The store is a directory of flat files that ends with info.json, which holds the sizes and
+    mtimes of the source files, so that the store is re-built if they change.
+
+    The store is built from init_iter_fn on first use, reading it chunk_size records at a time. It's built in a
+    temporary directory that then replaces the one at path, so concurrent builds do not interfere with one another.
+    Subclasses write the store's files in _build(path) and return the rest of its info.
+    """
+    VERSION = 1
+
+    def __init__(self, path, init_iter_fn, data_cls, source_paths, chunk_size=1_000_000):
+        self.path = str(path)
+        self.init_iter_fn = init_iter_fn
+        self.data_cls = data_cls
+        self.source_paths = [str(p) for p in source_paths]
+        self.chunk_size = chunk_size
+        self._info = None
+        self._id_mmaps = {}
+
+    def _source_info(self):
+        result = []
+        for path in self.source_paths:
+            stat = os.stat(path)
+            result.append([path, stat.st_size, stat.st_mtime_ns])
+        return result
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        if self._info is None:
+            info_path = self._file('info.json')
+            if os.path.exists(info_path):
+                with open(info_path, 'rt') as f:
+                    info = json.load(f)
+                if info['version'] == self.VERSION and info['source'] == self._source_info():
+                    self._info = info
+        return self._info
+
+    def built(self):
+        return self._load() is not None
+
+    def build(self):
+        if self._load() is not None:
+            return
+        tmp_path = f'{self.path}.tmp{os.getpid()}'
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+        try:
+            info = {'version': self.VERSION, 'source': self._source_info()}
+            info.update(self._build(tmp_path))
+            with open(os.path.join(tmp_path, 'info.json'), 'wt') as f:
+                json.dump(info, f)
+            replace_dir(tmp_path, self.path)
+        except:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        self._info = info
+
+    def _build(self, path):
+        raise NotImplementedError()
+
+    def _chunks(self):
+        # the records from init_iter_fn, in lists of up to chunk_size records
+        it = iter(self.init_iter_fn())
+        return iter(lambda: list(itertools.islice(it, self.chunk_size)), [])
+
+    def _id_reader(self, name):
+        # Returns a function that reads ID number idx from {name}_ids.txt directly (using {name}_ids.offsets.bin),
+        # rather than loading all of the IDs. For when only a handful of IDs are needed.
+        if name not in self._id_mmaps:
+            np = ir_datasets.lazy_libs.numpy()
+            with open(self._file(f'{name}_ids.txt'), 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            offsets = np.memmap(self._file(f'{name}_ids.offsets.bin'), dtype=np.int64, mode='r')
+            self._id_mmaps[name] = (data, offsets)
+        data, offsets = self._id_mmaps[name]
+        def reader(idx):
+            return data[offsets[idx]:offsets[idx+1]-1].decode()
+        return reader
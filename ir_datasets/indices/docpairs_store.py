@@ -0,0 +1,173 @@
+import os
+from functools import partial
+import ir_datasets
+from .compiled_store import CompiledStore, write_ids, read_ids
+
+
+_logger = ir_datasets.log.easy()
+
+
+# number of rounds of the Feistel network used to shuffle records
+SHUFFLE_ROUNDS = 6
+
+# when reading fewer than this many records, IDs are read directly from the files rather than loading all of them
+LOAD_IDS_MIN_RECORDS = 10_000
+
+
+class DocPairsStore(CompiledStore):
+    """
+    A compiled copy of a set of docpairs (records of a query ID followed by doc IDs, like GenericDocPair), so that
+    they do not need to be parsed each time they are used, and so that any record can be read directly.
+
+    The store is a directory of flat files that are memory-mapped when read:
+     - pairs.bin: the records, as an array of int32 ID numbers with one row per record and one column per field
+     - query_ids.txt, doc_ids.txt: the IDs, one per line, numbered by the order they first appear (the first field
+       uses the query IDs, and the rest share the doc IDs)
+     - query_ids.offsets.bin, doc_ids.offsets.bin: the byte offset of each line of the ID files (int64, ending with
+       the file size), so that a few IDs can be read without loading all of them
+     - info.json: holds the sizes of the source files (see CompiledStore)
+    """
+    def __init__(self, path, init_iter_fn, data_cls, source_paths, chunk_size=1_000_000):
+        super().__init__(path, init_iter_fn, data_cls, source_paths, chunk_size)
+        self._pairs = None
+        self._ids = {}
+
+    def _build(self, path):
+        np = ir_datasets.lazy_libs.numpy()
+        file = partial(os.path.join, path)
+        width = len(self.data_cls._fields)
+        query_ids, doc_ids = {}, {}
+        count = 0
+        with _logger.duration('building docpairs store'), open(file('pairs.bin'), 'wb') as fpairs:
+            for chunk in self._chunks():
+                pairs = np.empty((len(chunk), width), dtype=np.int32)
+                pairs[:, 0] = [query_ids.setdefault(r[0], len(query_ids)) for r in chunk]
+                for i in range(1, width):
+                    pairs[:, i] = [doc_ids.setdefault(r[i], len(doc_ids)) for r in chunk]
+                pairs.tofile(fpairs)
+                count += len(chunk)
+            write_ids(file('query_ids.txt'), query_ids, file('query_ids.offsets.bin'))
+            write_ids(file('doc_ids.txt'), doc_ids, file('doc_ids.offsets.bin'))
+        return {'count': count, 'width': width, 'query_count': len(query_ids), 'doc_count': len(doc_ids)}
+
+    def _pairs_array(self):
+        if self._pairs is None:
+            np = ir_datasets.lazy_libs.numpy()
+            shape = (self._info['count'], self._info['width'])
+            if shape[0] == 0:
+                self._pairs = np.zeros(shape, dtype=np.int32)
+            else:
+                self._pairs = np.memmap(self._file('pairs.bin'), dtype=np.int32, mode='r', shape=shape)
+        return self._pairs
+
+    def _id_getter(self, name, record_count):
+        # Returns a function that maps ID numbers to IDs. For a handful of records, the IDs are read directly rather
+        # than loading all of them.
+        if name in self._ids or record_count >= LOAD_IDS_MIN_RECORDS or self._info[f'{name}_count'] == 0:
+            if name not in self._ids:
+                self._ids[name] = read_ids(self._file(f'{name}_ids.txt'))
+            return self._ids[name].__getitem__
+        return self._id_reader(name)
+
+    def _records(self, rows):
+        # rows: an array of records' ID numbers (one row per record)
+        query_getter = self._id_getter('query', len(rows))
+        doc_getter = self._id_getter('doc', len(rows))
+        columns = [map(query_getter, rows[:, 0].tolist())]
+        columns += [map(doc_getter, rows[:, i].tolist()) for i in range(1, rows.shape[1])]
+        return map(partial(tuple.__new__, self.data_cls), zip(*columns)) # skips the NamedTuple's __new__
+
+    def __len__(self):
+        self.build()
+        return self._info['count']
+
+    def __iter__(self):
+        self.build()
+        return DocPairsIter(self, slice(0, self._info['count']))
+
+
+class DocPairsIter:
+    """
+    Iterates over the records of a DocPairsStore. Supports indexing and slicing (without reading the records that
+    are skipped), len(), and shuffled(seed), which iterates over the records in a random order.
+    """
+    def __init__(self, store, slice):
+        self.store = store
+        self.slice = slice
+        self._records = None
+
+    def __len__(self):
+        return len(range(self.slice.start, self.slice.stop, self.slice.step or 1))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._records is None:
+            self._records = self._iter_records()
+        return next(self._records)
+
+    def _iter_records(self):
+        pairs = self.store._pairs_array()
+        start, stop, step = self.slice.start, self.slice.stop, self.slice.step or 1
+        chunk_span = self.store.chunk_size * step
+        for chunk_start in range(start, stop, chunk_span):
+            yield from self.store._records(pairs[chunk_start:min(chunk_start + chunk_span, stop):step])
+
+    def shuffled(self, seed=None):
+        """
+        Returns an iterator over the records in a random order, which is the same each time for a given seed. The
+        order is computed on the fly (with a keyed bijection over the record positions), so neither the records
+        nor the order need to fit in memory.
+        """
+        np = ir_datasets.lazy_libs.numpy()
+        keys = np.random.default_rng(seed).integers(0, 2**63, size=SHUFFLE_ROUNDS, dtype=np.uint64)
+        return self._iter_shuffled(keys)
+
+    def _iter_shuffled(self, keys):
+        np = ir_datasets.lazy_libs.numpy()
+        pairs = self.store._pairs_array()
+        count, chunk_size = len(self), self.store.chunk_size
+        for chunk_start in range(0, count, chunk_size):
+            positions = _permute(np.arange(chunk_start, min(chunk_start + chunk_size, count), dtype=np.uint64), count, keys)
+            yield from self.store._records(pairs[self.slice.start + positions * (self.slice.step or 1)])
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            # it[start:stop:step]
+            new_slice = ir_datasets.util.apply_sub_slice(self.slice, key)
+            return DocPairsIter(self.store, new_slice)
+        elif isinstance(key, int):
+            # it[index]
+            new_slice = ir_datasets.util.slice_idx(self.slice, key)
+            new_it = DocPairsIter(self.store, new_slice)
+            try:
+                return next(new_it)
+            except StopIteration as e:
+                raise IndexError(e)
+        raise TypeError('key must be int or slice')
+
+
+def _permute(values, count, keys):
+    # Maps positions in [0, count) to a permutation of them. A Feistel network over the smallest even number of bits
+    # that covers count is a bijection over [0, 2**bits); values that it maps outside of [0, count) are mapped again
+    # ("cycle walking") until they fall inside, which keeps it a bijection over [0, count).
+    np = ir_datasets.lazy_libs.numpy()
+    half = max(1, ((count - 1).bit_length() + 1) // 2)
+    shift, mask = np.uint64(half), np.uint64((1 << half) - 1)
+    def encrypt(x):
+        left, right = x >> shift, x & mask
+        for key in keys:
+            # the splitmix64 finalizer, keyed by the round key
+            mixed = right ^ key
+            mixed = (mixed ^ (mixed >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            mixed = (mixed ^ (mixed >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            mixed ^= mixed >> np.uint64(31)
+            left, right = right, left ^ (mixed & mask)
+        return (left << shift) | right
+    result = encrypt(values)
+    outside = result >= np.uint64(count)
+    while outside.any():
+        result[outside] = encrypt(result[outside])
+        outside = result >= np.uint64(count)
+    return result.astype(np.int64)
@@ -0,0 +1,169 @@
+import io
+import os
+import pickle
+import ir_datasets
+
+
+_logger = ir_datasets.log.easy()
+
+
+VERSION = 1
+
+
+class GzipCheckpointFile(io.BufferedIOBase):
+    # Wraps a zlib_state.GzipStateFile, which doesn't report itself as readable (needed for io.TextIOWrapper)
+    def __init__(self, f):
+        self.f = f
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        return self.f.read(size)
+
+    def read1(self, size=-1):
+        return self.f.read1(size)
+
+    def readline(self, size=-1):
+        return self.f.readline()
+
+    def close(self):
+        if not self.closed:
+            self.f.close()
+        super().close()
+
+
+class GzipCheckpointIndex:
+    """
+    A zran-style random-access index for a gzip file. It holds the state of the decompressor at deflate block
+    boundaries (about every checkpoint_freq bytes of compressed input), along with the line that begins soonest
+    after each one, so that reading can resume part-way through the file rather than decompressing it from the
+    start. Lines are counted like FileLineIter does (i.e., blank lines are skipped).
+
+    The index is built lazily: seeking past the last checkpoint reads through the file (as would be needed
+    without the index anyway) and records checkpoints along the way. It's saved (by default) at
+    derived_path(path, '.chk.pkl.lz4').
+    """
+    def __init__(self, path, index_path=None, checkpoint_freq=4*1024*1024):
+        self.path = str(path)
+        self.index_path = index_path or ir_datasets.util.derived_path(self.path, '.chk.pkl.lz4')
+        self.checkpoint_freq = checkpoint_freq
+        self._data = None
+
+    def _source_info(self):
+        stat = os.stat(self.path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def _load(self):
+        if self._data is None:
+            data = None
+            if os.path.exists(self.index_path):
+                try:
+                    with ir_datasets.lazy_libs.lz4_frame().frame.open(self.index_path, 'rb') as f:
+                        data = pickle.load(f)
+                except Exception as ex:
+                    _logger.warn(f'unable to read checkpoint index {self.index_path} ({ex!r}); re-building')
+                if data is not None and (data['version'] != VERSION or data['source'] != self._source_info()):
+                    data = None # source file changed
+            if data is None:
+                data = {
+                    'version': VERSION,
+                    'source': self._source_info(),
+                    'checkpoints': [], # (line_idx, pos, state, offset)
+                    'count': None, # number of lines, once the whole file is indexed
+                    'supported': True,
+                }
+            self._data = data
+        return self._data
+
+    def _save(self):
+        lz4 = ir_datasets.lazy_libs.lz4_frame()
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            with ir_datasets.util.finialized_file(self.index_path, 'wb', unique_tmp=True) as f, lz4.frame.LZ4FrameFile(f, 'wb') as fout:
+                pickle.dump(self._data, fout)
+        except OSError as ex:
+            # e.g., the source is in a read-only directory; the checkpoints are still used by this instance
+            _logger.warn(f'unable to save checkpoint index {self.index_path} ({ex!r})')
+
+    def supported(self):
+        # Files with several gzip members (e.g., produced by concatenating gzip files) cannot be indexed
+        return self._load()['supported']
+
+    def built(self):
+        return self._load()['count'] is not None
+
+    def build(self):
+        """
+        Indexes the entire file.
+        """
+        if not self.built():
+            f = self.open(float('inf'))
+            if f is not None:
+                f.close()
+
+    def count(self):
+        """
+        Returns the number of lines in the file, or None if it's not indexed through to the end.
+        """
+        return self._load()['count']
+
+    def __len__(self):
+        return len(self._load()['checkpoints'])
+
+    def open(self, line_idx):
+        """
+        Returns a binary file positioned at the start of line line_idx (or at the end of the file, if it has
+        fewer lines). Returns None if the file cannot be indexed.
+        """
+        data = self._load()
+        if not data['supported']:
+            return None
+        checkpoints = data['checkpoints']
+        f = ir_datasets.lazy_libs.zlib_state().GzipStateFile(self.path, keep_last_state=True)
+        try:
+            current_idx, start_pos = 0, 0
+            for i in range(len(checkpoints) - 1, -1, -1):
+                checkpoint_idx, pos, state, offset = checkpoints[i]
+                if checkpoint_idx <= line_idx:
+                    f.zseek(pos, state)
+                    f.read(offset)
+                    current_idx, start_pos = checkpoint_idx, pos
+                    break
+            # only record new checkpoints when reading beyond the last one
+            extending = not checkpoints or current_idx == checkpoints[-1][0]
+            last_pos, added = start_pos, False
+            while current_idx < line_idx:
+                # (positions are relative to where the decompressor started)
+                if extending and f.last_state_pos is not None and start_pos + f.last_state_pos >= last_pos + self.checkpoint_freq:
+                    offset = f.output_pos - f.last_state_output_pos
+                    if offset >= 0: # otherwise, the block boundary is part-way through the buffer; try again next line
+                        last_pos, added = start_pos + f.last_state_pos, True
+                        checkpoints.append((current_idx, last_pos, f.last_state, offset))
+                line = f.readline()
+                if not line:
+                    break
+                if line not in (b'\n', b'\r\n'): # FileLineIter skips blank lines
+                    current_idx += 1
+            else:
+                if added:
+                    self._save()
+                return GzipCheckpointFile(f)
+            # reached the end of the file
+            if start_pos == 0:
+                end_pos = f.raw.decomp.total_in()
+            else:
+                end_pos = start_pos + f.raw.decomp.total_in() + 8 # raw deflate stream excludes the 8-byte trailer
+            if end_pos != data['source'][0]:
+                _logger.info(f'{self.path} has multiple gzip members; it cannot be indexed')
+                data['checkpoints'], data['supported'] = [], False
+            elif extending:
+                data['count'] = current_idx
+            self._save()
+            if not data['supported']:
+                f.close()
+                return None
+            return GzipCheckpointFile(f)
+        except:
+            f.close()
+            raise
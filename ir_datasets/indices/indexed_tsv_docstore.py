@@ -140,12 +140,12 @@ class IndexedTsvKeyValueStore:
             l_field, l_text = cols
             if field is Ellipsis:
                 if self._value_encoder == 'json':
-                    l_text = json.loads(l_text)
+                    l_text = ir_datasets.lazy_libs.json_backend().loads(l_text)
                 record[l_field] = l_text
             else:
                 if l_field == field:
                     if self._value_encoder == 'json':
-                        l_text = json.loads(l_text)
+                        l_text = ir_datasets.lazy_libs.json_backend().loads(l_text)
                     return l_text
         if field is Ellipsis:
             if not record:
@@ -171,7 +171,7 @@ class IndexedTsvKeyValueStore:
                 doc = {}
             else:
                 if self._value_encoder == 'json':
-                    cols[1] = json.loads(cols[1])
+                    cols[1] = ir_datasets.lazy_libs.json_backend().loads(cols[1])
                 doc[cols[0]] = cols[1]
         if doc is not None:
             yield key, doc
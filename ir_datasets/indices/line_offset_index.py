@@ -0,0 +1,83 @@
+import os
+import ir_datasets
+from . import FileAccess
+
+
+_logger = ir_datasets.log.easy()
+
+
+class LineOffsetIndex:
+    """
+    The byte offset of the start of each line in an (uncompressed) text file, so that reading can jump straight
+    to a given line. Lines are counted like FileLineIter does (i.e., blank lines are skipped). The offsets are
+    stored as a numpy int64 array (by default, at derived_path(path, '.lines')), followed by the size of the file,
+    which is used to detect when the file has changed.
+    """
+    def __init__(self, path, index_path=None, file_access=FileAccess.MMAP, chunk_size=64*1024*1024):
+        self.path = str(path)
+        self.index_path = index_path or ir_datasets.util.derived_path(self.path, '.lines')
+        self.file_access = file_access
+        self.chunk_size = chunk_size
+        self.mmap = None
+        self.np = None
+
+    def _lazy_load(self):
+        if self.np is None:
+            self.np = ir_datasets.lazy_libs.numpy()
+        if self.mmap is None and os.path.exists(self.index_path):
+            count = os.path.getsize(self.index_path) // 8
+            if self.file_access == FileAccess.MEMORY:
+                mmap = self.np.fromfile(self.index_path, dtype='int64', count=count)
+            else:
+                mmap = self.np.memmap(self.index_path, dtype='int64', mode='r', shape=(count,))
+            if count > 0 and mmap[-1] == os.path.getsize(self.path):
+                self.mmap = mmap
+
+    def built(self):
+        self._lazy_load()
+        return self.mmap is not None
+
+    def build(self):
+        if self.built():
+            return
+        np = ir_datasets.lazy_libs.numpy()
+        size = os.path.getsize(self.path)
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        with _logger.duration(f'building line index for {self.path}'), \
+             ir_datasets.util.finialized_file(self.index_path, 'wb', unique_tmp=True) as fout:
+            if size > 0:
+                data = np.memmap(self.path, dtype='uint8', mode='r', shape=(size,))
+                for start in range(0, size, self.chunk_size):
+                    starts = np.flatnonzero(data[start:start+self.chunk_size] == ord('\n')) + (start + 1)
+                    if start == 0:
+                        starts = np.concatenate([[0], starts])
+                    starts = starts[starts < size]
+                    # FileLineIter skips blank lines (\n or \r\n)
+                    first = data[starts]
+                    second = data[np.minimum(starts + 1, size - 1)]
+                    blank = (first == ord('\n')) | ((first == ord('\r')) & (second == ord('\n')) & (starts + 1 < size))
+                    starts[~blank].astype('int64').tofile(fout)
+                del data
+            np.array([size], dtype='int64').tofile(fout)
+
+    def __getitem__(self, idx):
+        # byte offset of line idx
+        self._lazy_load()
+        return int(self.mmap[idx])
+
+    def __len__(self):
+        # number of lines
+        self._lazy_load()
+        if self.mmap is None:
+            return 0
+        return self.mmap.shape[0] - 1
+
+    def close(self):
+        if self.mmap is not None:
+            del self.mmap
+            self.mmap = None
+
+    def clear(self):
+        self.close()
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
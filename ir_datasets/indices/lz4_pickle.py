@@ -1,7 +1,13 @@
-import io
 import mmap
 import os
 import pickle
+import struct
+import itertools
+import multiprocessing
+from functools import partial
+from threading import Lock
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 from ir_datasets.indices import DEFAULT_DOCSTORE_OPTIONS, FileAccess
 
@@ -16,29 +22,162 @@ from . import Docstore, NumpySortedIndex, NumpyPosIndex
 
 _logger = ir_datasets.log.easy()
 
+# In the block format, positions are encoded as (block_start << BLOCK_OFFSET_BITS) | offset_in_block
+BLOCK_OFFSET_BITS = 20
+MAX_DICT_SIZE = 64 * 1024 # LZ4 only uses the last 64KB of a dictionary
+# Batched lookups fetch records that are within COALESCE_GAP bytes of one another with a single read
+COALESCE_GAP = 16 * 1024
+BATCH_SIZE = 64
+# In the field layout, fields that pickle to fewer than FIELD_COMPRESS_MIN bytes are stored uncompressed,
+# which is marked by FIELD_RAW_FLAG in their end offset
+FIELD_COMPRESS_MIN = 128
+FIELD_RAW_FLAG = 1 << 31
+
+
+def _positional_reader(binf, lock):
+    # Returns read_at(pos, length) for binf, which does not use (or change) a file position, so it can
+    # be used by several threads at once.
+    if isinstance(binf, (bytes, mmap.mmap)):
+        return lambda pos, length: binf[pos:pos+length]
+    if hasattr(os, "pread"):
+        fileno = binf.fileno()
+        return lambda pos, length: os.pread(fileno, length, pos)
+    def read_at(pos, length): # not available on Windows
+        with lock:
+            binf.seek(pos)
+            return binf.read(length)
+    return read_at
+
+
+def _stream_reader(f):
+    # Returns read_at(pos, length) for a file that only a single reader uses. When reading in sequence,
+    # this is faster than positional reads because the seek is usually within the file's buffer.
+    def read_at(pos, length):
+        f.seek(pos)
+        return f.read(length)
+    return read_at
+
+
+def _content_at(read_at, pos):
+    # returns the content of the (length-prefixed) record or block at pos
+    content_length = int.from_bytes(read_at(pos, 4), "little")
+    return read_at(pos + 4, content_length)
 
-def _read_next(f, data_cls):
+
+def _decode_record(content, data_cls, field_idxs=None, field_layout=False):
+    # Decodes a record. If field_idxs is provided, only returns a tuple of those fields. In the field
+    # layout, the other fields are not even decompressed.
     lz4 = ir_datasets.lazy_libs.lz4_block()
-    content_length = int.from_bytes(f.read(4), "little")
-    content = f.read(content_length)
-    content = lz4.block.decompress(content)
-    content = pickle.loads(content)
-    return data_cls(*content)
+    if not field_layout:
+        record = pickle.loads(lz4.block.decompress(content))
+        if field_idxs is None:
+            return data_cls._make(record)
+        return tuple(record[i] for i in field_idxs)
+    # field layout: the end offset of each field (4 bytes each), followed by each field
+    count = len(data_cls._fields)
+    header = 4 * count
+    ends = struct.unpack_from(f"<{count}I", content)
+    content = memoryview(content)
+    def field(i):
+        start = header + (ends[i-1] & ~FIELD_RAW_FLAG if i > 0 else 0)
+        end = ends[i]
+        if end & FIELD_RAW_FLAG:
+            return pickle.loads(content[start:header + (end & ~FIELD_RAW_FLAG)])
+        return pickle.loads(lz4.block.decompress(content[start:header + end]))
+    if field_idxs is None:
+        return data_cls._make(field(i) for i in range(count))
+    return tuple(field(i) for i in field_idxs)
+
+
+def _decompress_block(content, dictionary):
+    lz4 = ir_datasets.lazy_libs.lz4_block()
+    return lz4.block.decompress(content, dict=dictionary)
 
 
-def _skip_next(f):
-    content_length = int.from_bytes(f.read(4), "little")
-    f.seek(content_length, io.SEEK_CUR)
+def _block_record(block, offset, data_cls, field_idxs=None):
+    content_length = int.from_bytes(block[offset:offset+4], "little")
+    content = pickle.loads(block[offset+4:offset+4+content_length])
+    if field_idxs is not None:
+        return tuple(content[i] for i in field_idxs)
+    return data_cls(*content)
 
 
-def _write_next(f, record):
+def _decode_batch(data_cls, contents, field_idxs=None, field_layout=False):
+    return [_decode_record(content, data_cls, field_idxs, field_layout) for content in contents]
+
+
+def _coalesced_read_iter(read_at, poss, read_ahead):
+    # Yields the compressed records found at the (sorted) poss. Nearby records are fetched with a
+    # single read, rather than a seek & two reads per record. read_ahead is the expected size of
+    # the final record of each read.
+    i = 0
+    while i < len(poss):
+        j = i
+        while j + 1 < len(poss) and poss[j + 1] - poss[j] <= COALESCE_GAP:
+            j += 1
+        start = poss[i]
+        chunk = read_at(start, poss[j] - start + read_ahead)
+        for pos in poss[i:j+1]:
+            offset = pos - start
+            if offset + 4 > len(chunk):
+                chunk += read_at(start + len(chunk), offset + 4 - len(chunk))
+            end = offset + 4 + int.from_bytes(chunk[offset:offset+4], "little")
+            if end > len(chunk):
+                chunk += read_at(start + len(chunk), end - len(chunk))
+            yield chunk[offset+4:end]
+        i = j + 1
+
+
+def _buffer_read_iter(buf, poss):
+    # Yields the compressed records found at poss in buf (for mmap and in-memory access).
+    for pos in poss:
+        end = pos + 4 + int.from_bytes(buf[pos:pos+4], "little")
+        yield bytes(buf[pos+4:end])
+
+
+def _encode_next(record, field_layout=False):
     lz4 = ir_datasets.lazy_libs.lz4_block()
-    content = tuple(record)
-    content = pickle.dumps(content)
-    content = lz4.block.compress(content, store_size=True)
+    if field_layout:
+        # each field is stored separately, so that it can be decoded on its own
+        fields, ends, end = [], [], 0
+        for value in record:
+            field = pickle.dumps(value)
+            raw = len(field) < FIELD_COMPRESS_MIN
+            if not raw:
+                field = lz4.block.compress(field, store_size=True)
+            end += len(field)
+            fields.append(field)
+            ends.append(end | FIELD_RAW_FLAG if raw else end)
+        content = struct.pack(f"<{len(ends)}I", *ends) + b"".join(fields)
+    else:
+        content = tuple(record)
+        content = pickle.dumps(content)
+        content = lz4.block.compress(content, store_size=True)
     content_length = len(content)
-    f.write(content_length.to_bytes(4, "little"))
-    f.write(content)
+    return content_length.to_bytes(4, "little") + content
+
+
+def _encode_batch(records, field_layout=False):
+    return [_encode_next(record, field_layout) for record in records]
+
+
+def _write_next(f, record, field_layout=False):
+    f.write(_encode_next(record, field_layout))
+
+
+def _parallel_encode_iter(it, workers, batch_size=1000, field_layout=False):
+    # Yields (record, encoded_record) pairs in the same order as it. Records are grouped into batches
+    # that are pickled & compressed by a pool of worker processes, but only a bounded number of
+    # batches are in flight at once (the approach from HtmlDocExtractor) to limit memory usage.
+    it = iter(it)
+    pending = deque()
+    def batches():
+        for batch in iter(lambda: list(itertools.islice(it, batch_size)), []):
+            pending.append(batch)
+            yield [tuple(r) for r in batch]
+    with multiprocessing.Pool(workers) as pool:
+        for encoded in ir_datasets.util.bounded_imap(pool, partial(_encode_batch, field_layout=field_layout), batches(), workers * 2):
+            yield from zip(pending.popleft(), encoded)
 
 
 def safe_str(s):
@@ -46,18 +185,23 @@ def safe_str(s):
 
 
 class Lz4PickleIter:
-    def __init__(self, lookup, slice):
+    def __init__(self, lookup, slice, field_idxs=None):
         self.next_index = 0
         self.lookup = lookup
         self.slice = slice
+        self.field_idxs = field_idxs # only return these fields (as a tuple)
         self.bin = None
+        self.read_at = None
+        self.block_cache = [None, None] # (position, content) of the most recently-read block
         self.pos_idx = None
 
     def __next__(self):
         if self.slice.start >= self.slice.stop:
+            self.close()
             raise StopIteration
-        if self.bin is None:
-            self.bin = self.lookup.bin()
+        if self.read_at is None:
+            # each iterator gets its own reader, so iterators can be used from different threads
+            self.read_at, self.bin = self.lookup._iter_reader()
         # Fast -- lookup keeps track of position of each index
         if self.pos_idx is None:
             self.pos_idx = self.lookup.pos()
@@ -68,12 +212,9 @@ class Lz4PickleIter:
             # start of the iter (self.next_index == self.slice.start == 0)
             new_pos = 0
         
-        self.bin.seek(
-            new_pos
-        )  # this seek is smart -- if alrady in buffer, skips to that point
         self.next_index = self.slice.start
         
-        result = _read_next(self.bin, self.lookup._doc_cls)
+        result = self.lookup._read_at(self.read_at, new_pos, self.field_idxs, self.block_cache)
         self.next_index += 1
         self.slice = slice(
             self.slice.start + (self.slice.step or 1), self.slice.stop, self.slice.step
@@ -83,24 +224,26 @@ class Lz4PickleIter:
     def __iter__(self):
         return self
 
+    def close(self):
+        if self.bin is not None:
+            self.bin.close()
+            self.bin = None
+
     def __del__(self):
-        # if self.bin is not None:
-        #     self.bin.close()
-        #     self.bin = None
-        # if self.pos_idx:
-        #     self.pos_idx.close()
-        #     self.pos_idx = None
-        pass
+        self.close()
+
+    def seekable(self):
+        return True
 
     def __getitem__(self, key):
         if isinstance(key, slice):
             # it[start:stop:step]
             new_slice = ir_datasets.util.apply_sub_slice(self.slice, key)
-            return Lz4PickleIter(self.lookup, new_slice)
+            return Lz4PickleIter(self.lookup, new_slice, self.field_idxs)
         elif isinstance(key, int):
             # it[index]
             new_slice = ir_datasets.util.slice_idx(self.slice, key)
-            new_it = Lz4PickleIter(self.lookup, new_slice)
+            new_it = Lz4PickleIter(self.lookup, new_slice, self.field_idxs)
             try:
                 return next(new_it)
             except StopIteration as e:
@@ -117,6 +260,10 @@ class Lz4PickleLookup:
         index_fields,
         key_field_prefix=None,
         file_access=FileAccess.FILE,
+        block_size=None,
+        threads=1,
+        index_cls=NumpySortedIndex,
+        field_layout=False,
     ):
         self._path = path
         self._key_field = key_field
@@ -124,14 +271,35 @@ class Lz4PickleLookup:
         self._index_fields = list(index_fields)
         self._doc_cls = doc_cls
         self._bin = None
+        self._bin_pid = None
         self._bin_path = os.path.join(self._path, "bin")
         self._pos = None
         self._pos_path = os.path.join(self._path, "bin.pos")
         self._idx = None
         self._idx_path = os.path.join(self._path, f"idx.{safe_str(self._key_field)}")
         self._key_field_prefix = key_field_prefix
+        self._index_cls = index_cls # NumpySortedIndex or NumpyHashIndex
         self._meta_path = os.path.join(self._path, "bin.meta")
         self._file_access = file_access
+        # block format: records are packed into blocks of (at least) block_size bytes, which are
+        # compressed using a dictionary that's shared across the store (bin.dict)
+        assert block_size is None or 0 < block_size <= (1 << BLOCK_OFFSET_BITS)
+        self._block_size = block_size
+        self._dict = None
+        self._dict_path = os.path.join(self._path, "bin.dict")
+        self._is_block_format = None
+        # field layout: each field of a record is compressed separately (marked by bin.fields), so
+        # that projections (e.g., get_many(field='text')) only decode the fields they return
+        assert not (field_layout and block_size is not None), "field_layout is not supported in the block format"
+        self._field_layout = field_layout
+        self._fields_path = os.path.join(self._path, "bin.fields")
+        self._is_field_layout = None
+        # batched lookups optionally decompress records in a thread pool (lz4 releases the GIL)
+        self._threads = threads
+        self._thread_pool = None
+        # lookups can happen from several threads at once; this protects lazy initialization (and reads
+        # on platforms without os.pread)
+        self._lock = Lock()
 
         # check that the fields match
         meta_info = " ".join(doc_cls._fields)
@@ -143,46 +311,134 @@ class Lz4PickleLookup:
             ), f"fields do not match; you may need to re-build this store {path}"
 
     def bin(self):
+        if self._bin is not None and self._bin_pid != os.getpid():
+            # forked (e.g., by docs_parallel_iter); the file position is shared with the parent process,
+            # so re-open it rather than use it from both processes. (The lock may also have been held
+            # by another thread at the time of the fork.)
+            self._bin = None
+            self._lock = Lock()
         if self._bin is None:
-            if self._file_access == FileAccess.FILE:
-                _logger.info(f"Opening {self._bin_path} with direct file access")
-                self._bin = open(self._bin_path, "rb")
-            elif self._file_access == FileAccess.MEMORY:
-                _logger.info(f"Opening {self._bin_path} in memory")
-                with open(self._bin_path, "rb") as f:
-                    data = bytearray(f.read())  # mutable buffer
-                self._bin = io.BytesIO(data)  # Use the same buffer
-            elif self._file_access == FileAccess.MMAP:
-                _logger.info(f"Opening {self._bin_path} with MMAP")
-                f = open(self._bin_path, "rb")
-                try:
-                    self._bin = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
-                finally:
-                    f.close()  # mapping stays valid after this
-            else:
-                assert False, f"File access {self._file_access} not supported / {FileAccess.FILE}"
+            with self._lock:
+                if self._bin is None:
+                    self._bin_pid = os.getpid()
+                    self._bin = self._open_bin()
         return self._bin
 
+    def _open_bin(self):
+        # All access modes support reads that don't depend on a shared file position (see
+        # _positional_reader), so a single bin can be used by concurrent lookups.
+        if self._file_access == FileAccess.FILE:
+            _logger.info(f"Opening {self._bin_path} with direct file access")
+            return open(self._bin_path, "rb")
+        elif self._file_access == FileAccess.MEMORY:
+            _logger.info(f"Opening {self._bin_path} in memory")
+            with open(self._bin_path, "rb") as f:
+                return f.read()
+        elif self._file_access == FileAccess.MMAP:
+            _logger.info(f"Opening {self._bin_path} with MMAP")
+            with open(self._bin_path, "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) # mapping stays valid after closing f
+        else:
+            assert False, f"File access {self._file_access} not supported / {FileAccess.FILE}"
+
+    def _iter_reader(self):
+        # Returns (read_at, file) for an iterator. With direct file access, each iterator gets its own file
+        # handle (which it closes when done), since sequential reads are faster through a file's buffer.
+        if self._file_access == FileAccess.FILE:
+            f = open(self._bin_path, "rb")
+            return _stream_reader(f), f
+        return _positional_reader(self.bin(), self._lock), None
+
+    def block_format(self):
+        # an existing store keeps the format it was built with (block_size only applies to new stores)
+        if self._is_block_format is None:
+            if os.path.exists(self._bin_path) and os.path.getsize(self._bin_path) > 0:
+                self._is_block_format = os.path.exists(self._dict_path)
+            else:
+                self._is_block_format = self._block_size is not None
+        return self._is_block_format
+
+    def field_layout(self):
+        # an existing store keeps the layout it was built with
+        if self._is_field_layout is None:
+            if os.path.exists(self._bin_path) and os.path.getsize(self._bin_path) > 0:
+                self._is_field_layout = os.path.exists(self._fields_path)
+            else:
+                self._is_field_layout = self._field_layout
+        return self._is_field_layout
+
+    def _field_idxs(self, fields):
+        if fields is None:
+            return None
+        return tuple(self._doc_cls._fields.index(f) for f in fields)
+
+    def dictionary(self):
+        # bin.dict holds the block size (4 bytes) followed by the dictionary content
+        if self._dict is None and os.path.exists(self._dict_path):
+            with self._lock:
+                if self._dict is None:
+                    with open(self._dict_path, "rb") as f:
+                        self._block_size = int.from_bytes(f.read(4), "little")
+                        self._dict = f.read()
+        return self._dict
+
+    def _read_at(self, read_at, pos, field_idxs=None, block_cache=None):
+        if not self.block_format():
+            return _decode_record(_content_at(read_at, pos), self._doc_cls, field_idxs, self.field_layout())
+        block_pos, offset = pos >> BLOCK_OFFSET_BITS, pos & ((1 << BLOCK_OFFSET_BITS) - 1)
+        # block_cache holds the caller's most recent block; lookups are sorted and iteration is sequential,
+        # so consecutive reads frequently come from the same block
+        if block_cache is not None and block_cache[0] == block_pos:
+            block = block_cache[1]
+        else:
+            block = _decompress_block(_content_at(read_at, block_pos), self.dictionary())
+            if block_cache is not None:
+                block_cache[:] = (block_pos, block)
+        return _block_record(block, offset, self._doc_cls, field_idxs)
+
     def pos(self):
         if self._pos is None:
-            self._pos = NumpyPosIndex(self._pos_path, file_access=self._file_access)
+            with self._lock:
+                if self._pos is None:
+                    self._pos = NumpyPosIndex(self._pos_path, file_access=self._file_access)
         return self._pos
 
     def idx(self):
         if self._idx is None:
-            self._idx = NumpySortedIndex(self._idx_path, file_access=self._file_access)
+            with self._lock:
+                if self._idx is None:
+                    self._idx = self._index_cls(self._idx_path, file_access=self._file_access)
         return self._idx
 
     def close(self):
-        if self._idx:
+        if self._idx is not None:
             self._idx.close()
             self._idx = None
-        if self._pos:
+        if self._pos is not None:
             self._pos.close()
             self._pos = None
-        if self._bin:
-            self._bin.close()
+        if self._bin is not None:
+            if not isinstance(self._bin, bytes): # in-memory access
+                self._bin.close()
             self._bin = None
+        self._dict = None
+        self._is_block_format = None
+        self._is_field_layout = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown()
+            self._thread_pool = None
+
+    def _refresh(self):
+        # Called when a transaction modifies the store. The indices re-load lazily. The bin is re-opened
+        # (mmap and memory access wouldn't see the new content otherwise), but not closed, since iterators
+        # may still be using it.
+        if self._idx is not None:
+            self._idx.close()
+        if self._pos is not None:
+            self._pos.close()
+        self._bin = None
+        self._is_block_format = None
+        self._is_field_layout = None
 
     def clear(self):
         self.close()
@@ -190,7 +446,11 @@ class Lz4PickleLookup:
             os.remove(self._bin_path)
         if os.path.exists(self._pos_path):
             os.remove(self._pos_path)
-        NumpySortedIndex(self._idx_path).clear()
+        if os.path.exists(self._dict_path):
+            os.remove(self._dict_path)
+        if os.path.exists(self._fields_path):
+            os.remove(self._fields_path)
+        self._index_cls(self._idx_path).clear()
 
     def __del__(self):
         self.close()
@@ -199,15 +459,24 @@ class Lz4PickleLookup:
     def transaction(self):
         if not os.path.exists(self._path):
             os.makedirs(self._path, exist_ok=True)
+        meta_info = " ".join(self._doc_cls._fields)
         if not os.path.exists(self._meta_path):
-            meta_info = " ".join(self._doc_cls._fields)
             with open(self._meta_path, "wt") as f:
                 f.write(meta_info)
+        if self.field_layout() and not os.path.exists(self._fields_path):
+            with open(self._fields_path, "wt") as f:
+                f.write(meta_info)
 
         with Lz4PickleTransaction(self) as trans:
             yield trans
 
     def __getitem__(self, values):
+        return self.get(values)
+
+    def get(self, values, fields=None):
+        # yields the records with the given keys; if fields is provided, only returns a tuple of
+        # those fields from each record
+        field_idxs = self._field_idxs(fields)
         if isinstance(values, str):
             values = (values,)
         # for removing long doc_id prefixes
@@ -218,21 +487,53 @@ class Lz4PickleLookup:
                 if v.startswith(self._key_field_prefix)
             ]
         poss = self.idx()[values]
-        poss = sorted(poss)  # go though the file in increasing order-- better for HDDs
-        binf = None
-        for pos in poss:
-            if pos == -1:
-                continue  # not found
-            if binf is None:
-                binf = self.bin()
-            binf.seek(pos)
-            yield _read_next(binf, self._doc_cls)
+        poss = sorted(pos for pos in poss if pos != -1)  # go though the file in increasing order-- better for HDDs
+        if not poss:
+            return
+        binf = self.bin()
+        if self.block_format():
+            read_at, block_cache = _positional_reader(binf, self._lock), [None, None]
+            for pos in poss:
+                yield self._read_at(read_at, pos, field_idxs, block_cache)
+        elif isinstance(binf, (bytes, mmap.mmap)):
+            yield from self._decode(_buffer_read_iter(binf, poss), field_idxs)
+        else:
+            # read ahead by twice the average record size
+            read_ahead = 2 * os.path.getsize(self._bin_path) // max(len(self), 1) + 4
+            read_at = _positional_reader(binf, self._lock)
+            yield from self._decode(_coalesced_read_iter(read_at, poss, read_ahead), field_idxs)
+
+    def _decode(self, contents_it, field_idxs=None):
+        decode_batch = partial(_decode_batch, self._doc_cls, field_idxs=field_idxs, field_layout=self.field_layout())
+        if self._threads <= 1:
+            for contents in contents_it:
+                yield decode_batch((contents,))[0]
+        else:
+            if self._thread_pool is None:
+                with self._lock:
+                    if self._thread_pool is None:
+                        self._thread_pool = ThreadPoolExecutor(self._threads)
+            # submit each batch as soon as it's read, so decompression overlaps with I/O
+            futures = []
+            batch = []
+            for contents in contents_it:
+                batch.append(contents)
+                if len(batch) == BATCH_SIZE:
+                    futures.append(self._thread_pool.submit(decode_batch, batch))
+                    batch = []
+            if batch:
+                futures.append(self._thread_pool.submit(decode_batch, batch))
+            for future in futures:
+                yield from future.result()
 
     def path(self, force=True):
         return self._path
 
     def __iter__(self):
-        return Lz4PickleIter(self, slice(0, len(self), 1))
+        return self.iter()
+
+    def iter(self, fields=None):
+        return Lz4PickleIter(self, slice(0, len(self), 1), self._field_idxs(fields))
 
     def __len__(self):
         # number of keys
@@ -247,6 +548,13 @@ class Lz4PickleTransaction:
         self.pos = None
         self.idxs = None
         self.start_pos = None
+        self.block_format = self.lookup.block_format()
+        self.field_layout = self.lookup.field_layout()
+        self.dictionary = None
+        self.new_dictionary = False
+        self.pending = None
+        self.block = None
+        self.block_pos = None
 
     def __enter__(self):
         self.bin = open(self.lookup._bin_path, "ab")
@@ -257,7 +565,12 @@ class Lz4PickleTransaction:
         self.idxs = []
         for index_field in self.lookup._index_fields:
             idx_path = os.path.join(self.lookup._path, f"idx.{safe_str(index_field)}")
-            self.idxs.append(NumpySortedIndex(idx_path))
+            self.idxs.append(self.lookup._index_cls(idx_path))
+        if self.block_format:
+            self.dictionary = self.lookup.dictionary()
+            if self.dictionary is None:
+                self.pending = [] # records are held until there's enough data to build the dictionary
+            self.block = bytearray()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -268,6 +581,10 @@ class Lz4PickleTransaction:
                 self.rollback()
 
     def commit(self):
+        if self.block_format:
+            if self.pending:
+                self._build_dictionary()
+            self._flush_block()
         self.pos.commit()
         self.pos = None
         for idx in self.idxs:
@@ -278,9 +595,14 @@ class Lz4PickleTransaction:
             fcntl.lockf(self.bin, fcntl.LOCK_UN)
         self.bin.close()
         self.bin = None
+        self.lookup._refresh()
 
     def rollback(self):
         self.bin.truncate(self.start_pos)  # remove appended content
+        if self.new_dictionary:
+            os.remove(self.lookup._dict_path)
+        self.lookup._dict = None
+        self.lookup._refresh()
         if fcntl:
             fcntl.lockf(self.bin, fcntl.LOCK_UN)
         self.bin.close()
@@ -291,8 +613,25 @@ class Lz4PickleTransaction:
             idx.close()
         self.idxs = None
 
-    def add(self, record):
+    def add(self, record, encoded=None):
+        # encoded optionally provides the result of _encode_next(record), e.g., if computed in a worker
+        if self.block_format:
+            content = pickle.dumps(tuple(record))
+            if self.pending is not None:
+                self.pending.append((record, content))
+                if sum(len(c) for _, c in self.pending) >= MAX_DICT_SIZE:
+                    self._build_dictionary()
+            else:
+                self._add_to_block(record, content)
+            return
         bin_pos = self.bin.tell()
+        self._add_pos(record, bin_pos)
+        if encoded is None:
+            _write_next(self.bin, record, self.field_layout)
+        else:
+            self.bin.write(encoded)
+
+    def _add_pos(self, record, bin_pos):
         self.pos.add(bin_pos)
         for idx, field in zip(self.idxs, self.lookup._index_fields):
             value = getattr(record, field)
@@ -301,7 +640,36 @@ class Lz4PickleTransaction:
                 assert value.startswith(self.lookup._key_field_prefix)
                 value = value[len(self.lookup._key_field_prefix) :]
             idx.add(value, bin_pos)
-        _write_next(self.bin, record)
+
+    def _build_dictionary(self):
+        # LZ4 has no dictionary training, so the dictionary is simply made up of the content of the
+        # first records, which works well for corpora of similarly-structured short records.
+        dictionary = b"".join(c for _, c in self.pending)[-MAX_DICT_SIZE:]
+        with ir_datasets.util.finialized_file(self.lookup._dict_path, "wb") as f:
+            f.write(self.lookup._block_size.to_bytes(4, "little"))
+            f.write(dictionary)
+        self.dictionary = dictionary
+        self.new_dictionary = True
+        pending, self.pending = self.pending, None
+        for record, content in pending:
+            self._add_to_block(record, content)
+
+    def _add_to_block(self, record, content):
+        if not self.block:
+            self.block_pos = self.bin.tell()
+        self._add_pos(record, (self.block_pos << BLOCK_OFFSET_BITS) | len(self.block))
+        self.block += len(content).to_bytes(4, "little")
+        self.block += content
+        if len(self.block) >= self.lookup._block_size:
+            self._flush_block()
+
+    def _flush_block(self):
+        if self.block:
+            lz4 = ir_datasets.lazy_libs.lz4_block()
+            content = lz4.block.compress(bytes(self.block), store_size=True, dict=self.dictionary)
+            self.bin.write(len(content).to_bytes(4, "little"))
+            self.bin.write(content)
+            self.block = bytearray()
 
 
 class PickleLz4FullStore(Docstore):
@@ -316,8 +684,13 @@ class PickleLz4FullStore(Docstore):
         size_hint=None,
         count_hint=None,
         options=DEFAULT_DOCSTORE_OPTIONS,
+        block_size=None,
+        index_cls=NumpySortedIndex,
+        field_layout=None,
     ):
         super().__init__(data_cls, lookup_field, options=options)
+        if field_layout is None:
+            field_layout = options.field_layout and block_size is None
         self.path = path
         self.init_iter_fn = init_iter_fn
         self.lookup = Lz4PickleLookup(
@@ -327,30 +700,52 @@ class PickleLz4FullStore(Docstore):
             index_fields,
             key_field_prefix,
             file_access=options.file_access,
+            block_size=block_size,
+            threads=options.lookup_threads,
+            index_cls=index_cls,
+            field_layout=field_layout,
         )
         self.size_hint = size_hint
         self.count_hint = count_hint
+        self.build_workers = options.build_workers
 
     def get_many_iter(self, keys):
         self.build()
         yield from self.lookup[keys]
 
+    def get_many(self, doc_ids, field=None):
+        if field is None:
+            return super().get_many(doc_ids)
+        # only decode the id & requested field (in the field layout, the others are skipped entirely)
+        self.build()
+        return {doc_id: value for doc_id, value in self.lookup.get(doc_ids, fields=(self._id_field, field))}
+
     def build(self):
         if not self.built():
             if self.size_hint:
                 ir_datasets.util.check_disk_free(self.path, self.size_hint)
-            with self.lookup.transaction() as trans, _logger.duration(
-                "building docstore"
-            ):
-                count_hint = self.count_hint  # either a callable or int or None
-                if callable(count_hint):
-                    count_hint = (
-                        count_hint()
-                    )  # allows for deferred loading of metadata; should return an int or None
-                for doc in _logger.pbar(
-                    self.init_iter_fn(), "docs_iter", unit="doc", total=count_hint
-                ):
-                    trans.add(doc)
+            with self.lookup.transaction() as trans:
+                if len(trans.pos) > 0:
+                    # built by another process (e.g., docs_shard workers) while this one waited for the lock
+                    trans.rollback()
+                    return
+                with _logger.duration("building docstore"):
+                    count_hint = self.count_hint  # either a callable or int or None
+                    if callable(count_hint):
+                        count_hint = (
+                            count_hint()
+                        )  # allows for deferred loading of metadata; should return an int or None
+                    it = _logger.pbar(
+                        self.init_iter_fn(), "docs_iter", unit="doc", total=count_hint
+                    )
+                    if self.build_workers > 1 and not self.lookup.block_format():
+                        # pickling & compression happen in worker processes; records are still
+                        # written in order, so the resulting files match a serial build
+                        for doc, encoded in _parallel_encode_iter(it, self.build_workers, field_layout=self.lookup.field_layout()):
+                            trans.add(doc, encoded)
+                    else:
+                        for doc in it:
+                            trans.add(doc)
 
     def built(self):
         return len(self.lookup) > 0
@@ -359,8 +754,12 @@ class PickleLz4FullStore(Docstore):
         self.lookup.clear()
 
     def __iter__(self):
+        return self.docs_iter()
+
+    def docs_iter(self, fields=None):
+        # if fields is provided, yields tuples of only those fields
         self.build()
-        return iter(self.lookup)
+        return self.lookup.iter(fields)
 
     def count(self):
         self.build()
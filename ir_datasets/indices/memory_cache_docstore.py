@@ -0,0 +1,114 @@
+import sys
+from collections import OrderedDict
+from threading import Lock
+from . import Docstore, DEFAULT_DOCSTORE_OPTIONS
+
+
+def _doc_size(doc):
+    # approximate in-memory size of a document (the tuple itself & its direct values)
+    return sys.getsizeof(doc) + sum(sys.getsizeof(value) for value in doc)
+
+
+class MemoryCacheDocstore(Docstore):
+    """
+    Keeps recently-used documents from docstore in memory, bounded by max_entries and/or max_bytes.
+
+    policy is either 'lru' (evicts the least recently used document) or 'clock' (evicts in insertion
+    order, but gives recently used documents a second chance; hits are cheaper than with 'lru').
+    """
+    def __init__(self, docstore, max_entries=None, max_bytes=None, policy='lru'):
+        # not all docstores call Docstore.__init__, so copy over what's available
+        self._doc_cls = getattr(docstore, '_doc_cls', None)
+        self._id_field = docstore._id_field
+        self._options = getattr(docstore, '_options', DEFAULT_DOCSTORE_OPTIONS)
+        assert policy in ('lru', 'clock'), f'unknown memory cache policy {policy!r}'
+        self.docstore = docstore
+        self.max_entries = max_entries or None
+        self.max_bytes = max_bytes or None
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # doc_id -> [doc, size, referenced]
+        self._bytes = 0
+        self._lock = Lock()
+
+    def get_many(self, doc_ids, field=None):
+        result = {}
+        for doc in self.get_many_iter(doc_ids):
+            doc_id = getattr(doc, self._id_field)
+            result[doc_id] = doc if field is None else getattr(doc, field)
+        return result
+
+    def get_many_iter(self, doc_ids):
+        found, missing = [], []
+        with self._lock:
+            for doc_id in dict.fromkeys(doc_ids): # de-duplicate, preserving order
+                entry = self._entries.get(doc_id)
+                if entry is None:
+                    missing.append(doc_id)
+                else:
+                    if self.policy == 'lru':
+                        self._entries.move_to_end(doc_id)
+                    else:
+                        entry[2] = True
+                    found.append(entry[0])
+            self.hits += len(found)
+            self.misses += len(missing)
+        yield from found
+        if missing:
+            for doc in self.docstore.get_many_iter(missing):
+                self._add(getattr(doc, self._id_field), doc)
+                yield doc
+
+    def _add(self, doc_id, doc):
+        size = _doc_size(doc) if self.max_bytes else 0
+        with self._lock:
+            if doc_id in self._entries:
+                return # another thread got here first
+            self._entries[doc_id] = [doc, size, False]
+            self._bytes += size
+            while self._entries and ((self.max_entries and len(self._entries) > self.max_entries) or (self.max_bytes and self._bytes > self.max_bytes)):
+                evicted_id, (evicted, evicted_size, referenced) = self._entries.popitem(last=False)
+                if referenced:
+                    # second chance (clock policy only)
+                    self._entries[evicted_id] = [evicted, evicted_size, False]
+                else:
+                    self._bytes -= evicted_size
+
+    def cache_stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def clear_memory_cache(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def clear_cache(self):
+        self.clear_memory_cache()
+        self.docstore.clear_cache()
+
+    def __getattr__(self, attr):
+        # pass through docstore-specific functionality (e.g., build, count)
+        if attr == 'docstore':
+            raise AttributeError(attr)
+        return getattr(self.docstore, attr)
+
+    def __iter__(self):
+        return iter(self.docstore)
+
+
+def memory_cache(docstore, options=DEFAULT_DOCSTORE_OPTIONS):
+    """
+    Wraps docstore in a MemoryCacheDocstore if options enable the in-process cache.
+    """
+    if not options.memory_cache_entries and not options.memory_cache_bytes:
+        return docstore
+    if isinstance(docstore, MemoryCacheDocstore):
+        return docstore
+    return MemoryCacheDocstore(docstore, options.memory_cache_entries, options.memory_cache_bytes, options.memory_cache_policy)
@@ -0,0 +1,194 @@
+import os
+import mmap
+import zlib
+import ir_datasets
+from ir_datasets.indices import FileAccess
+
+
+def _hash(key):
+    return zlib.crc32(key)
+
+
+class NumpyHashIndex:
+    """
+    A drop-in alternative to NumpySortedIndex that uses an open-addressing (linear probing) hash table
+    over numpy arrays, rather than a binary search over sorted keys. This gives O(1) expected probes per
+    key. Keys are stored as a single blob of variable-length utf8 strings (plus offsets), so a few long
+    keys do not inflate the size of the index.
+
+    Files:
+     - {path}.hmeta: number of keys, number of table slots, and dtypes of hoff and htbl
+     - {path}.hkey: utf8-encoded keys, concatenated
+     - {path}.hoff: (count+1) offsets of each key in {path}.hkey
+     - {path}.hpos: the value (position) of each key
+     - {path}.htbl: hash table slots; each one is either an index into the above or -1 (empty)
+    """
+    LOAD_FACTOR = 0.7
+    FILES = ['hmeta', 'hkey', 'hoff', 'hpos', 'htbl']
+
+    def __init__(self, path, file_access=FileAccess.MMAP):
+        self.path = path
+        self.transaction = None
+        self.keys = None
+        self.offsets = None
+        self.poss = None
+        self.table = None
+        self.keys_file = None
+        self.doccount = None
+        self.np = None
+        self.file_access = file_access
+
+    def add(self, key, idx):
+        if self.transaction is None:
+            self.transaction = {}
+        self.transaction[key] = idx
+
+    def commit(self):
+        self._lazy_load()
+        if self.transaction is None:
+            return
+        np = self.np
+        transaction = {k.encode('utf8'): v for k, v in self.transaction.items()}
+        keys, poss = [], []
+        if self._exists():
+            # carry over existing keys that are not replaced in this transaction
+            blob, offsets = self.keys[:], self.offsets.tolist()
+            for i, pos in enumerate(self.poss.tolist()):
+                key = blob[offsets[i]:offsets[i+1]]
+                if key not in transaction:
+                    keys.append(key)
+                    poss.append(pos)
+        keys += list(transaction.keys())
+        poss += list(transaction.values())
+        self.close()
+
+        # use narrower types when possible to keep the index compact
+        offsets = np.zeros(len(keys) + 1, dtype='int64')
+        np.cumsum([len(k) for k in keys], out=offsets[1:])
+        offsets = offsets.astype('uint32' if offsets[-1] < 2**32 else 'int64')
+        table = self._build_table(np.array([_hash(k) for k in keys], dtype='int64'))
+        table = table.astype('int32' if len(keys) < 2**31 else 'int64')
+
+        for ext, data in [('hkey', np.frombuffer(b''.join(keys), dtype='uint8')), ('hoff', offsets), ('hpos', np.array(poss, dtype='int64')), ('htbl', table)]:
+            with ir_datasets.util.finialized_file(f'{self.path}.{ext}', 'wb') as f:
+                data.tofile(f)
+        with ir_datasets.util.finialized_file(f'{self.path}.hmeta', 'wt') as f:
+            f.write(f'{len(keys)} {table.shape[0]} {offsets.dtype.name} {table.dtype.name}')
+        self.transaction = None
+
+    def _build_table(self, hashes):
+        # Vectorized linear probing: in each round, every key not yet placed tries to claim its current
+        # slot. If the slot is free, the first key that wants it gets it; everything else moves to the
+        # next slot. This maintains the linear probing invariant (all slots between a key's home slot
+        # and its actual slot are occupied).
+        np = self.np
+        size = 1
+        while size * self.LOAD_FACTOR < hashes.shape[0]:
+            size *= 2
+        mask = size - 1
+        table = np.full(size, -1, dtype='int64')
+        pending = np.arange(hashes.shape[0], dtype='int64')
+        slots = hashes & mask
+        while pending.shape[0] > 0:
+            free = np.flatnonzero(table[slots] == -1)
+            claimed_slots, first = np.unique(slots[free], return_index=True)
+            table[claimed_slots] = pending[free[first]]
+            placed = np.zeros(pending.shape[0], dtype=bool)
+            placed[free[first]] = True
+            pending = pending[~placed]
+            slots = (slots[~placed] + 1) & mask
+        return table
+
+    def _exists(self):
+        return os.path.exists(f'{self.path}.hmeta')
+
+    def _lazy_load(self):
+        if self.np is None:
+            self.np = ir_datasets.lazy_libs.numpy()
+        if self.table is None and self._exists():
+            with open(f'{self.path}.hmeta', 'rt') as f:
+                doccount, table_size, offsets_dtype, table_dtype = f.read().split()
+                self.doccount, table_size = int(doccount), int(table_size)
+            if self.file_access == FileAccess.MEMORY:
+                load = lambda ext, dtype, count: self.np.fromfile(f'{self.path}.{ext}', dtype=dtype, count=count)
+            else:
+                load = lambda ext, dtype, count: self.np.memmap(f'{self.path}.{ext}', dtype=dtype, mode='r', shape=(count,)) if count > 0 else self.np.zeros(0, dtype=dtype)
+            self.offsets = load('hoff', offsets_dtype, self.doccount + 1)
+            self.poss = load('hpos', 'int64', self.doccount)
+            # keys are compared as bytes, which is much faster to slice from a bytes or mmap object
+            if self.file_access == FileAccess.MEMORY or self.offsets[-1] == 0:
+                with open(f'{self.path}.hkey', 'rb') as f:
+                    self.keys = f.read()
+            else:
+                self.keys_file = open(f'{self.path}.hkey', 'rb')
+                self.keys = mmap.mmap(self.keys_file.fileno(), 0, access=mmap.ACCESS_READ)
+            # assigned last, since it marks the index as loaded (for lookups from other threads)
+            self.table = load('htbl', table_dtype, table_size)
+
+    def __getitem__(self, keys):
+        self._lazy_load()
+        if isinstance(keys, str):
+            keys = (keys,)
+        if not self._exists():
+            return [-1 for _ in keys]
+        np = self.np
+        keys = [key.encode('utf8') for key in keys]
+        lens = np.array([len(key) for key in keys], dtype='int64')
+        mask = self.table.shape[0] - 1
+        result = np.full(len(keys), -1, dtype='int64')
+        active = np.arange(len(keys))
+        slots = np.array([_hash(key) for key in keys], dtype='int64') & mask
+        # probe all keys together, one slot at a time
+        while active.shape[0] > 0:
+            entries = self.table[slots].astype('int64')
+            nonempty = entries != -1 # keys that reach an empty slot are not found
+            active, slots, entries = active[nonempty], slots[nonempty], entries[nonempty]
+            starts, ends = self.offsets[entries].astype('int64'), self.offsets[entries + 1].astype('int64')
+            found = np.zeros(active.shape[0], dtype=bool)
+            # only compare the bytes of keys when the lengths match
+            candidates = np.flatnonzero(ends - starts == lens[active])
+            for i, start, end, key_idx in zip(candidates.tolist(), starts[candidates].tolist(), ends[candidates].tolist(), active[candidates].tolist()):
+                if self.keys[start:end] == keys[key_idx]:
+                    found[i] = True
+            result[active[found]] = self.poss[entries[found]]
+            active, slots = active[~found], (slots[~found] + 1) & mask
+        return result.tolist()
+
+    def nbytes(self):
+        # size of the index on disk
+        return sum(os.path.getsize(f'{self.path}.{ext}') for ext in self.FILES if os.path.exists(f'{self.path}.{ext}'))
+
+    def close(self):
+        if isinstance(self.keys, mmap.mmap):
+            self.keys.close()
+        self.keys = None
+        if self.keys_file is not None:
+            self.keys_file.close()
+            self.keys_file = None
+        self.offsets = None
+        self.poss = None
+        self.table = None
+
+    def clear(self):
+        self.close()
+        for ext in self.FILES:
+            path = f'{self.path}.{ext}'
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __del__(self):
+        self.close()
+
+    def __iter__(self):
+        # iterates keys (in insertion order)
+        self._lazy_load()
+        if self._exists():
+            for i in range(len(self)):
+                yield self.keys[self.offsets[i]:self.offsets[i+1]].decode('utf8')
+
+    def __len__(self):
+        # number of keys
+        self._lazy_load()
+        if self._exists():
+            return self.doccount
+        return 0
@@ -3,7 +3,7 @@ import ir_datasets
 from ir_datasets.indices import FileAccess
 
 class NumpySortedIndex:
-    def __init__(self, path, file_access=FileAccess.MMAP):
+    def __init__(self, path, file_access=FileAccess.MMAP, max_deltas=0):
         self.path = path
         self.transaction = None
         self.mmap_keys = None
@@ -12,6 +12,11 @@ class NumpySortedIndex:
         self.keylen = None
         self.np = None
         self.file_access = file_access
+        # When max_deltas > 0, small commits are written as separate sorted "delta" segments (rather than
+        # re-writing the entire index), which are merged into the main index once there are more than
+        # max_deltas of them. Deltas are listed in {path}.deltas, one "keylen count added" line per segment.
+        self.max_deltas = max_deltas
+        self.deltas = None
 
     def add(self, key, idx):
         if self.transaction is None:
@@ -22,44 +27,119 @@ class NumpySortedIndex:
         self._lazy_load()
         if self.transaction is None:
             return
-        transaction = sorted(self.transaction.items())
-        transaction = [(x[0].encode('utf8'), x[1]) for x in transaction]
-        if self._exists():
-            transaction += [(k, p) for k, p in zip(self.mmap_keys, self.mmap_poss) if (k.decode() not in self.transaction)]
-            transaction = sorted(transaction)
-        keys = [x[0] for x in transaction]
-        poss = [x[1] for x in transaction]
-        self.keylen = max(len(k) for k in keys)
-        self.doccount = len(keys)
         # Use zero-terminated bytes here (S) rather than unicode type (U) because U includes a ton
         # of extra padding (for longer unicode formats), which can inflate the size of the index greatly.
-        keys = self.np.array(keys, dtype=f'S{self.keylen}')
-        poss = self.np.array(poss, dtype='int64')
-        self.mmap_keys = self.np.memmap(f'{self.path}.key', dtype=keys.dtype, mode='w+', shape=keys.shape)
-        self.mmap_keys[:] = keys[:]
-        self.mmap_poss = self.np.memmap(f'{self.path}.pos', dtype=poss.dtype, mode='w+', shape=poss.shape)
-        self.mmap_poss[:] = poss[:]
-        with ir_datasets.util.finialized_file(f'{self.path}.meta', 'wt') as f:
-            f.write(f'{self.keylen} {self.doccount}')
+        keys = self._encode(self.transaction.keys())
+        poss = self.np.array(list(self.transaction.values()), dtype='int64')
+        order = self.np.argsort(keys, kind='stable')
+        keys, poss = keys[order], poss[order]
+        if self._exists() and len(self.deltas) < self.max_deltas:
+            self._write_delta(keys, poss)
+        else:
+            if self._exists():
+                for delta_keys, delta_poss in self.deltas + [(keys, poss)]:
+                    base_keys, base_poss = self._merge(self.mmap_keys, self.mmap_poss, delta_keys, delta_poss)
+                    self.mmap_keys, self.mmap_poss = base_keys, base_poss
+                keys, poss = self.mmap_keys, self.mmap_poss
+            self._write_base(keys, poss)
         self.transaction = None
+        self.close() # re-load lazily
+
+    def _encode(self, keys):
+        keys = [key.encode('utf8') for key in keys]
+        return self.np.array(keys, dtype=f'S{max((len(k) for k in keys), default=1) or 1}')
+
+    def _merge(self, keys, poss, new_keys, new_poss):
+        # Linear merge of two sorted segments. Entries in new_keys replace matching entries in keys.
+        np = self.np
+        keylen = max(keys.dtype.itemsize, new_keys.dtype.itemsize)
+        keys, new_keys = np.asarray(keys, dtype=f'S{keylen}'), np.asarray(new_keys, dtype=f'S{keylen}')
+        poss = np.asarray(poss)
+        if keys.shape[0] > 0:
+            locs = np.searchsorted(keys, new_keys)
+            replaced = locs[keys[np.minimum(locs, keys.shape[0] - 1)] == new_keys]
+            keep = np.ones(keys.shape[0], dtype=bool)
+            keep[replaced] = False
+            keys, poss = keys[keep], poss[keep]
+        locs = np.searchsorted(keys, new_keys)
+        return np.insert(keys, locs, new_keys), np.insert(poss, locs, new_poss)
+
+    def _write_base(self, keys, poss):
+        # write to new files & replace (rather than re-writing in place) so that existing readers
+        # of the old files are unaffected
+        with ir_datasets.util.finialized_file(f'{self.path}.key', 'wb') as f:
+            keys.tofile(f)
+        with ir_datasets.util.finialized_file(f'{self.path}.pos', 'wb') as f:
+            self.np.asarray(poss, dtype='int64').tofile(f)
+        with ir_datasets.util.finialized_file(f'{self.path}.meta', 'wt') as f:
+            f.write(f'{keys.dtype.itemsize} {keys.shape[0]}')
+        self._clear_deltas()
+
+    def _write_delta(self, keys, poss):
+        added = sum(1 for pos in self._lookup(keys) if pos == -1)
+        idx = len(self.deltas)
+        with ir_datasets.util.finialized_file(f'{self.path}.delta{idx}.key', 'wb') as f:
+            keys.tofile(f)
+        with ir_datasets.util.finialized_file(f'{self.path}.delta{idx}.pos', 'wb') as f:
+            poss.tofile(f)
+        with open(f'{self.path}.deltas', 'at') as f:
+            f.write(f'{keys.dtype.itemsize} {keys.shape[0]} {added}\n')
+
+    def _clear_deltas(self):
+        if os.path.exists(f'{self.path}.deltas'):
+            with open(f'{self.path}.deltas', 'rt') as f:
+                count = len(f.readlines())
+            os.remove(f'{self.path}.deltas')
+            for idx in range(count):
+                for file in ['key', 'pos']:
+                    path = f'{self.path}.delta{idx}.{file}'
+                    if os.path.exists(path):
+                        os.remove(path)
 
     def _exists(self):
         return os.path.exists(f'{self.path}.key')
 
+    def _load(self, path, dtype, count):
+        if self.file_access == FileAccess.MEMORY or count == 0:
+            return self.np.fromfile(path, dtype=dtype, count=count)
+        return self.np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
     def _lazy_load(self):
         if self.np is None:
             self.np = ir_datasets.lazy_libs.numpy()
         if self.mmap_keys is None and self._exists():
+            # Load into locals and assign mmap_keys last, since it marks the index as loaded; other threads
+            # can be performing lookups at the same time.
             with open(f'{self.path}.meta', 'rt') as f:
-                self.keylen, self.doccount = f.read().split()
-                self.keylen, self.doccount = int(self.keylen), int(self.doccount)
+                keylen, doccount = (int(x) for x in f.read().split())
+            mmap_poss = self._load(f'{self.path}.pos', 'int64', doccount)
+            mmap_keys = self._load(f'{self.path}.key', f'S{keylen}', doccount)
+            deltas = []
+            if os.path.exists(f'{self.path}.deltas'):
+                with open(f'{self.path}.deltas', 'rt') as f:
+                    for idx, line in enumerate(f):
+                        delta_keylen, count, added = (int(x) for x in line.split())
+                        deltas.append((
+                            self._load(f'{self.path}.delta{idx}.key', f'S{delta_keylen}', count),
+                            self._load(f'{self.path}.delta{idx}.pos', 'int64', count),
+                        ))
+                        doccount += added
+            self.keylen, self.doccount, self.mmap_poss, self.deltas = keylen, doccount, mmap_poss, deltas
+            self.mmap_keys = mmap_keys
 
-            if self.file_access == FileAccess.MEMORY:                
-                self.mmap_keys = self.np.fromfile(f'{self.path}.key', dtype=f'S{self.keylen}', count=self.doccount)
-                self.mmap_poss = self.np.fromfile(f'{self.path}.pos', dtype='int64', count=self.doccount)
-            else:
-                self.mmap_keys = self.np.memmap(f'{self.path}.key', dtype=f'S{self.keylen}', mode='r', shape=(self.doccount,))
-                self.mmap_poss = self.np.memmap(f'{self.path}.pos', dtype='int64', mode='r', shape=(self.doccount,))
+    def _lookup(self, keys):
+        # search the newest segments first
+        np = self.np
+        result = np.full(keys.shape[0], -1, dtype='int64')
+        for seg_keys, seg_poss in reversed([(self.mmap_keys, self.mmap_poss)] + self.deltas):
+            missing = np.flatnonzero(result == -1)
+            if missing.shape[0] == 0 or seg_keys.shape[0] == 0:
+                continue
+            locs = np.searchsorted(seg_keys, keys[missing])
+            locs[locs >= seg_keys.shape[0]] = seg_keys.shape[0] - 1 # could be placed AFTER existing keys
+            mask = seg_keys[locs] == keys[missing]
+            result[missing[mask]] = seg_poss[locs[mask]]
+        return result.tolist()
 
     def __getitem__(self, keys):
         self._lazy_load()
@@ -67,11 +147,15 @@ class NumpySortedIndex:
             keys = (keys,)
         if not self._exists():
             return [-1 for _ in keys]
-        keys = self.np.array([key.encode('utf8') for key in keys], dtype=f'S{self.keylen}')
-        locs = self.np.searchsorted(self.mmap_keys, keys)
-        locs[locs >= self.mmap_keys.shape[0]] = self.mmap_keys.shape[0] - 1 # could be placed AFTER existing keys
-        mask = self.mmap_keys[locs] == keys
-        return ((self.mmap_poss[locs] * mask) + (~mask * -1)).tolist()
+        if len(keys) == 0:
+            return []
+        return self._lookup(self._encode(keys))
+
+    def nbytes(self):
+        # size of the index on disk
+        self._lazy_load()
+        files = ['meta', 'key', 'pos', 'deltas'] + [f'delta{i}.{file}' for i in range(len(self.deltas or [])) for file in ['key', 'pos']]
+        return sum(os.path.getsize(f'{self.path}.{ext}') for ext in files if os.path.exists(f'{self.path}.{ext}'))
 
     def close(self):
         if self.mmap_keys is not None:
@@ -80,10 +164,12 @@ class NumpySortedIndex:
         if self.mmap_poss is not None:
             del self.mmap_poss
             self.mmap_poss = None
+        self.deltas = None
         self.data = None
 
     def clear(self):
         self.close()
+        self._clear_deltas()
         for file in ['meta', 'key', 'pos']:
             path = f'{self.path}.{file}'
             if os.path.exists(path):
@@ -96,8 +182,11 @@ class NumpySortedIndex:
         # iterates keys
         self._lazy_load()
         if self._exists():
-            for i in range(len(self)):
-                yield self.mmap_keys[i].decode('utf8')
+            keys = self.mmap_keys
+            for delta_keys, delta_poss in self.deltas:
+                keys, _ = self._merge(keys, self.np.zeros(keys.shape[0], dtype='int64'), delta_keys, delta_poss)
+            for i in range(keys.shape[0]):
+                yield keys[i].decode('utf8')
 
     def __len__(self):
         # number of keys
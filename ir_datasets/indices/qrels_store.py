@@ -0,0 +1,148 @@
+import os
+import pickle
+import itertools
+from functools import partial
+import ir_datasets
+
+
+_logger = ir_datasets.log.easy()
+
+
+VERSION = 1
+
+
+class QrelsStore:
+    """
+    A compiled copy of a set of qrels (records with query_id, doc_id, relevance, and iteration fields), so that they
+    do not need to be parsed each time they are used. Query IDs, doc IDs, and iterations are interned and the records
+    are kept as numpy columns, along with the range of records for each query (in a query-sorted order), so that the
+    qrels for a given query can be found without scanning the others. Records keep their original order.
+
+    The store is built from init_iter_fn on first use and saved at path. It is re-built if any of the source_paths
+    change.
+    """
+    def __init__(self, path, init_iter_fn, data_cls, source_paths):
+        self.path = str(path)
+        self.init_iter_fn = init_iter_fn
+        self.data_cls = data_cls
+        self.source_paths = [str(p) for p in source_paths]
+        self._data = None
+        self._query_lookup = None
+
+    def _source_info(self):
+        result = []
+        for path in self.source_paths:
+            stat = os.stat(path)
+            result.append((path, stat.st_size, stat.st_mtime_ns))
+        return result
+
+    def built(self):
+        return self._load() is not None
+
+    def _load(self):
+        if self._data is None and os.path.exists(self.path):
+            data = None
+            try:
+                with ir_datasets.lazy_libs.lz4_frame().frame.open(self.path, 'rb') as f:
+                    data = pickle.load(f)
+            except Exception as ex:
+                _logger.warn(f'unable to read qrels store {self.path} ({ex!r}); re-building')
+            if data is not None and data['version'] == VERSION and data['source'] == self._source_info():
+                self._data = data
+        return self._data
+
+    def build(self):
+        if self._load() is not None:
+            return
+        np = ir_datasets.lazy_libs.numpy()
+        source_info = self._source_info()
+        query_ids, doc_ids, iterations = {}, {}, {}
+        qid_col, did_col, rel_col, it_col = [], [], [], []
+        with _logger.duration('building qrels store'):
+            for qrel in self.init_iter_fn():
+                qid_col.append(query_ids.setdefault(qrel.query_id, len(query_ids)))
+                did_col.append(doc_ids.setdefault(qrel.doc_id, len(doc_ids)))
+                rel_col.append(qrel.relevance)
+                it_col.append(iterations.setdefault(qrel.iteration, len(iterations)))
+            qid_col = np.array(qid_col, dtype=np.int32)
+            # query IDs are numbered in the order they first appear, so a stable sort groups the records by query in
+            # that order, and keeps the records of each query in their original order
+            order = np.argsort(qid_col, kind='stable').astype(np.int32)
+            offsets = np.zeros(len(query_ids) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(qid_col, minlength=len(query_ids)), out=offsets[1:])
+            data = {
+                'version': VERSION,
+                'source': source_info,
+                'query_ids': list(query_ids),
+                'doc_ids': list(doc_ids),
+                'iterations': list(iterations),
+                'query_id': qid_col,
+                'doc_id': np.array(did_col, dtype=np.int32),
+                'relevance': np.array(rel_col, dtype=np.int64),
+                'iteration': np.array(it_col, dtype=np.int32),
+                'order': order,
+                'offsets': offsets,
+            }
+            lz4 = ir_datasets.lazy_libs.lz4_frame()
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with ir_datasets.util.finialized_file(self.path, 'wb') as f, lz4.frame.LZ4FrameFile(f, 'wb') as fout:
+                pickle.dump(data, fout, protocol=pickle.HIGHEST_PROTOCOL)
+        self._data = data
+
+    def _records(self, idxs=None):
+        data = self._data
+        columns = (data['query_id'], data['doc_id'], data['relevance'], data['iteration'])
+        if idxs is not None:
+            columns = (c[idxs] for c in columns)
+        qids, dids, rels, its = (c.tolist() for c in columns)
+        return map(partial(tuple.__new__, self.data_cls), zip( # skips the NamedTuple's __new__
+            map(data['query_ids'].__getitem__, qids),
+            map(data['doc_ids'].__getitem__, dids),
+            rels,
+            map(data['iterations'].__getitem__, its)))
+
+    def __iter__(self):
+        self.build()
+        return self._records()
+
+    def __len__(self):
+        self.build()
+        return len(self._data['query_id'])
+
+    def _query_idxs(self, query_ids):
+        # record indices of the given queries, in their original order
+        np = ir_datasets.lazy_libs.numpy()
+        data = self._data
+        if self._query_lookup is None:
+            self._query_lookup = {qid: i for i, qid in enumerate(data['query_ids'])}
+        lookup, offsets, order = self._query_lookup, data['offsets'], data['order']
+        ranges = [order[offsets[q]:offsets[q+1]] for q in {lookup[qid] for qid in query_ids if qid in lookup}]
+        if not ranges:
+            return np.zeros(0, dtype=np.int32)
+        return np.sort(np.concatenate(ranges))
+
+    def records_for(self, query_ids):
+        """
+        Returns an iterator over the records of the given query ID(s), in their original order.
+        """
+        self.build()
+        if isinstance(query_ids, str):
+            query_ids = (query_ids,)
+        return self._records(self._query_idxs(query_ids))
+
+    def query_ids(self):
+        """
+        Returns the query IDs, in the order they first appear.
+        """
+        self.build()
+        return self._data['query_ids']
+
+    def as_dict(self):
+        """
+        Returns the qrels as a {query_id: {doc_id: relevance}} dict, like qrels_dict does.
+        """
+        self.build()
+        data = self._data
+        order, offsets = data['order'], data['offsets'].tolist()
+        doc_rels = zip(map(data['doc_ids'].__getitem__, data['doc_id'][order].tolist()), data['relevance'][order].tolist())
+        return {qid: dict(itertools.islice(doc_rels, end - start)) for qid, start, end in zip(data['query_ids'], offsets, offsets[1:])}
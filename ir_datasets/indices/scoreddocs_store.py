@@ -0,0 +1,159 @@
+import os
+from functools import partial
+import ir_datasets
+from .compiled_store import CompiledStore, write_ids, read_ids
+
+
+_logger = ir_datasets.log.easy()
+
+
+class ScoredDocsStore(CompiledStore):
+    """
+    A compiled copy of a set of scored documents (records with query_id, doc_id, and score fields), so that they
+    do not need to be parsed each time they are used, and so that the records of a given query can be found
+    without scanning the others.
+
+    The store is a directory of flat files that are memory-mapped when read:
+     - query.bin, doc.bin, score.bin: the records' columns (int32 query and doc numbers, float64 scores), in their
+       original order
+     - query_ids.txt, doc_ids.txt: the IDs, one per line, numbered by the order they first appear
+     - doc_ids.offsets.bin: the byte offset of each line of doc_ids.txt (int64, ending with the file size), so that
+       a few doc IDs can be read without loading all of them
+     - offsets.bin: for each query number, the start of its records in the query-sorted order (int64, ending with
+       the record count)
+     - order.bin: the query-sorted order of the records (int64). It is omitted when the records are already
+       grouped by query, which is the case for most runs.
+     - info.json: holds the sizes of the source files (see CompiledStore)
+    """
+    def __init__(self, path, init_iter_fn, data_cls, source_paths, chunk_size=1_000_000):
+        super().__init__(path, init_iter_fn, data_cls, source_paths, chunk_size)
+        self._arrays = {}
+        self._query_ids = None
+        self._query_lookup = None
+        self._doc_ids = None
+
+    def _build(self, path):
+        np = ir_datasets.lazy_libs.numpy()
+        file = partial(os.path.join, path)
+        query_ids, doc_ids = {}, {}
+        count, grouped, last_query = 0, True, -1
+        with _logger.duration('building scoreddocs store'), \
+             open(file('query.bin'), 'wb') as fquery, \
+             open(file('doc.bin'), 'wb') as fdoc, \
+             open(file('score.bin'), 'wb') as fscore:
+            for chunk in self._chunks():
+                queries = np.array([query_ids.setdefault(r.query_id, len(query_ids)) for r in chunk], dtype=np.int32)
+                np.array([doc_ids.setdefault(r.doc_id, len(doc_ids)) for r in chunk], dtype=np.int32).tofile(fdoc)
+                np.array([r.score for r in chunk], dtype=np.float64).tofile(fscore)
+                queries.tofile(fquery)
+                # query numbers are assigned in the order they first appear, so the records are grouped by query
+                # exactly when the numbers never decrease
+                if grouped and (queries[0] < last_query or (queries[1:] < queries[:-1]).any()):
+                    grouped = False
+                last_query = queries[-1]
+                count += len(chunk)
+            fquery.flush()
+            write_ids(file('query_ids.txt'), query_ids)
+            write_ids(file('doc_ids.txt'), doc_ids, file('doc_ids.offsets.bin'))
+            doc_count = len(doc_ids)
+            del doc_ids
+            query_counts = np.zeros(len(query_ids), dtype=np.int64)
+            if count > 0:
+                queries = np.memmap(file('query.bin'), dtype=np.int32, mode='r', shape=(count,))
+                for start in range(0, count, self.chunk_size):
+                    query_counts += np.bincount(queries[start:start+self.chunk_size], minlength=len(query_ids))
+                if not grouped:
+                    np.argsort(queries, kind='stable').astype(np.int64).tofile(file('order.bin'))
+                del queries
+            offsets = np.zeros(len(query_ids) + 1, dtype=np.int64)
+            np.cumsum(query_counts, out=offsets[1:])
+            offsets.tofile(file('offsets.bin'))
+        return {'count': count, 'query_count': len(query_ids), 'doc_count': doc_count, 'grouped': grouped}
+
+    def _array(self, name, dtype, count):
+        if name not in self._arrays:
+            np = ir_datasets.lazy_libs.numpy()
+            if count == 0:
+                self._arrays[name] = np.zeros(0, dtype=dtype)
+            else:
+                self._arrays[name] = np.memmap(self._file(name), dtype=dtype, mode='r', shape=(count,))
+        return self._arrays[name]
+
+    def _columns(self):
+        count = self._info['count']
+        return (
+            self._array('query.bin', 'int32', count),
+            self._array('doc.bin', 'int32', count),
+            self._array('score.bin', 'float64', count),
+        )
+
+    def query_ids(self):
+        """
+        Returns the query IDs, in the order they first appear.
+        """
+        self.build()
+        if self._query_ids is None:
+            self._query_ids = read_ids(self._file('query_ids.txt'))
+        return self._query_ids
+
+    def _doc_id_list(self):
+        if self._doc_ids is None:
+            self._doc_ids = read_ids(self._file('doc_ids.txt'))
+        return self._doc_ids
+
+    def _doc_id_getter(self):
+        # For a handful of records, read the doc IDs directly rather than loading all of them
+        if self._doc_ids is not None or self._info['doc_count'] == 0:
+            return self._doc_id_list().__getitem__
+        return self._id_reader('doc')
+
+    def __len__(self):
+        self.build()
+        return self._info['count']
+
+    def __iter__(self):
+        self.build()
+        query_ids, doc_ids = self.query_ids(), self._doc_id_list()
+        queries, docs, scores = self._columns()
+        make = partial(tuple.__new__, self.data_cls) # skips the NamedTuple's __new__
+        for start in range(0, len(queries), self.chunk_size):
+            end = start + self.chunk_size
+            yield from map(make, zip(
+                map(query_ids.__getitem__, queries[start:end].tolist()),
+                map(doc_ids.__getitem__, docs[start:end].tolist()),
+                scores[start:end].tolist()))
+
+    def _query_idxs(self, query_ids):
+        # record indices of the given queries, in their original order
+        np = ir_datasets.lazy_libs.numpy()
+        if self._query_lookup is None:
+            self._query_lookup = {qid: i for i, qid in enumerate(self.query_ids())}
+        info = self._info
+        offsets = self._array('offsets.bin', 'int64', info['query_count'] + 1)
+        order = None if info['grouped'] else self._array('order.bin', 'int64', info['count'])
+        ranges = []
+        for q in sorted({self._query_lookup[qid] for qid in query_ids if qid in self._query_lookup}):
+            start, end = int(offsets[q]), int(offsets[q+1])
+            ranges.append(np.arange(start, end) if order is None else order[start:end])
+        if not ranges:
+            return np.zeros(0, dtype=np.int64)
+        idxs = np.concatenate(ranges)
+        if order is not None:
+            idxs.sort()
+        return idxs
+
+    def records_for(self, query_ids):
+        """
+        Returns an iterator over the records of the given query ID(s), in their original order. Only the records
+        of these queries are read.
+        """
+        self.build()
+        if isinstance(query_ids, str):
+            query_ids = (query_ids,)
+        idxs = self._query_idxs(query_ids)
+        queries, docs, scores = self._columns()
+        query_id_list = self.query_ids()
+        return map(partial(tuple.__new__, self.data_cls), zip(
+            map(query_id_list.__getitem__, queries[idxs].tolist()),
+            map(self._doc_id_getter(), docs[idxs].tolist()),
+            scores[idxs].tolist()))
@@ -0,0 +1,86 @@
+import os
+import ir_datasets
+
+
+_logger = ir_datasets.log.easy()
+
+
+MAGIC = b'ZCHKTBL1'
+
+ZDICT_SIZE = 32 * 1024
+
+
+class ZlibCheckpointTable:
+    """
+    A compact copy of a list of zlib_state checkpoints ((pos, (zdict, bits, byte), offset) tuples, used to seek in
+    gzip files), so that a single checkpoint can be read without loading (and unpickling) the others. A checkpoint
+    of (None, None, offset) stands for the start of the file.
+
+    The file starts with a header (MAGIC, the number of checkpoints n, and the size and mtime of source_path, the
+    file it was built from), followed by a (4, n) int64 table of the checkpoints' pos, offset, bits and byte
+    (packed as bits | byte << 8), and the end of each one's zlib dictionary, and finally the dictionaries, each
+    LZ4 block-compressed on its own. Only the table is loaded; a dictionary is read when its checkpoint is used.
+    """
+    def __init__(self, path, source_path):
+        self.path = path
+        self.source_path = source_path
+        self._table = None
+        self._data_start = None
+
+    def _source_info(self):
+        stat = os.stat(self.source_path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _load(self):
+        if self._table is None and os.path.exists(self.path):
+            np = ir_datasets.lazy_libs.numpy()
+            with open(self.path, 'rb') as f:
+                header = f.read(32)
+            if len(header) == 32 and header[:8] == MAGIC:
+                count, size, mtime = np.frombuffer(header, dtype=np.int64, offset=8).tolist()
+                if [size, mtime] == self._source_info():
+                    # the table is small (32 bytes per checkpoint), so it is read rather than memory-mapped, which
+                    # would keep a file descriptor open for each source file
+                    self._table = np.fromfile(self.path, dtype=np.int64, count=4 * count, offset=32).reshape(4, count)
+                    self._data_start = 32 + 4 * 8 * count
+        return self._table
+
+    def built(self):
+        return self._load() is not None
+
+    def build(self, checkpoints):
+        np = ir_datasets.lazy_libs.numpy()
+        lz4 = ir_datasets.lazy_libs.lz4_block()
+        table = np.zeros((4, len(checkpoints)), dtype=np.int64)
+        blobs = []
+        end = 0
+        for i, (pos, state, offset) in enumerate(checkpoints):
+            if state is None:
+                # the start of the file, which has no state (stored as pos -1)
+                table[:, i] = (-1, offset, 0, end)
+                continue
+            zdict, bits, byte = state
+            blob = lz4.block.compress(zdict, store_size=False)
+            end += len(blob)
+            table[:, i] = (pos, offset, bits | (byte << 8), end)
+            blobs.append(blob)
+        with ir_datasets.util.finialized_file(self.path, 'wb') as fout:
+            fout.write(MAGIC)
+            fout.write(np.array([len(checkpoints)] + self._source_info(), dtype=np.int64).tobytes())
+            fout.write(table.tobytes())
+            fout.writelines(blobs)
+        self._table = None
+        self._load()
+
+    def __len__(self):
+        return self._table.shape[1]
+
+    def __getitem__(self, idx):
+        pos, offset, bits_byte, end = self._table[:, idx].tolist()
+        if pos == -1:
+            return None, None, offset
+        start = int(self._table[3, idx-1]) if idx > 0 else 0
+        with open(self.path, 'rb') as f:
+            f.seek(self._data_start + start)
+            zdict = ir_datasets.lazy_libs.lz4_block().block.decompress(f.read(end - start), uncompressed_size=ZDICT_SIZE)
+        return pos, (zdict, bits_byte & 0xff, bits_byte >> 8), offset
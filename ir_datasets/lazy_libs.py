@@ -57,6 +57,76 @@ def json():
     return _cache['json']
 
 
+class JsonBackend:
+    """
+    Decodes JSON using the fastest available library (see json_backend()). ``loads(s)`` decodes a single document
+    (str or bytes), and ``loads_lines(lines)`` decodes a list of documents (e.g., the non-blank lines of a JSONL
+    file) in bulk. Both return the same values as the standard library's json.loads (except that orjson reads
+    integers beyond 64 bits as floats).
+    """
+    def __init__(self, name, loads, loads_lines):
+        self.name = name
+        self.loads = loads
+        self.loads_lines = loads_lines
+
+
+def json_backend():
+    # orjson or simdjson (pysimdjson) if installed, otherwise the standard library. IR_DATASETS_JSON_BACKEND can
+    # be set to orjson, simdjson, or json to choose one explicitly.
+    if 'json_backend' not in _cache:
+        import os
+        stdlib_json = json()
+        name = os.environ.get('IR_DATASETS_JSON_BACKEND', '').lower()
+        backend = None
+        if name in ('', 'orjson'):
+            try:
+                import orjson
+            except ImportError as ie:
+                if name:
+                    raise ImportError("IR_DATASETS_JSON_BACKEND=orjson requires orjson. Run 'pip install orjson' to install it") from ie
+            else:
+                def loads(s):
+                    try:
+                        return orjson.loads(s)
+                    except orjson.JSONDecodeError:
+                        pass
+                    return stdlib_json.loads(s) # orjson is stricter in some cases (e.g., NaN)
+                backend = JsonBackend('orjson', loads, lambda lines: list(map(loads, lines)))
+        if backend is None and name in ('', 'simdjson'):
+            try:
+                import simdjson
+            except ImportError as ie:
+                if name:
+                    raise ImportError("IR_DATASETS_JSON_BACKEND=simdjson requires pysimdjson. Run 'pip install pysimdjson' to install it") from ie
+            else:
+                def loads(s):
+                    try:
+                        return simdjson.loads(s)
+                    except ValueError:
+                        pass
+                    return stdlib_json.loads(s)
+                backend = JsonBackend('simdjson', loads, lambda lines: list(map(loads, lines)))
+        if backend is None:
+            def loads_lines(lines):
+                # decoding the lines as a single array is faster than one at a time with the standard library
+                if not lines:
+                    return []
+                if isinstance(lines[0], bytes):
+                    data = b'[' + b','.join(lines) + b']'
+                else:
+                    data = '[' + ','.join(lines) + ']'
+                try:
+                    result = stdlib_json.loads(data)
+                except ValueError:
+                    result = None
+                if result is None or len(result) != len(lines):
+                    result = [stdlib_json.loads(line) for line in lines] # invalid line (raises the error), or a line with several values
+                return result
+            backend = JsonBackend('json', stdlib_json.loads, loads_lines)
+        _cache['json_backend'] = backend
+    return _cache['json_backend']
+
+
 def trec_car():
     if 'trec_car' not in _cache:
         try:
@@ -152,3 +222,13 @@ def pyarrow_parquet():
             raise ImportError("This dataset requires pyarrow. Run 'pip install ir_datasets[pyarrow]' to install dependencies for this dataset") from ie
         _cache['pyarrow_parquet'] = pyarrow.parquet
     return _cache['pyarrow_parquet']
+
+def pyarrow():
+    if 'pyarrow' not in _cache:
+        try:
+            import pyarrow
+            import pyarrow.ipc
+        except ImportError as ie:
+            raise ImportError("This feature requires pyarrow. Run 'pip install ir_datasets[pyarrow]' to install dependencies for this feature") from ie
+        _cache['pyarrow'] = pyarrow
+    return _cache['pyarrow']
@@ -1,10 +1,11 @@
 import re
 import os
 import math
+import hashlib
 import functools
 import shutil
 from contextlib import contextmanager
-from threading import Lock
+from threading import Lock, Semaphore
 from pathlib import Path
 import tempfile
 import ir_datasets
@@ -34,19 +35,35 @@ def home_path():
     return p
 
 
+def derived_path(source_paths, suffix):
+    """
+    Returns a path under home_path() for a file (or directory) derived from the files at source_paths (e.g., a
+    compiled copy of them), named by a hash of their absolute paths. Derived files are not written beside the source
+    files, since these may be user-supplied or part of a read-only installation.
+    """
+    if isinstance(source_paths, (str, Path)):
+        source_paths = [source_paths]
+    source_paths = [os.path.abspath(str(p)) for p in source_paths]
+    paths_hash = hashlib.md5('\n'.join(source_paths).encode()).hexdigest()[:16]
+    return str(home_path()/'derived'/f'{os.path.basename(source_paths[0])}.{paths_hash}{suffix}')
+
+
 @contextmanager
-def finialized_file(path, mode):
+def finialized_file(path, mode, unique_tmp=False):
+    # unique_tmp: use a temporary file name that's unique to this process, for files that may be written by
+    # several processes at once (the last one to finish replaces the others)
     if path == os.devnull:
         with open(path, mode) as f:
             yield f
     else:
+        tmp_path = f'{path}.tmp{os.getpid()}' if unique_tmp else f'{path}.tmp'
         try:
-            with open(f'{path}.tmp', mode) as f:
+            with open(tmp_path, mode) as f:
                 yield f
-            os.replace(f'{path}.tmp', path)
+            os.replace(tmp_path, path)
         except:
             try:
-                os.remove(f'{path}.tmp')
+                os.remove(tmp_path)
             except:
                 pass # ignore
             raise
@@ -85,7 +102,7 @@ def apply_sub_slice(orig_slice: slice, new_slice: slice):
         elif isinstance(new_slice.start, float):
             if orig_slice.stop is None:
                 raise ValueError('start cannot be float with unknown size')
-            if not (0. <= new_slice.stop <= 1.):
+            if not (0. <= new_slice.start <= 1.):
                 raise ValueError('start must be in interval [0,1] if float')
             size = orig_slice.stop - (orig_slice.start or 0)
             start = (new_slice.start * size) + (orig_slice.start or 0)
@@ -260,3 +277,30 @@ def ws_tok(s):
         left = next
     if left != len(s):
         yield s[left:len(s)]
+
+
+def bounded_imap(pool, fn, it, limit):
+    """
+    Yields pool.imap(fn, it) (in the order of it), but only takes the next item from it while fewer than limit items
+    are in flight, to limit memory usage. (On its own, imap consumes it as fast as it can.)
+    """
+    semaphore = Semaphore(limit)
+    stopped = False
+    it = iter(it)
+    def it_in():
+        while True:
+            semaphore.acquire()
+            if stopped:
+                return
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            yield item
+    try:
+        for result in pool.imap(fn, it_in()):
+            semaphore.release() # allow next item to begin processing
+            yield result
+    finally:
+        stopped = True
+        semaphore.release() # unblock it_in if it's waiting
@@ -177,6 +177,7 @@ class ReTar:
 class GzipExtract:
     def __init__(self, streamer):
         self._streamer = streamer
+        self._checkpoint_index = None
 
     def __getattr__(self, attr):
         return getattr(self._streamer, attr)
@@ -186,6 +187,23 @@ class GzipExtract:
         with self._streamer.stream() as stream:
             yield gzip.GzipFile(fileobj=stream)
 
+    def checkpoint_index(self):
+        # Returns a GzipCheckpointIndex for seeking to lines in the file, or None if the source is not a file
+        # on disk, is too small to benefit from one, or zlib-state (an optional dependency) is not installed.
+        if self._checkpoint_index is None:
+            path = self._streamer.path(force=False) if hasattr(self._streamer, 'path') else None
+            if path is None or not os.path.isfile(path):
+                return None
+            try:
+                ir_datasets.lazy_libs.zlib_state()
+            except ImportError:
+                return None
+            index = ir_datasets.indices.GzipCheckpointIndex(path)
+            if os.path.getsize(path) <= index.checkpoint_freq:
+                return None
+            self._checkpoint_index = index
+        return self._checkpoint_index
+
 
 class Bz2Extract:
     def __init__(self, streamer):
@@ -13,8 +13,17 @@ class Registry:
         self._registered = {}
         self._patterns = []
         self._allow_overwrite = allow_overwrite
+        self._lazy = {} # dataset ID prefix -> functions that register the datasets under it
+        self._lazy_prefixes = set()
+        self._lazy_fallback = []
 
     def __getitem__(self, key):
+        if key not in self._registered:
+            prefix = key.split('/')[0]
+            if prefix in self._lazy_prefixes:
+                self._load_lazy(prefix)
+            else:
+                self._load_all() # could be registered by anything
         if key not in self._registered:
             for pattern, initializer in self._patterns:
                 match = pattern.match(key)
@@ -29,8 +38,37 @@ class Registry:
         return result
 
     def __iter__(self):
+        self._load_all()
         return iter(self._registered.keys())
 
+    def register_lazy(self, prefix, loader):
+        """
+        Registers a function (e.g., one that imports a module) that's called the first time that a
+        dataset ID starting with prefix (the part before the first /) is requested.
+        """
+        self._lazy.setdefault(prefix, []).append(loader)
+        self._lazy_prefixes.add(prefix)
+
+    def register_lazy_fallback(self, loader):
+        """
+        Registers a function that loads all lazily-registered datasets; called when iterating over the
+        registry or when a dataset ID is not found.
+        """
+        self._lazy_fallback.append(loader)
+
+    def _load_lazy(self, prefix):
+        # one at a time, since loaders can look up other datasets with the same prefix
+        loaders = self._lazy.get(prefix, [])
+        while loaders:
+            loaders.pop(0)()
+
+    def _load_all(self):
+        loaders, self._lazy_fallback = self._lazy_fallback, []
+        for loader in loaders:
+            loader()
+        for prefix in list(self._lazy):
+            self._load_lazy(prefix)
+
     def register(self, name, obj):
         from ..datasets.base import Dataset
         if name in self._registered:
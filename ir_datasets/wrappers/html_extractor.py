@@ -35,6 +35,9 @@ class HtmlDocIter:
     def __iter__(self):
         return self
 
+    def seekable(self):
+        return callable(getattr(self.it, 'seekable', None)) and self.it.seekable()
+
     def __getitem__(self, key):
         if isinstance(key, int):
             doc = self.it[key]
@@ -0,0 +1,49 @@
+# Measures the latency of random C4Docstore lookups on synthetic c4-style files, with and without the pool of open
+# source files (clear_cache() closes them).
+# Usage: python -m test.benchmarks.c4_lookup [--files 8] [--docs 20000] [--lookups 500] [--workers 1]
+import sys
+import time
+import random
+import argparse
+import tempfile
+from ir_datasets.indices import DocstoreOptions
+from test.indices.zlib_checkpoint_table import write_c4
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--lookups', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args(args)
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as d:
+        c4_docs, docs = write_c4(d, args.files, args.docs, rng)
+        doc_ids = list(docs)
+        store = c4_docs.docs_store(options=DocstoreOptions(lookup_workers=args.workers))
+        store.get_many(doc_ids[::args.docs]) # builds the checkpoint tables
+
+        lookups = [rng.choice(doc_ids) for _ in range(args.lookups)]
+        start = time.perf_counter()
+        for doc_id in lookups:
+            store.get(doc_id)
+            store.clear_cache()
+        elapsed = time.perf_counter() - start
+        print(f'get (re-opening files): {elapsed / len(lookups) * 1000:.2f}ms')
+        start = time.perf_counter()
+        for doc_id in lookups:
+            store.get(doc_id)
+        elapsed = time.perf_counter() - start
+        print(f'get (pooled files): {elapsed / len(lookups) * 1000:.2f}ms')
+
+        batches = [rng.sample(doc_ids, 64) for _ in range(args.lookups // 64 + 1)]
+        start = time.perf_counter()
+        for batch in batches:
+            store.get_many(batch)
+        elapsed = time.perf_counter() - start
+        print(f'get_many (64 docs, pooled files): {elapsed / len(batches) * 1000:.2f}ms')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
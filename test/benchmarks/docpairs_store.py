@@ -0,0 +1,64 @@
+# Measures reading docpairs from the text file and from the compiled store (in order, by index, and shuffled).
+# Usage: python -m test.benchmarks.docpairs_store [--count 2000000] [--file existing.tsv]
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from ir_datasets.formats import TsvDocPairs, GenericDocPair
+from ir_datasets.formats.tsv import TsvIter, FileLineIter
+
+
+class LocalFile:
+    def __init__(self, path):
+        self._path = path
+
+    def path(self, force=True):
+        return self._path
+
+    def stream(self):
+        return open(self._path, 'rb')
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=2_000_000)
+    parser.add_argument('--file', help='an existing query_id/doc_id_a/doc_id_b TSV file to read, rather than generated data')
+    args = parser.parse_args(args)
+    with tempfile.TemporaryDirectory() as d:
+        path = args.file
+        if path is None:
+            rng = random.Random(42)
+            path = os.path.join(d, 'file.tsv')
+            with open(path, 'wt') as f:
+                for _ in range(args.count):
+                    f.write(f'{rng.randrange(500_000)}\t{rng.randrange(8_800_000)}\t{rng.randrange(8_800_000)}\n')
+        docpairs = TsvDocPairs(LocalFile(path), docpairs_store_path=os.path.join(d, 'store'))
+        start = time.perf_counter()
+        count = sum(1 for _ in TsvIter(GenericDocPair, FileLineIter(LocalFile(path), start=0)))
+        elapsed = time.perf_counter() - start
+        print(f'parse: {count / elapsed:.0f} records/s')
+        start = time.perf_counter()
+        len(docpairs.docpairs_iter()) # builds the store
+        print(f'build: {time.perf_counter() - start:.1f}s')
+        start = time.perf_counter()
+        count = sum(1 for _ in docpairs.docpairs_iter())
+        elapsed = time.perf_counter() - start
+        print(f'store: {count / elapsed:.0f} records/s')
+        start = time.perf_counter()
+        count = sum(1 for _ in docpairs.docpairs_iter().shuffled(seed=42))
+        elapsed = time.perf_counter() - start
+        print(f'shuffled: {count / elapsed:.0f} records/s')
+        rng = random.Random(42)
+        it = docpairs.docpairs_iter()
+        idxs = [rng.randrange(count) for _ in range(10_000)]
+        start = time.perf_counter()
+        for idx in idxs:
+            it[idx]
+        elapsed = time.perf_counter() - start
+        print(f'docpairs_iter()[i]: {elapsed / len(idxs) * 1_000_000:.1f}us/record')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,39 @@
+# Measures the time it takes to import ir_datasets and load a single dataset (each in a fresh process),
+# and which dataset modules end up imported.
+# Usage: python -m test.benchmarks.import_time [--dataset vaswani] [--repeat 5]
+import sys
+import json
+import argparse
+import subprocess
+
+
+SCRIPT = '''
+import sys, time, json
+start = time.perf_counter()
+import ir_datasets
+imported = time.perf_counter()
+ir_datasets.load({dataset!r})
+loaded = time.perf_counter()
+modules = sorted(m for m in sys.modules if m.startswith('ir_datasets.datasets.'))
+print(json.dumps([imported - start, loaded - imported, modules]))
+'''
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dataset', default='vaswani')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(args)
+    import_times, load_times = [], []
+    for _ in range(args.repeat):
+        output = subprocess.run([sys.executable, '-c', SCRIPT.format(dataset=args.dataset)], check=True, capture_output=True, text=True).stdout
+        import_time, load_time, modules = json.loads(output)
+        import_times.append(import_time)
+        load_times.append(load_time)
+    print(f'import ir_datasets: {min(import_times)*1000:.0f}ms (best of {args.repeat})')
+    print(f'load({args.dataset!r}): {min(load_times)*1000:.0f}ms (best of {args.repeat})')
+    print(f'dataset modules imported: {len(modules)} ({", ".join(m.split(".")[-1] for m in modules)})')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
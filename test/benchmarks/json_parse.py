@@ -0,0 +1,76 @@
+# Measures how quickly JSONL records are decoded by each available JSON backend, one line at a time (loads) and
+# in bulk (loads_lines), and how quickly JsonlDocs iterates over them.
+# Usage: python -m test.benchmarks.json_parse [--count 200000] [--file existing.jsonl]
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import ir_datasets
+from ir_datasets.formats import JsonlDocs, GenericDoc
+
+
+BACKENDS = ['json', 'orjson', 'simdjson']
+
+
+class LocalFile:
+    def __init__(self, path):
+        self._path = path
+
+    def path(self, force=True):
+        return self._path
+
+    def stream(self):
+        return open(self._path, 'rb')
+
+
+def backend(name):
+    os.environ['IR_DATASETS_JSON_BACKEND'] = name
+    ir_datasets.lazy_libs._cache.pop('json_backend', None)
+    try:
+        return ir_datasets.lazy_libs.json_backend()
+    except ImportError:
+        return None
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=200_000)
+    parser.add_argument('--file', help='an existing JSONL file with doc_id and text fields, rather than generated data')
+    args = parser.parse_args(args)
+    with tempfile.TemporaryDirectory() as d:
+        path = args.file
+        if path is None:
+            rng = random.Random(42)
+            path = os.path.join(d, 'file.jsonl')
+            with open(path, 'wt') as f:
+                for i in range(args.count):
+                    text = ' '.join(f'w{rng.randrange(10000)}' for _ in range(rng.randrange(20, 200)))
+                    f.write(json.dumps({'doc_id': str(i), 'text': text, 'score': rng.random(), 'tags': ['a', 'b']}) + '\n')
+        with open(path, 'rb') as f:
+            lines = [line for line in f if not line.isspace()]
+        for name in BACKENDS:
+            json_backend = backend(name)
+            if json_backend is None:
+                print(f'{name}: not installed')
+                continue
+            start = time.perf_counter()
+            for line in lines:
+                json_backend.loads(line)
+            elapsed = time.perf_counter() - start
+            print(f'{name} loads: {len(lines) / elapsed:.0f} records/s')
+            start = time.perf_counter()
+            for i in range(0, len(lines), 1000):
+                json_backend.loads_lines(lines[i:i+1000])
+            elapsed = time.perf_counter() - start
+            print(f'{name} loads_lines: {len(lines) / elapsed:.0f} records/s')
+            start = time.perf_counter()
+            count = sum(1 for _ in JsonlDocs(LocalFile(path), GenericDoc).docs_iter())
+            elapsed = time.perf_counter() - start
+            print(f'{name} JsonlDocs: {count / elapsed:.0f} records/s')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,55 @@
+# Compares the build time, size, and lookup speed of NumpySortedIndex and NumpyHashIndex, and the time it
+# takes to commit a small batch of keys to a large existing index.
+# Usage: python -m test.benchmarks.key_index [--count 1000000]
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from functools import partial
+from ir_datasets.indices import NumpySortedIndex, NumpyHashIndex
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--lookups', type=int, default=100_000)
+    parser.add_argument('--long_key', action='store_true', help='include a single very long key (inflates the padding of the sorted index)')
+    parser.add_argument('--small_commit', type=int, default=100, help='size of the small commits')
+    args = parser.parse_args(args)
+    rng = random.Random(42)
+    keys = [f'doc{rng.randrange(10**12)}-{i}' for i in range(args.count)]
+    if args.long_key:
+        keys.append('x' * 500)
+    lookups = [rng.choice(keys) for _ in range(args.lookups)] + [f'missing{i}' for i in range(args.lookups // 10)]
+    with tempfile.TemporaryDirectory() as d:
+        for index_cls in [NumpySortedIndex, NumpyHashIndex]:
+            idx = index_cls(os.path.join(d, index_cls.__name__))
+            start = time.perf_counter()
+            for i, key in enumerate(keys):
+                idx.add(key, i)
+            idx.commit()
+            build_time = time.perf_counter() - start
+            idx.close()
+            start = time.perf_counter()
+            for i in range(0, len(lookups), 1000):
+                idx[lookups[i:i+1000]]
+            lookup_time = time.perf_counter() - start
+            print(f'{index_cls.__name__}: build={build_time:.2f}s size={idx.nbytes()/1e6:.1f}MB lookup={lookup_time/len(lookups)*1e6:.2f}us/key')
+            idx.close()
+        for name, index_cls in [('merge', NumpySortedIndex), ('deltas', partial(NumpySortedIndex, max_deltas=8))]:
+            idx = index_cls(os.path.join(d, NumpySortedIndex.__name__))
+            times = []
+            for commit in range(20):
+                start = time.perf_counter()
+                for i in range(args.small_commit):
+                    idx.add(f'new{commit}-{i}', i)
+                idx.commit()
+                times.append(time.perf_counter() - start)
+            print(f'NumpySortedIndex small commits ({name}): {sum(times)/len(times)*1000:.1f}ms/commit')
+            idx.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,43 @@
+# Measures PickleLz4FullStore lookup throughput when lookups are performed from several threads at once,
+# for each file access mode.
+# Usage: python -m test.benchmarks.lookup_threads [--count 200000] [--threads 1,2,4,8]
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from ir_datasets.formats import GenericDoc
+from ir_datasets.indices import PickleLz4FullStore, FileAccess, DocstoreOptions
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=200_000)
+    parser.add_argument('--lookups', type=int, default=50_000)
+    parser.add_argument('--batch_size', type=int, default=10, help='number of doc_ids per get_many call')
+    parser.add_argument('--threads', default='1,2,4,8')
+    parser.add_argument('--block_size', type=int, default=None)
+    args = parser.parse_args(args)
+    rng = random.Random(42)
+    docs = [GenericDoc(f'doc{i}', ' '.join(f'w{rng.randrange(5000)}' for _ in range(rng.randrange(20, 200)))) for i in range(args.count)]
+    batches = [[f'doc{rng.randrange(args.count)}' for _ in range(args.batch_size)] for _ in range(args.lookups // args.batch_size)]
+    print(f'cpus={os.cpu_count()}')
+    with tempfile.TemporaryDirectory() as d:
+        PickleLz4FullStore(d, lambda: iter(docs), GenericDoc, 'doc_id', ['doc_id'], block_size=args.block_size).build()
+        for file_access in FileAccess.__members__.values():
+            store = PickleLz4FullStore(d, None, GenericDoc, 'doc_id', ['doc_id'], options=DocstoreOptions(file_access=file_access), block_size=args.block_size)
+            store.get_many(batches[0]) # warm up (loads the indices)
+            for threads in [int(t) for t in args.threads.split(',')]:
+                with ThreadPoolExecutor(threads) as pool:
+                    start = time.perf_counter()
+                    for _ in pool.map(store.get_many, batches):
+                        pass
+                    elapsed = time.perf_counter() - start
+                print(f'{file_access.name} threads={threads}: {len(batches) * args.batch_size / elapsed:.0f} lookups/s')
+            store.lookup.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
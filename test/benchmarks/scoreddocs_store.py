@@ -0,0 +1,60 @@
+# Measures reading scoreddocs from the text file, from the compiled store, and for individual queries (scoreddocs_for).
+# Usage: python -m test.benchmarks.scoreddocs_store [--queries 2000] [--depth 1000] [--file existing.run]
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from ir_datasets.formats import TrecScoredDocs
+
+
+class LocalFile:
+    def __init__(self, path):
+        self._path = path
+
+    def path(self, force=True):
+        return self._path
+
+    def stream(self):
+        return open(self._path, 'rb')
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--depth', type=int, default=1000)
+    parser.add_argument('--file', help='an existing run file to read, rather than generated data')
+    args = parser.parse_args(args)
+    with tempfile.TemporaryDirectory() as d:
+        path = args.file
+        if path is None:
+            rng = random.Random(42)
+            path = os.path.join(d, 'file.run')
+            with open(path, 'wt') as f:
+                for qid in range(args.queries):
+                    for rank in range(args.depth):
+                        f.write(f'{qid}\t{rng.randrange(8_000_000)}\t{args.depth - rank}\n')
+        scoreddocs = TrecScoredDocs(LocalFile(path), scoreddocs_store_path=os.path.join(d, 'store'))
+        start = time.perf_counter()
+        count = sum(1 for _ in scoreddocs._scoreddocs_parse_iter())
+        elapsed = time.perf_counter() - start
+        print(f'parse: {count / elapsed:.0f} records/s')
+        start = time.perf_counter()
+        scoreddocs._scoreddocs_store().build()
+        print(f'build: {time.perf_counter() - start:.1f}s')
+        scoreddocs = TrecScoredDocs(LocalFile(path), scoreddocs_store_path=os.path.join(d, 'store'))
+        start = time.perf_counter()
+        count = sum(1 for _ in scoreddocs.scoreddocs_iter())
+        elapsed = time.perf_counter() - start
+        print(f'store: {count / elapsed:.0f} records/s')
+        scoreddocs = TrecScoredDocs(LocalFile(path), scoreddocs_store_path=os.path.join(d, 'store'))
+        query_ids = random.Random(1).sample(scoreddocs._scoreddocs_store().query_ids(), 100)
+        start = time.perf_counter()
+        count = sum(1 for qid in query_ids for _ in scoreddocs.scoreddocs_for(qid))
+        elapsed = time.perf_counter() - start
+        print(f'scoreddocs_for: {elapsed / len(query_ids) * 1000:.2f}ms/query ({count / elapsed:.0f} records/s)')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,51 @@
+# Measures how quickly each TrecDocs parser reads TREC SGML documents.
+# Usage: python -m test.benchmarks.trec_parse [--count 20000] [--parsers text tut BS4 sax] [--file existing.sgml]
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from ir_datasets.formats import TrecDocs
+
+
+class LocalFile:
+    def __init__(self, path):
+        self._path = path
+
+    def path(self, force=True):
+        return self._path
+
+    def stream(self):
+        return open(self._path, 'rb')
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=20_000)
+    parser.add_argument('--parsers', nargs='+', default=['text', 'tut', 'BS4', 'sax'])
+    parser.add_argument('--file', help='an existing file of TREC SGML documents to parse, rather than generated data')
+    args = parser.parse_args(args)
+    with tempfile.TemporaryDirectory() as d:
+        path = args.file
+        if path is None:
+            rng = random.Random(42)
+            path = os.path.join(d, 'docs.sgml')
+            with open(path, 'wt') as f:
+                for i in range(args.count):
+                    f.write(f'<DOC>\n<DOCNO> DOC-{i} </DOCNO>\n<URL> http://example.com/{i} </URL>\n<TITLE> title {i} </TITLE>\n')
+                    f.write(f'<HEADLINE>\nheadline {i}\n</HEADLINE>\n<TEXT>\n')
+                    for _ in range(rng.randrange(5, 60)):
+                        f.write(' '.join(f'w{rng.randrange(10000)}' for _ in range(rng.randrange(5, 15))) + '\n')
+                    f.write('</TEXT>\n</DOC>\n')
+        size = os.path.getsize(path)
+        for name in args.parsers:
+            docs = TrecDocs(LocalFile(path), parser=name)
+            start = time.perf_counter()
+            count = sum(1 for _ in docs._docs_iter(path))
+            elapsed = time.perf_counter() - start
+            print(f'{name}: {count / elapsed:.0f} docs/s ({size / elapsed / 1024 / 1024:.1f} MB/s)')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
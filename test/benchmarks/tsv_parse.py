@@ -0,0 +1,48 @@
+# Measures how quickly TSV records are parsed, one at a time (iteration) and in batches (TsvIter.batches).
+# Usage: python -m test.benchmarks.tsv_parse [--count 1000000] [--file existing.tsv]
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from ir_datasets.formats import TsvQueries
+
+
+class LocalFile:
+    def __init__(self, path):
+        self._path = path
+
+    def path(self, force=True):
+        return self._path
+
+    def stream(self):
+        return open(self._path, 'rb')
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=1_000_000)
+    parser.add_argument('--file', help='an existing two-column TSV file to parse, rather than generated data')
+    args = parser.parse_args(args)
+    with tempfile.TemporaryDirectory() as d:
+        path = args.file
+        if path is None:
+            rng = random.Random(42)
+            path = os.path.join(d, 'file.tsv')
+            with open(path, 'wt') as f:
+                for i in range(args.count):
+                    f.write(f'{i}\t' + ' '.join(f'w{rng.randrange(10000)}' for _ in range(rng.randrange(5, 60))) + '\n')
+        queries = TsvQueries(LocalFile(path))
+        start = time.perf_counter()
+        count = sum(1 for _ in queries.queries_iter())
+        elapsed = time.perf_counter() - start
+        print(f'iteration: {count / elapsed:.0f} records/s')
+        start = time.perf_counter()
+        count = sum(len(batch) for batch in queries.queries_iter().batches())
+        elapsed = time.perf_counter() - start
+        print(f'batches: {count / elapsed:.0f} records/s')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,61 @@
+# Measures the latency of ClueWebWarcIndex lookups on a synthetic WARC file, finding checkpoints with the in-memory
+# checkpoint table versus reading through the index file.
+# Usage: python -m test.benchmarks.warc_lookup [--docs 20000] [--checkpoint-freq 1048576] [--lookups 100]
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from ir_datasets.formats.webarc import WarcDocs
+from ir_datasets.indices import ClueWebWarcIndex
+from ir_datasets.indices.clueweb_warc import WarcIndexFile, checkpoint_table
+from test.indices.clueweb_warc import write_warc
+
+
+def main(args):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--checkpoint-freq', type=int, default=1024*1024)
+    parser.add_argument('--lookups', type=int, default=100)
+    args = parser.parse_args(args)
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as d:
+        source_path, index_path = os.path.join(d, 'file.warc.gz'), os.path.join(d, 'file.warc.gz.chk.lz4')
+        doc_ids = write_warc(source_path, args.docs, rng)
+        index = ClueWebWarcIndex(source_path, index_path)
+        index.build(checkpoint_freq=args.checkpoint_freq)
+        table = checkpoint_table(index_path)
+        print(f'{os.path.getsize(source_path) / 1024 / 1024:.1f}MB WARC, {len(table._table["doc_ids"])} checkpoints')
+        lookups = [rng.choice(doc_ids) for _ in range(args.lookups)]
+        docs = WarcDocs()
+
+        start = time.perf_counter()
+        for doc_id in lookups:
+            chk_idx = table.find(doc_id)
+            if chk_idx >= 0:
+                table.checkpoint(chk_idx)
+        elapsed = time.perf_counter() - start
+        print(f'find checkpoint (table): {elapsed / len(lookups) * 1000:.2f}ms')
+        start = time.perf_counter()
+        for doc_id in lookups:
+            with WarcIndexFile(index_path, 'rb') as f_chk:
+                while f_chk and f_chk.peek_doc_id() <= doc_id:
+                    f_chk.read()
+        elapsed = time.perf_counter() - start
+        print(f'find checkpoint (index file): {elapsed / len(lookups) * 1000:.2f}ms')
+
+        start = time.perf_counter()
+        for doc_id in lookups:
+            list(index.get_many_iter([doc_id], docs))
+        elapsed = time.perf_counter() - start
+        print(f'get_many_iter (table): {elapsed / len(lookups) * 1000:.2f}ms')
+        start = time.perf_counter()
+        for doc_id in lookups:
+            list(index._get_many_iter_stream([doc_id], docs))
+        elapsed = time.perf_counter() - start
+        print(f'get_many_iter (index file): {elapsed / len(lookups) * 1000:.2f}ms')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
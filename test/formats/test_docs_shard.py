@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+import multiprocessing
+import ir_datasets
+from ir_datasets.formats import BaseDocs, GenericDoc
+from ir_datasets.indices import PickleLz4FullStore
+
+
+DOCS = [GenericDoc(f'doc{i}', f'text {i}') for i in range(2345)]
+
+
+def _docs_iter():
+    return iter(DOCS)
+
+
+class StoreDocs(BaseDocs):
+    def __init__(self, path):
+        self._store = PickleLz4FullStore(path, lambda: iter(DOCS), GenericDoc, 'doc_id', ['doc_id'])
+
+    def docs_iter(self):
+        return iter(self._store)
+
+    def docs_count(self):
+        return self._store.count()
+
+
+class SplitterDocs(BaseDocs):
+    # like TsvDocs, the docstore is only built when it's needed. Only holds the path, so it can be pickled.
+    def __init__(self, path):
+        self._path = path
+
+    @ir_datasets.util.use_docstore
+    def docs_iter(self):
+        return _docs_iter()
+
+    def docs_store(self):
+        return PickleLz4FullStore(self._path, _docs_iter, GenericDoc, 'doc_id', ['doc_id'])
+
+    def docs_count(self):
+        return len(DOCS)
+
+
+class GeneratorDocs(BaseDocs):
+    def docs_iter(self):
+        yield from DOCS
+
+    def docs_count(self):
+        return len(DOCS)
+
+
+class ReadThroughIter:
+    # supports slicing, but by reading through everything before the start
+    def __init__(self, start=0, stop=None):
+        self.it = iter(DOCS[start:stop])
+
+    def __next__(self):
+        return next(self.it)
+
+    def __iter__(self):
+        return self
+
+    def __getitem__(self, key):
+        raise AssertionError('should not be sliced')
+
+
+class ReadThroughDocs(GeneratorDocs):
+    def docs_iter(self):
+        return ReadThroughIter()
+
+
+class TestDocsShard(unittest.TestCase):
+    def test_shard(self):
+        with tempfile.TemporaryDirectory() as d:
+            for docs in [StoreDocs(d), GeneratorDocs()]:
+                for num_shards in [1, 3, 7]:
+                    shards = [list(docs.docs_shard(i, num_shards)) for i in range(num_shards)]
+                    self.assertEqual(sorted(doc for shard in shards for doc in shard), sorted(DOCS))
+                    self.assertTrue(all(abs(len(shard) - len(DOCS) / num_shards) <= 1 for shard in shards))
+            # seekable docs_iters yield contiguous ranges
+            self.assertEqual(list(StoreDocs(d).docs_shard(1, 3)), DOCS[781:1563])
+            self.assertEqual(list(ReadThroughDocs().docs_shard(1, 3)), DOCS[1::3])
+
+    def test_parallel_iter(self):
+        with tempfile.TemporaryDirectory() as d:
+            for docs in [StoreDocs(d), GeneratorDocs(), ReadThroughDocs()]:
+                self.assertEqual(next(docs.docs_iter()), DOCS[0]) # files opened before forking are not shared with workers
+                self.assertEqual(list(docs.docs_parallel_iter(workers=3, chunk_size=100)), DOCS)
+                it = docs.docs_parallel_iter(workers=2, chunk_size=10)
+                self.assertEqual([next(it) for _ in range(15)], DOCS[:15])
+                it.close() # stopping early shouldn't hang
+
+    def test_parallel_iter_builds_docstore_once(self):
+        with tempfile.TemporaryDirectory() as d:
+            docs = SplitterDocs(d)
+            self.assertFalse(docs.docs_store().built())
+            self.assertEqual(list(docs.docs_parallel_iter(workers=3, chunk_size=100)), DOCS)
+            self.assertEqual(docs.docs_store().count(), len(DOCS))
+
+    def test_parallel_iter_spawn(self):
+        start_method = multiprocessing.get_start_method()
+        multiprocessing.set_start_method('spawn', force=True)
+        try:
+            with tempfile.TemporaryDirectory() as d:
+                # StoreDocs cannot be pickled (its docstore holds a lambda & locks), so it's read serially
+                for docs in [SplitterDocs(os.path.join(d, 'splitter')), StoreDocs(os.path.join(d, 'store'))]:
+                    self.assertEqual(list(docs.docs_parallel_iter(workers=2, chunk_size=1000)), DOCS)
+        finally:
+            multiprocessing.set_start_method(start_method, force=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import shutil
+import unittest
+from typing import NamedTuple
+import ir_datasets
+from ir_datasets.formats import JsonlDocs, JsonlQueries, GenericQuery
+from ir_datasets.util import StringFile
+
+
+class TestJsonl(unittest.TestCase):
+
+    def test_core(self):
+        class data_type(NamedTuple):
+            doc_id: str
+            title: str
+            text: str
+        mock_file = StringFile('''
+{"id": "123", "title": "some title", "contents": "some text", "extra": [1, 2]}
+
+{"id": "456", "title": "another title", "contents": "caf\\u00e9 \\ud83d\\ude00"}
+'''.lstrip())
+        expected_results = [
+            data_type('123', 'some title', 'some text'),
+            data_type('456', 'another title', 'café \U0001F600'),
+        ]
+        docs = JsonlDocs(mock_file, data_type, mapping={'doc_id': 'id', 'text': 'contents', 'title': 'title'})
+        self.assertEqual(list(docs.docs_iter()), expected_results)
+
+        queries = JsonlQueries(mock_file, GenericQuery, mapping={'query_id': 'id', 'text': 'title'})
+        self.assertEqual(list(queries.queries_iter()), [GenericQuery('123', 'some title'), GenericQuery('456', 'another title')])
+
+    def test_json_backend(self):
+        backend = ir_datasets.lazy_libs.json_backend()
+        self.assertEqual(backend.loads('{"a": [1, 2.5, null, true]}'), {'a': [1, 2.5, None, True]})
+        self.assertEqual(backend.loads(b'{"a": "\\u00e9"}'), {'a': 'é'})
+        self.assertEqual(backend.loads(str(2**63 - 1)), 2**63 - 1)
+        self.assertEqual(backend.loads_lines([b'{"a": 1}\n', b'[2]\n', b'"3"']), [{'a': 1}, [2], '3'])
+        self.assertEqual(backend.loads_lines([]), [])
+        with self.assertRaises(ValueError):
+            backend.loads_lines(['1', '{'])
+        with self.assertRaises(ValueError):
+            backend.loads_lines(['1, 2', '3'])
+
+    def tearDown(self):
+        if os.path.exists('MOCK.pklz4'):
+            shutil.rmtree('MOCK.pklz4')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,34 @@
+import io
 import os
+import gzip
+import random
 import shutil
+import tarfile
+import tempfile
 import unittest
-from ir_datasets.formats import TrecQrel, TrecQrels, TrecQuery, TrecQueries, TrecDoc, TrecDocs
-from ir_datasets.util import StringFile
+import multiprocessing
+from unittest import mock
+import ir_datasets
+from ir_datasets.formats import TrecQrel, TrecQrels, TrecQuery, TrecQueries, TrecDoc, TrecDocs, TrecScoredDocs, GenericScoredDoc, GenericDoc
+from ir_datasets.formats.trec import trec_doc_splitter
+from ir_datasets.datasets.base import FilteredQrels, FilteredScoredDocs
+from ir_datasets.indices import ScoredDocsStore
+from ir_datasets.util import StringFile, LocalDownload
+
+
+class UnpicklableEncoding(str):
+    def __new__(cls):
+        return super().__new__(cls, 'utf8')
+
+    def __reduce__(self):
+        raise TypeError('cannot pickle UnpicklableEncoding')
+
+
+def _build_scoreddocs_store(args):
+    store_path, path = args
+    store = ScoredDocsStore(store_path, TrecScoredDocs(LocalDownload(path))._scoreddocs_parse_iter, GenericScoredDoc, [path], chunk_size=100)
+    store.build()
+    return len(list(store))
 
 
 class TestTrec(unittest.TestCase):
@@ -47,6 +73,94 @@ Q1 0 D2 1
         with self.assertRaises(RuntimeError):
             list(qrels.qrels_iter())
 
+    @mock.patch.dict(os.environ)
+    def test_qrels_store(self):
+        lines = [f'Q{i % 7} 0 D{i} {i % 3}\n' for i in range(100)] + ['\n', 'Q1 0 D1 5\n', 'Q20 1 D1 1\n']
+        expected_results = [TrecQrel(qid, did, int(rel), it) for qid, it, did, rel in (l.split() for l in lines if l.strip())]
+        with tempfile.TemporaryDirectory() as d, tempfile.TemporaryDirectory() as home:
+            os.environ['IR_DATASETS_HOME'] = home
+            path = os.path.join(d, 'qrels')
+            with open(path, 'wt') as f:
+                f.writelines(lines)
+            qrels = TrecQrels(LocalDownload(path), {})
+            self.assertEqual(list(qrels.qrels_iter()), expected_results)
+            self.assertFalse(os.path.exists(ir_datasets.util.derived_path(path, '.qrels.pkl.lz4'))) # only built for lookups
+            self.assertEqual(list(qrels.qrels_for('Q20')), [TrecQrel('Q20', 'D1', 1, '1')])
+            self.assertEqual(os.listdir(d), ['qrels']) # not written beside the source file
+            self.assertTrue(os.path.exists(ir_datasets.util.derived_path(path, '.qrels.pkl.lz4')))
+            qrels = TrecQrels(LocalDownload(path), {})
+            self.assertTrue(qrels._qrels_store(build=False).built())
+            self.assertEqual(list(qrels.qrels_iter()), expected_results)
+            expected_dict = {}
+            for qrel in expected_results:
+                expected_dict.setdefault(qrel.query_id, {})[qrel.doc_id] = qrel.relevance
+            self.assertEqual(qrels.qrels_dict(), expected_dict)
+            self.assertEqual(list(qrels.qrels_dict()), list(expected_dict))
+            self.assertEqual(list(qrels.qrels_for('Q1')), [q for q in expected_results if q.query_id == 'Q1'])
+            self.assertEqual(list(qrels.qrels_for(['Q20', 'Q3', 'missing'])), [q for q in expected_results if q.query_id in ('Q3', 'Q20')])
+            self.assertEqual(list(qrels.qrels_for([])), [])
+            self.assertEqual(list(FilteredQrels(qrels, lambda: {'Q2', 'Q5'}).qrels_iter()), [q for q in expected_results if q.query_id in ('Q2', 'Q5')])
+            self.assertEqual(list(FilteredQrels(qrels, lambda: {'Q2', 'Q5'}, mode='exclude').qrels_iter()), [q for q in expected_results if q.query_id not in ('Q2', 'Q5')])
+
+            # re-built when the source file changes
+            with open(path, 'at') as f:
+                f.write('Q1 0 D200 1\n')
+            qrels = TrecQrels(LocalDownload(path), {})
+            self.assertEqual(list(qrels.qrels_for('Q1'))[-1], TrecQrel('Q1', 'D200', 1, '0'))
+
+    @mock.patch.dict(os.environ)
+    def test_scoreddocs_store(self):
+        rng = random.Random(42)
+        grouped = [f'Q{q} Q0 D{rng.randrange(50)} {r} {rng.random()} run\n' for q in range(30) for r in range(rng.randrange(0, 20))]
+        ungrouped = [f'Q{rng.randrange(30)}\tD{rng.randrange(50)}\t{rng.random() * 10 - 5}\n' for _ in range(500)]
+        for lines in [grouped, ungrouped]:
+            expected_results = []
+            for line in lines:
+                cols = line.split()
+                expected_results.append(GenericScoredDoc(cols[0], cols[2], float(cols[4])) if len(cols) == 6 else GenericScoredDoc(cols[0], cols[1], float(cols[2])))
+            with tempfile.TemporaryDirectory() as d, tempfile.TemporaryDirectory() as home:
+                os.environ['IR_DATASETS_HOME'] = home
+                path = os.path.join(d, 'run')
+                with open(path, 'wt') as f:
+                    f.writelines(lines)
+                scoreddocs = TrecScoredDocs(LocalDownload(path))
+                self.assertEqual(list(scoreddocs.scoreddocs_iter()), expected_results)
+                store_path = ir_datasets.util.derived_path(path, '.scoreddocs')
+                self.assertFalse(os.path.exists(store_path)) # plain iteration doesn't build the store
+                self.assertIsNone(scoreddocs.scoreddocs_count())
+                self.assertEqual(list(scoreddocs.scoreddocs_for('Q3')), [s for s in expected_results if s.query_id == 'Q3'])
+                self.assertEqual(os.listdir(d), ['run']) # not written beside the source file
+                self.assertTrue(os.path.exists(os.path.join(store_path, 'info.json')))
+                self.assertEqual(os.path.exists(os.path.join(store_path, 'order.bin')), lines is ungrouped)
+                store = ScoredDocsStore(store_path, None, GenericScoredDoc, [path], chunk_size=7)
+                self.assertEqual(list(store), expected_results)
+                scoreddocs = TrecScoredDocs(LocalDownload(path))
+                self.assertEqual(scoreddocs.scoreddocs_count(), len(expected_results))
+                self.assertEqual(list(scoreddocs.scoreddocs_for('Q3')), [s for s in expected_results if s.query_id == 'Q3'])
+                self.assertEqual(list(scoreddocs.scoreddocs_for(['Q29', 'Q5', 'missing'])), [s for s in expected_results if s.query_id in ('Q5', 'Q29')])
+                self.assertEqual(list(scoreddocs.scoreddocs_iter()), expected_results)
+                self.assertEqual(list(FilteredScoredDocs(scoreddocs, lambda: {'Q1', 'Q7'}).scoreddocs_iter()), [s for s in expected_results if s.query_id in ('Q1', 'Q7')])
+
+                negated = TrecScoredDocs(LocalDownload(path), negate_score=True)
+                self.assertEqual(list(negated.scoreddocs_for('Q3')), [s._replace(score=-s.score) for s in expected_results if s.query_id == 'Q3'])
+
+                # re-built when the source file changes
+                with open(path, 'at') as f:
+                    f.write('Q3 D100 1.5\n')
+                scoreddocs = TrecScoredDocs(LocalDownload(path))
+                self.assertEqual(list(scoreddocs.scoreddocs_for('Q3'))[-1], GenericScoredDoc('Q3', 'D100', 1.5))
+
+    def test_scoreddocs_store_concurrent_build(self):
+        with tempfile.TemporaryDirectory() as d:
+            path, store_path = os.path.join(d, 'run'), os.path.join(d, 'store')
+            with open(path, 'wt') as f:
+                f.writelines(f'Q{i % 100} D{i} {i}\n' for i in range(20000))
+            os.makedirs(store_path) # a partial store from an interrupted build is replaced
+            with multiprocessing.Pool(4) as pool:
+                self.assertEqual(pool.map(_build_scoreddocs_store, [(store_path, path)] * 8), [20000] * 8)
+            self.assertEqual(sorted(os.listdir(d)), ['run', 'store'])
+            self.assertEqual(list(ScoredDocsStore(store_path, None, GenericScoredDoc, [path]).records_for('Q7'))[-1], GenericScoredDoc('Q7', 'D19907', 19907.))
+
     def test_queries(self):
         mock_file = StringFile('''
 <top>
@@ -127,6 +241,58 @@ More body text
         self.assertEqual(docs.docs_path(), 'MOCK')
         self.assertEqual(list(docs.docs_iter()), expected_results)
 
+    def test_trec_doc_splitter(self):
+        data = b'<DOC>\n<DOCNO> 1 </DOCNO>\nsome text</DOC>\n</DOC>\n\n<DOC>\n<DOCNO> 2 </DOCNO>\r\n</DOC>\n<DOC>\nincomplete\n'
+        expected = [b'<DOC>\n<DOCNO> 1 </DOCNO>\nsome text</DOC>\n', b'\n<DOC>\n<DOCNO> 2 </DOCNO>\r\n']
+        for read_size in [1, 2, 5, 1024]:
+            self.assertEqual(list(trec_doc_splitter(io.BytesIO(data), read_size=read_size)), expected)
+        self.assertEqual(list(trec_doc_splitter(io.BytesIO(b'</DOC>\n</DOC>\n'))), [b'', b''])
+        self.assertEqual(list(trec_doc_splitter(io.BytesIO(b''))), [])
+
+    def test_docs_parallel(self):
+        with tempfile.TemporaryDirectory() as d:
+            os.makedirs(os.path.join(d, 'docs', 'sub'))
+            for i in range(12):
+                path = os.path.join(d, 'docs', 'sub' if i % 2 else '', f'file{i:02d}')
+                with (gzip.open(path + '.gz', 'wt') if i % 3 == 0 else open(path, 'wt')) as f:
+                    for j in range(i * 3):
+                        f.write(f'<DOC>\n<DOCNO> {i}-{j} </DOCNO>\n<TEXT>\ntext {i} {j}\n</TEXT>\n</DOC>\n')
+            globs = ['docs/file*', 'docs/sub/file*']
+            expected_results = list(TrecDocs(LocalDownload(d), path_globs=globs, parser='text', parallel=1).docs_iter())
+            self.assertEqual(len(expected_results), sum(i * 3 for i in range(12)))
+            docs = TrecDocs(LocalDownload(d), path_globs=globs, parser='text', parallel=3)
+            self.assertEqual(list(docs.docs_iter()), expected_results)
+            docs = TrecDocs(LocalDownload(d), path_globs=globs, parser='text', parallel=3, expected_file_count=13)
+            with self.assertRaises(RuntimeError):
+                list(docs.docs_iter())
+
+            tar_path = os.path.join(d, 'docs.tar.gz')
+            with tarfile.open(tar_path, 'w:gz') as tarf:
+                tarf.add(os.path.join(d, 'docs'), 'docs')
+            docs = TrecDocs(LocalDownload(tar_path), path_globs=globs, parser='text', parallel=3, expected_file_count=12)
+            self.assertEqual(sorted(docs.docs_iter()), sorted(expected_results))
+            self.assertEqual(list(docs.docs_iter()), list(TrecDocs(LocalDownload(tar_path), path_globs=globs, parser='text', parallel=1).docs_iter()))
+
+    def test_docs_parallel_spawn(self):
+        start_method = multiprocessing.get_start_method()
+        multiprocessing.set_start_method('spawn', force=True)
+        try:
+            with tempfile.TemporaryDirectory() as d:
+                for i in range(6):
+                    with open(os.path.join(d, f'file{i}'), 'wt') as f:
+                        for j in range(20):
+                            f.write(f'<DOC>\n<DOCNO> {i}-{j} </DOCNO>\n<TEXT>\ntext {i} {j}\n</TEXT>\n</DOC>\n')
+                expected_results = [GenericDoc(f'{i}-{j}', f'text {i} {j}\n') for i in range(6) for j in range(20)]
+                # like the dataset handlers, count_hint is a lambda, which cannot be pickled
+                docs = TrecDocs(LocalDownload(d), path_globs=['file*'], parser='text', parallel=2, count_hint=ir_datasets.util.count_hint('aquaint'))
+                self.assertEqual(list(docs.docs_iter()), expected_results)
+                # parsed in a single process if the handler cannot be pickled at all
+                docs = TrecDocs(LocalDownload(d), path_globs=['file*'], parser='text', parallel=2)
+                docs._encoding = UnpicklableEncoding()
+                self.assertEqual(list(docs.docs_iter()), expected_results)
+        finally:
+            multiprocessing.set_start_method(start_method, force=True)
+
     def tearDown(self):
         if os.path.exists('MOCK.pklz4'):
             shutil.rmtree('MOCK.pklz4')
@@ -1,9 +1,28 @@
 import os
+import itertools
 from typing import NamedTuple, Tuple
 import shutil
+import tempfile
 import unittest
-from ir_datasets.formats import TsvDocs, TsvQueries, TsvDocPairs
-from ir_datasets.util import StringFile
+import multiprocessing
+from unittest import mock
+import ir_datasets
+from ir_datasets.formats import TsvDocs, TsvQueries, TsvDocPairs, GenericDocPair
+from ir_datasets.indices import LineOffsetIndex, DocPairsStore
+from ir_datasets.util import StringFile, LocalDownload
+
+
+def _build_docpairs_store(args):
+    store_path, path = args
+    store = DocPairsStore(store_path, TsvDocPairs(LocalDownload(path))._iter, GenericDocPair, [path], chunk_size=100)
+    store.build()
+    return len(list(store))
+
+
+def _build_line_offset_index(path):
+    index = LineOffsetIndex(path, chunk_size=1024)
+    index.build()
+    return len(index)
 
 
 class TestTsv(unittest.TestCase):
@@ -119,6 +138,119 @@ class TestTsv(unittest.TestCase):
         self.assertEqual(docpairs.docpairs_path(), 'MOCK')
         self.assertEqual(list(docpairs.docpairs_iter()), expected_results)
 
+    def test_batches(self):
+        class data_type(NamedTuple):
+            doc_id: str
+            text: str
+        mock_file = StringFile(''.join(f'{i}\ttext {i}\n\n' for i in range(2500)) + 'bad line\n2500\ttext\n')
+        expected_results = [data_type(str(i), f'text {i}') for i in range(2500)]
+
+        queries = TsvQueries(mock_file, data_type)
+        it = queries.queries_iter()
+        self.assertEqual(next(it), expected_results[0])
+        batches = it.batches()
+        self.assertEqual([r for batch in itertools.islice(batches, 1) for r in batch], expected_results[1:])
+        with self.assertRaises(RuntimeError):
+            next(batches)
+        self.assertEqual(list(queries.queries_iter()[10:2000:7]), expected_results[10:2000:7])
+        records = []
+        with self.assertRaises(RuntimeError):
+            for record in queries.queries_iter()[2400:]:
+                records.append(record)
+        self.assertEqual(records, expected_results[2400:]) # records before the invalid line are returned first
+
+    @mock.patch.dict(os.environ)
+    def test_line_offset_index(self):
+        lines = [f'q{i}\ttext {i}\n' for i in range(5000)]
+        lines[10] = '\n' # blank lines are skipped
+        lines[11] = '\r\n'
+        expected = [tuple(l.rstrip('\n').split('\t')) for l in lines if l.strip()]
+        with tempfile.TemporaryDirectory() as d, tempfile.TemporaryDirectory() as home:
+            os.environ['IR_DATASETS_HOME'] = home
+            path = os.path.join(d, 'docs.tsv')
+            with open(path, 'wt', newline='') as f:
+                f.write('doc_id\ttext\n')
+                f.writelines(lines)
+            docs = TsvDocs(LocalDownload(path), skip_first_line=True)
+            self.assertEqual(tuple(next(docs.docs_iter())), expected[0])
+            self.assertIsNone(docs.docs_count()) # not indexed yet (only needed for skipping more lines)
+            queries = TsvQueries(LocalDownload(path))
+            self.assertEqual([tuple(q) for q in queries.queries_iter()[4001:4004]], expected[4000:4003])
+            self.assertTrue(LineOffsetIndex(path).built())
+            self.assertEqual(docs.docs_count(), len(expected))
+            self.assertEqual([tuple(d) for d in docs.docs_iter()], expected)
+            self.assertEqual([tuple(q) for q in queries.queries_iter()[1::100]], expected[::100])
+            self.assertEqual([tuple(q) for q in queries.queries_iter()[4990:]], expected[4989:])
+            self.assertEqual(list(queries.queries_iter()[6000:]), [])
+
+            # re-built when the file changes
+            with open(path, 'at') as f:
+                f.write('q5000\ttext 5000\n')
+            self.assertFalse(LineOffsetIndex(path).built())
+            self.assertEqual([tuple(q) for q in queries.queries_iter()[4999:]], [('q5000', 'text 5000')])
+
+            # built by several processes at once
+            LineOffsetIndex(path).clear()
+            with multiprocessing.Pool(4) as pool:
+                self.assertEqual(pool.map(_build_line_offset_index, [path] * 8), [len(expected) + 2] * 8)
+            self.assertEqual(os.listdir(d), ['docs.tsv']) # the index is kept under home_path
+            self.assertTrue(LineOffsetIndex(path).index_path.startswith(home))
+
+    @mock.patch.dict(os.environ)
+    def test_docpairs_store(self):
+        expected = [(f'q{i % 97}', f'd{(i * 7) % 1000}', f'd{(i * 13) % 1000}') for i in range(5000)]
+        with tempfile.TemporaryDirectory() as d, tempfile.TemporaryDirectory() as home:
+            os.environ['IR_DATASETS_HOME'] = home
+            path = os.path.join(d, 'docpairs.tsv')
+            with open(path, 'wt') as f:
+                f.writelines('\t'.join(r) + '\n' for r in expected)
+            docpairs = TsvDocPairs(LocalDownload(path))
+            self.assertEqual([tuple(r) for r in docpairs.docpairs_iter()], expected)
+            store = DocPairsStore(ir_datasets.util.derived_path(path, '.docpairs'), None, GenericDocPair, [path])
+            self.assertFalse(store.built()) # plain iteration doesn't build the store
+            self.assertIsNone(docpairs.docpairs_count())
+            it = docpairs.docpairs_iter()
+            self.assertEqual(len(it), 5000)
+            self.assertTrue(store.built())
+            self.assertEqual(os.listdir(d), ['docpairs.tsv']) # not written beside the source file
+            self.assertEqual(docpairs.docpairs_count(), 5000)
+            self.assertEqual(it[1234], GenericDocPair(*expected[1234]))
+            self.assertEqual(it[-1], GenericDocPair(*expected[-1]))
+            with self.assertRaises(IndexError):
+                it[5000]
+            self.assertEqual([tuple(r) for r in it[10:4000:7]], expected[10:4000:7])
+            self.assertEqual(len(it[10:4000:7]), len(expected[10:4000:7]))
+            self.assertEqual([tuple(r) for r in it[0.5:0.75]], expected[2500:3750])
+            self.assertEqual([tuple(r) for r in it[6000:]], [])
+
+            # shuffled: a permutation of the records that depends only on the seed
+            shuffled = [tuple(r) for r in it.shuffled(seed=42)]
+            self.assertEqual(sorted(shuffled), sorted(expected))
+            self.assertNotEqual(shuffled, expected)
+            self.assertEqual([tuple(r) for r in docpairs.docpairs_iter().shuffled(seed=42)], shuffled)
+            self.assertNotEqual([tuple(r) for r in it.shuffled(seed=43)], shuffled)
+            shard = [tuple(r) for r in it[1::4].shuffled(seed=42)]
+            self.assertEqual(sorted(shard), sorted(expected[1::4]))
+            self.assertEqual([tuple(r) for r in TsvDocPairs(LocalDownload(path)).docpairs_iter()], expected) # from the store
+
+            # re-built when the file changes
+            with open(path, 'at') as f:
+                f.write('q\tdA\tdB\n')
+            docpairs = TsvDocPairs(LocalDownload(path))
+            self.assertEqual(docpairs.docpairs_iter()[-1], GenericDocPair('q', 'dA', 'dB'))
+            self.assertEqual(docpairs.docpairs_count(), 5001)
+
+    def test_docpairs_store_concurrent_build(self):
+        with tempfile.TemporaryDirectory() as d:
+            path, store_path = os.path.join(d, 'docpairs.tsv'), os.path.join(d, 'store')
+            with open(path, 'wt') as f:
+                f.writelines(f'q{i % 100}\td{i}\td{i + 1}\n' for i in range(20000))
+            os.makedirs(store_path) # a partial store from an interrupted build is replaced
+            with multiprocessing.Pool(4) as pool:
+                self.assertEqual(pool.map(_build_docpairs_store, [(store_path, path)] * 8), [20000] * 8)
+            self.assertEqual(sorted(os.listdir(d)), ['docpairs.tsv', 'store'])
+            self.assertEqual(iter(DocPairsStore(store_path, None, GenericDocPair, [path]))[12345], GenericDocPair('q45', 'd12345', 'd12346'))
+
     def tearDown(self):
         if os.path.exists('MOCK.pklz4'):
             shutil.rmtree('MOCK.pklz4')
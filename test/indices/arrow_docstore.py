@@ -0,0 +1,76 @@
+import os
+import datetime
+import tempfile
+import unittest
+from unittest import mock
+from typing import NamedTuple, Tuple, Optional
+from ir_datasets.indices import ArrowDocstore
+from ir_datasets.commands.export import ParquetExporter, ArrowExporter
+
+
+class Passage(NamedTuple):
+    text: str
+    score: float
+
+
+class RichDoc(NamedTuple):
+    doc_id: str
+    title: Optional[str]
+    published: datetime.datetime
+    tags: Tuple[str, ...]
+    passages: Tuple[Passage, ...]
+    length: int
+
+
+class TestArrowDocstore(unittest.TestCase):
+    def setUp(self):
+        # the indexes are written under home_path
+        self.home = tempfile.TemporaryDirectory()
+        patcher = mock.patch.dict(os.environ, {'IR_DATASETS_HOME': self.home.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.home.cleanup)
+
+    def test_export_and_lookup(self):
+        docs = [RichDoc(f'd{i}', None if i % 4 == 0 else f'title {i}', datetime.datetime(2020, 1, 1 + i % 28), tuple(f't{j}' for j in range(i % 3)), tuple(Passage(f'p{j}', j / 2) for j in range(i % 4)), i) for i in range(2345)]
+        for exporter_cls in [ParquetExporter, ArrowExporter]:
+            with tempfile.TemporaryDirectory() as d:
+                path = os.path.join(d, 'docs')
+                with open(path, 'wb') as f:
+                    exporter = exporter_cls(RichDoc, f)
+                    exporter.row_group_size = 500
+                    for doc in docs:
+                        exporter.next(doc)
+                    exporter.flush()
+                store = ArrowDocstore(path, RichDoc, batch_size=100)
+                self.assertEqual(store.count(), len(docs))
+                self.assertEqual(list(store), docs)
+                self.assertEqual(list(iter(store)[1000:1300:7]), docs[1000:1300:7])
+                self.assertEqual(iter(store)[-1], docs[-1])
+                self.assertEqual(store.get_many(['d5', 'd2000', 'd499', 'd500', 'missing']), {d.doc_id: d for d in [docs[5], docs[2000], docs[499], docs[500]]})
+                self.assertEqual(store.get_many(['d5', 'd1234'], field='length'), {'d5': 5, 'd1234': 1234})
+                self.assertEqual(store.get('d7', field='doc_id'), 'd7')
+                self.assertEqual(list(store.docs_iter(fields=['length', 'doc_id'])[10:13]), [(10, 'd10'), (11, 'd11'), (12, 'd12')])
+                store.close()
+                store = ArrowDocstore(path, RichDoc) # re-uses index
+                self.assertEqual(store.get('d42'), docs[42])
+                self.assertEqual(os.listdir(d), ['docs']) # the index is not written beside the file
+                self.assertTrue(store.index_path.startswith(self.home.name))
+                store.clear_cache()
+
+    def test_fields(self):
+        docs = [RichDoc(f'd{i}', f'title {i}', datetime.datetime(2020, 1, 1), (), (), i) for i in range(10)]
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'docs.parquet')
+            with open(path, 'wb') as f:
+                exporter = ParquetExporter(RichDoc, f, ['doc_id', 'length'])
+                for doc in docs:
+                    exporter.next(doc)
+                exporter.flush()
+            store = ArrowDocstore(path, RichDoc)
+            self.assertEqual(store.get('d3'), RichDoc('d3', None, None, None, None, 3))
+            store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import gzip
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from ir_datasets.util import LocalDownload
+from ir_datasets.formats.webarc import WarcDocs
+from ir_datasets.datasets.clueweb09 import ClueWeb09Docs
+from ir_datasets.datasets.clueweb12 import ClueWeb12Docs
+from ir_datasets.commands.build_clueweb_warc_indexes import write_record_counts
+from ir_datasets.indices import ClueWebWarcIndex, ClueWebWarcDocstore, DocstoreOptions
+from ir_datasets.indices.clueweb_warc import WarcIndexFile, WarcCheckpointTable, checkpoint_table
+
+
+def write_warc(path, count, rng, part=0):
+    doc_ids = []
+    with gzip.open(path, 'wb') as f:
+        for i in range(count):
+            doc_id = f'clueweb12-0000tw-{part:02d}-{i:05d}'
+            body = ' '.join(f'w{rng.randrange(100000)}' for _ in range(rng.randrange(50, 500))).encode()
+            payload = b'HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n<html><body>' + body + b'</body></html>'
+            headers = f'WARC-TREC-ID: {doc_id}\r\nWARC-Target-URI: http://example.com/{i}\r\nWARC-Date: 2012-02-10T22:50:37Z\r\nContent-Length: {len(payload)}\r\n\r\n'
+            f.write(b'WARC/1.0\r\nWARC-Type: response\r\n' + headers.encode() + payload + b'\r\n\r\n')
+            doc_ids.append(doc_id)
+    return doc_ids
+
+
+class LocalWarcDocs(WarcDocs):
+    def __init__(self, path, parts, checkpoints=True):
+        super().__init__()
+        self.path = path
+        self.parts = parts
+        self.checkpoints = checkpoints
+
+    def _docs_id_to_source_file(self, doc_id):
+        part = int(doc_id.split('-')[2])
+        if part >= self.parts:
+            return None
+        return os.path.join(self.path, f'{part:02d}.warc.gz')
+
+    def _docs_source_file_to_checkpoint(self, source_file):
+        return f'{source_file}.chk.lz4' if self.checkpoints else None
+
+
+class TestClueWebWarcIndex(unittest.TestCase):
+    def test_checkpoint_table(self):
+        rng = random.Random(42)
+        with tempfile.TemporaryDirectory() as d:
+            source_path, index_path = os.path.join(d, 'file.warc.gz'), os.path.join(d, 'file.warc.gz.chk.lz4')
+            doc_ids = write_warc(source_path, 1000, rng)
+            index = ClueWebWarcIndex(source_path, index_path)
+            index.build(checkpoint_freq=32*1024)
+            docs = WarcDocs()
+            lookup = rng.sample(doc_ids, 50) + [doc_ids[0], doc_ids[-1], 'clueweb12-0000tw-00-99999', 'clueweb12-0000tw-00-0050x']
+            expected = sorted(set(lookup) & set(doc_ids))
+            self.assertEqual([doc.doc_id for doc in index.get_many_iter(lookup, docs)], expected)
+            table = WarcCheckpointTable(f'{index_path}.table', index_path)
+            self.assertTrue(table.built())
+            self.assertGreater(len(table._table['doc_ids']), 10)
+            self.assertEqual(table.find(doc_ids[0]), -1)
+            self.assertIs(checkpoint_table(index_path), checkpoint_table(index_path))
+            for doc_id in rng.sample(doc_ids, 20):
+                self.assertEqual([doc.doc_id for doc in index.get_many_iter([doc_id], docs)], [doc_id])
+            # same results as reading through the index file
+            lookup = [d for d in lookup if d <= doc_ids[-1]]
+            self.assertEqual([doc.doc_id for doc in index._get_many_iter_stream(lookup, docs)], expected)
+
+    def test_verify(self):
+        rng = random.Random(42)
+        with tempfile.TemporaryDirectory() as d:
+            source_path, index_path = os.path.join(d, 'file.warc.gz'), os.path.join(d, 'file.warc.gz.chk.lz4')
+            doc_ids = write_warc(source_path, 1000, rng)
+            index = ClueWebWarcIndex(source_path, index_path)
+            self.assertEqual(index.build(checkpoint_freq=32*1024), 1000)
+            self.assertEqual(index.verify(), [])
+            self.assertEqual(index.verify(sample=3), [])
+            # an index whose checkpoints point to the wrong documents
+            with WarcIndexFile(index_path, 'rb') as f_chk:
+                checkpoints = []
+                while f_chk:
+                    checkpoints.append(f_chk.read())
+            with WarcIndexFile(index_path, 'wb') as f_chk:
+                last_pos = 0
+                for doc_id, doc_idx, state, pos, out_offset in checkpoints:
+                    f_chk.write(doc_ids[doc_idx + 1], doc_idx, state, pos - last_pos, out_offset)
+                    last_pos = pos
+            failures = index.verify()
+            self.assertEqual([doc_id for doc_id, error in failures], [doc_ids[c[1] + 1] for c in checkpoints])
+
+    def test_docstore_workers(self):
+        rng = random.Random(42)
+        with tempfile.TemporaryDirectory() as d:
+            doc_ids = []
+            for part in range(6):
+                source_path = os.path.join(d, f'{part:02d}.warc.gz')
+                doc_ids += write_warc(source_path, 200, rng, part)
+                ClueWebWarcIndex(source_path, f'{source_path}.chk.lz4').build(checkpoint_freq=32*1024)
+            lookup = rng.sample(doc_ids, 100) + ['clueweb12-0000tw-03-99999', 'clueweb12-0000tw-07-00001']
+            lookup += lookup[:5] # duplicates are returned once
+            expected = list(dict.fromkeys(d for d in lookup if d in doc_ids))
+            for checkpoints in [True, False]:
+                docs = LocalWarcDocs(d, 6, checkpoints)
+                serial = [doc.doc_id for doc in ClueWebWarcDocstore(docs).get_many_iter(lookup)]
+                self.assertEqual(sorted(serial), sorted(expected))
+                for worker_type in ['thread', 'process']:
+                    options = DocstoreOptions(lookup_workers=3, lookup_worker_type=worker_type)
+                    result = [doc.doc_id for doc in ClueWebWarcDocstore(docs, options).get_many_iter(lookup)]
+                    self.assertEqual(sorted(result), sorted(expected))
+                    options = DocstoreOptions(lookup_workers=3, lookup_worker_type=worker_type, lookup_preserve_order=True)
+                    result = [doc.doc_id for doc in ClueWebWarcDocstore(docs, options).get_many_iter(lookup)]
+                    self.assertEqual(result, expected)
+                    self.assertEqual(ClueWebWarcDocstore(docs, options).get(expected[3]).doc_id, expected[3])
+
+    def test_record_counts(self):
+        with tempfile.TemporaryDirectory() as d:
+            for cw09, docs_cls, counts_dir, files in [
+                    (False, ClueWeb12Docs, 'recordcounts', ['ClueWeb12_00/0000tw/0000tw-00.warc.gz', 'ClueWeb12_00/0000tw/0000tw-01.warc.gz', 'ClueWeb12_01/0100tw/0100tw-00.warc.gz']),
+                    (True, ClueWeb09Docs, 'record_counts', ['ClueWeb09_English_1/en0000/00.warc.gz', 'ClueWeb09_English_1/en0000/01.warc.gz', 'ClueWeb09_English_2/en0012/00.warc.gz'])]:
+                root = os.path.join(d, counts_dir)
+                files = [Path(f) for f in files]
+                stats = {str(f): {'file': str(f), 'docs': 100 + i} for i, f in enumerate(files[:-1])}
+                stats[str(files[-1])] = {'file': str(files[-1]), 'error': 'failed'} # skipped
+                write_record_counts(Path(root)/counts_dir, files, stats, cw09=cw09)
+                docs = docs_cls(LocalDownload(root), None)
+                if cw09:
+                    docs.dirs = ['ClueWeb09_English_1']
+                self.assertEqual(docs._docs_warc_file_counts(), {os.path.join(root, f): 100 + i for i, f in enumerate(files[:-1])})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import sys
+import gzip
+import random
+import tempfile
+import unittest
+import multiprocessing
+from unittest import mock
+import ir_datasets
+from ir_datasets.indices import GzipCheckpointIndex
+from ir_datasets.formats import TsvDocs
+from ir_datasets.formats.tsv import FileLineIter
+from ir_datasets.util import GzipExtract, LocalDownload
+
+
+def _build_index(args):
+    path, index_path = args
+    index = GzipCheckpointIndex(path, index_path, checkpoint_freq=16*1024)
+    index.build()
+    return index.count()
+
+
+class TestGzipCheckpointIndex(unittest.TestCase):
+    def setUp(self):
+        # the indexes are written under home_path
+        self.home = tempfile.TemporaryDirectory()
+        patcher = mock.patch.dict(os.environ, {'IR_DATASETS_HOME': self.home.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.home.cleanup)
+
+    def _write(self, path, lines):
+        with gzip.open(path, 'wt') as f:
+            f.writelines(lines)
+
+    def test_gzip_checkpoint_index(self):
+        rng = random.Random(42)
+        lines = [f'{i}\t' + ' '.join(str(rng.random()) for _ in range(rng.randrange(1, 20))) + '\n' for i in range(20000)]
+        lines[1234] = '\n' # blank lines are skipped
+        expected = [l for l in lines if l != '\n']
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'file.tsv.gz')
+            self._write(path, lines)
+            index = GzipCheckpointIndex(path, checkpoint_freq=64*1024)
+            with index.open(15000) as f:
+                self.assertEqual(f.readline().decode(), expected[15000])
+            self.assertGreater(len(index), 5)
+            self.assertFalse(index.built())
+            for line_idx in [0, 100, 9999, 15001, 19998]:
+                with index.open(line_idx) as f:
+                    self.assertEqual(f.readline().decode(), expected[line_idx])
+            index.build()
+            self.assertEqual(index.count(), len(expected))
+
+            # loaded from disk
+            index = GzipCheckpointIndex(path, checkpoint_freq=64*1024)
+            self.assertTrue(index.built())
+            dlc = GzipExtract(LocalDownload(path))
+            dlc._checkpoint_index = index
+            self.assertEqual(list(FileLineIter(dlc, start=12345, stop=12400)), expected[12345:12400])
+            self.assertEqual(list(FileLineIter(dlc, start=19990)), expected[19990:])
+            self.assertEqual(list(FileLineIter(dlc, start=5000, stop=9000, step=13)), expected[5000:9000:13])
+
+            # re-built if the source file changes
+            self._write(path, lines[::-1])
+            index = GzipCheckpointIndex(path, checkpoint_freq=64*1024)
+            self.assertFalse(index.built())
+            with index.open(10) as f:
+                self.assertEqual(f.readline().decode(), lines[::-1][10])
+
+    def test_multiple_members(self):
+        lines = [f'line {i}\n' for i in range(50000)]
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'file.gz')
+            self._write(path, lines[:25000])
+            with open(path, 'ab') as f:
+                f.write(gzip.compress(''.join(lines[25000:]).encode()))
+            index = GzipCheckpointIndex(path, checkpoint_freq=16*1024)
+            self.assertIsNone(index.open(40000))
+            self.assertFalse(index.supported())
+            # falls back on reading through the file
+            dlc = GzipExtract(LocalDownload(path))
+            dlc._checkpoint_index = index
+            self.assertEqual(list(FileLineIter(dlc, start=40000, stop=40010)), lines[40000:40010])
+
+    def test_concurrent_build(self):
+        lines = [f'line {i}\n' for i in range(30000)]
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'file.gz')
+            self._write(path, lines)
+            with multiprocessing.Pool(4) as pool:
+                self.assertEqual(pool.map(_build_index, [(path, None)] * 8), [len(lines)] * 8)
+            self.assertEqual(os.listdir(d), ['file.gz'])
+            index = GzipCheckpointIndex(path)
+            self.assertEqual(os.listdir(os.path.dirname(index.index_path)), [os.path.basename(index.index_path)])
+            self.assertTrue(index.index_path.startswith(self.home.name))
+            self.assertTrue(index.built())
+            with index.open(25000) as f:
+                self.assertEqual(f.readline().decode(), lines[25000])
+
+            # the index cannot be saved (e.g., a read-only directory); it's still used, but not kept
+            index_path = os.path.join(path, 'file.gz.chk.pkl.lz4') # (its parent is a file)
+            self.assertEqual(_build_index((path, index_path)), len(lines))
+            self.assertFalse(os.path.exists(index_path))
+
+    def test_without_zlib_state(self):
+        # zlib-state is an optional dependency; without it, files are read through as before
+        rng = random.Random(42)
+        lines = [f'{i}\t{rng.getrandbits(640):0160x}\n' for i in range(50000)]
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'file.tsv.gz')
+            self._write(path, ['doc_id\ttext\n'] + lines)
+            self.assertGreater(os.path.getsize(path), GzipCheckpointIndex(path).checkpoint_freq)
+            with mock.patch.dict(sys.modules, {'zlib_state': None}), mock.patch.dict(ir_datasets.lazy_libs._cache, clear=True):
+                dlc = GzipExtract(LocalDownload(path))
+                self.assertIsNone(dlc.checkpoint_index())
+                self.assertEqual(list(FileLineIter(dlc, start=30001, stop=30010)), lines[30000:30009])
+                docs = TsvDocs(dlc, skip_first_line=True)
+                self.assertEqual(tuple(next(docs.docs_iter())), tuple(lines[0].rstrip('\n').split('\t')))
+
+
+if __name__ == '__main__':
+    unittest.main()
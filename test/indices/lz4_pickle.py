@@ -1,7 +1,9 @@
+import os
 import tempfile
 import unittest
+import threading
 import numpy as np
-from ir_datasets.indices import Lz4PickleLookup, FileAccess
+from ir_datasets.indices import Lz4PickleLookup, PickleLz4FullStore, FileAccess, DocstoreOptions
 from ir_datasets.formats import GenericDoc
 
 
@@ -46,6 +48,147 @@ class TestLz4PickleLookup(unittest.TestCase):
 
                 idx.close()
 
+    def test_parallel_build(self):
+        docs = [GenericDoc(f'id{i}', f'some text {i} ' * (i % 7)) for i in range(2500)]
+        with tempfile.TemporaryDirectory() as d:
+            serial = PickleLz4FullStore(os.path.join(d, 'serial'), lambda: iter(docs), GenericDoc, 'doc_id', ['doc_id'])
+            serial.build()
+            parallel = PickleLz4FullStore(os.path.join(d, 'parallel'), lambda: iter(docs), GenericDoc, 'doc_id', ['doc_id'], options=DocstoreOptions(build_workers=2))
+            parallel.build()
+            for file in ['bin', 'bin.pos', 'bin.meta', 'idx.doc_id.key', 'idx.doc_id.pos', 'idx.doc_id.meta']:
+                with open(os.path.join(d, 'serial', file), 'rb') as f_serial, open(os.path.join(d, 'parallel', file), 'rb') as f_parallel:
+                    self.assertEqual(f_serial.read(), f_parallel.read(), file)
+            self.assertEqual(list(parallel), docs)
+            self.assertEqual(parallel.get('id1234'), docs[1234])
+            serial.lookup.close()
+            parallel.lookup.close()
+
+    def test_block_format(self):
+        docs = [GenericDoc(f'id{i}', f'the quick brown fox {i} jumps over the lazy dog ' * (i % 5 + 1)) for i in range(3000)]
+        for file_access in FileAccess.__members__.values():
+            with tempfile.TemporaryDirectory() as d:
+                options = DocstoreOptions(file_access=file_access)
+                record = PickleLz4FullStore(os.path.join(d, 'record'), lambda: iter(docs), GenericDoc, 'doc_id', ['doc_id'], options=options)
+                record.build()
+                block = PickleLz4FullStore(os.path.join(d, 'block'), lambda: iter(docs), GenericDoc, 'doc_id', ['doc_id'], options=options, block_size=4096)
+                block.build()
+                self.assertLess(os.path.getsize(os.path.join(d, 'block', 'bin')), os.path.getsize(os.path.join(d, 'record', 'bin')))
+                self.assertEqual(list(block), docs)
+                self.assertEqual(list(iter(block)[1000:2000:7]), docs[1000:2000:7])
+                self.assertEqual(block.get_many(['id12', 'id2999', 'id1500', 'missing']), {d.doc_id: d for d in [docs[12], docs[2999], docs[1500]]})
+
+                # format is detected from disk & the store can be appended to
+                lookup = Lz4PickleLookup(os.path.join(d, 'block'), GenericDoc, 'doc_id', ['doc_id'], file_access=file_access)
+                with lookup.transaction() as trans:
+                    trans.add(GenericDoc('id12', 'replaced'))
+                    trans.add(GenericDoc('new', 'new doc'))
+                with lookup.transaction() as trans:
+                    trans.add(GenericDoc('id13', 'rolled back'))
+                    trans.rollback()
+                lookup.close()
+                self.assertEqual(list(lookup['id12', 'new', 'id13']), [GenericDoc('id13', docs[13].text), GenericDoc('id12', 'replaced'), GenericDoc('new', 'new doc')])
+                self.assertEqual(len(lookup), 3002)
+                lookup.close()
+
+                # a store built per-record is still read per-record when opened with a block_size
+                lookup = Lz4PickleLookup(os.path.join(d, 'record'), GenericDoc, 'doc_id', ['doc_id'], file_access=file_access, block_size=4096)
+                self.assertFalse(lookup.block_format())
+                self.assertEqual(list(lookup['id12', 'id2999']), [docs[12], docs[2999]])
+                with lookup.transaction() as trans:
+                    trans.add(GenericDoc('new', 'new doc'))
+                self.assertEqual(list(lookup['new', 'id5']), [docs[5], GenericDoc('new', 'new doc')])
+                self.assertFalse(os.path.exists(os.path.join(d, 'record', 'bin.dict')))
+                lookup.close()
+                record.lookup.close()
+                block.lookup.close()
+
+    def test_batched_lookup(self):
+        docs = [GenericDoc(f'id{i}', f'text {i} ' * (i % 300)) for i in range(5000)]
+        doc_ids = [f'id{i}' for i in range(0, 5000, 3)] + [f'id{i}' for i in range(4000, 4100)] + ['missing']
+        expected = {d.doc_id: d for d in docs if d.doc_id in set(doc_ids)}
+        with tempfile.TemporaryDirectory() as d:
+            for file_access in FileAccess.__members__.values():
+                for threads in [1, 4]:
+                    store = PickleLz4FullStore(d, lambda: iter(docs), GenericDoc, 'doc_id', ['doc_id'], options=DocstoreOptions(file_access=file_access, lookup_threads=threads))
+                    self.assertEqual(store.get_many(doc_ids), expected)
+                    self.assertEqual(store.get_many(doc_ids[::-7]), {k: v for k, v in expected.items() if k in set(doc_ids[::-7])})
+                    store.lookup.close()
+
+    def test_field_layout(self):
+        docs = [GenericDoc(f'id{i}', f'text {i} ' * (i % 50)) for i in range(3000)]
+        for file_access in FileAccess.__members__.values():
+            for build_workers in [1, 2]:
+                with tempfile.TemporaryDirectory() as d:
+                    options = DocstoreOptions(file_access=file_access, build_workers=build_workers, lookup_threads=2)
+                    store = PickleLz4FullStore(d, lambda: iter(docs), GenericDoc, 'doc_id', ['doc_id'], options=options, field_layout=True)
+                    self.assertEqual(list(store), docs)
+                    self.assertTrue(os.path.exists(os.path.join(d, 'bin.fields')))
+                    self.assertEqual(store.get_many(['id5', 'id2999', 'missing']), {'id5': docs[5], 'id2999': docs[2999]})
+                    self.assertEqual(store.get_many(['id5', 'id2999', 'missing'], field='text'), {'id5': docs[5].text, 'id2999': docs[2999].text})
+                    self.assertEqual(list(store.docs_iter(fields=['text'])[10:20]), [(doc.text,) for doc in docs[10:20]])
+                    self.assertEqual(store.docs_iter(fields=['text', 'doc_id'])[-1], (docs[-1].text, docs[-1].doc_id))
+                    store.lookup.close()
+
+                    # layout is detected from disk
+                    lookup = Lz4PickleLookup(d, GenericDoc, 'doc_id', ['doc_id'], file_access=file_access)
+                    with lookup.transaction() as trans:
+                        trans.add(GenericDoc('id5', 'replaced'))
+                    self.assertEqual(list(lookup.get(['id5', 'id6'], fields=['text'])), [(docs[6].text,), ('replaced',)]) # in file order
+                    lookup.close()
+
+                    # re-built after clearing (bin.meta remains)
+                    store.clear_cache()
+                    self.assertFalse(store.built())
+                    self.assertEqual(store.get_many(['id5'], field='text'), {'id5': docs[5].text})
+                    self.assertTrue(os.path.exists(os.path.join(d, 'bin.fields')))
+                    store.lookup.close()
+
+        # the field layout can also be selected through the DocstoreOptions
+        with tempfile.TemporaryDirectory() as d:
+            store = PickleLz4FullStore(d, lambda: iter(docs), GenericDoc, 'doc_id', ['doc_id'], options=DocstoreOptions(field_layout=True))
+            self.assertEqual(store.get_many(['id5'], field='text'), {'id5': docs[5].text})
+            self.assertTrue(os.path.exists(os.path.join(d, 'bin.fields')))
+            store.lookup.close()
+
+        # projections also work on stores in the default layout
+        with tempfile.TemporaryDirectory() as d:
+            store = PickleLz4FullStore(d, lambda: iter(docs), GenericDoc, 'doc_id', ['doc_id'])
+            self.assertEqual(store.get_many(['id5', 'id7'], field='text'), {'id5': docs[5].text, 'id7': docs[7].text})
+            self.assertEqual(list(store.docs_iter(fields=['doc_id'])[:3]), [('id0',), ('id1',), ('id2',)])
+            self.assertFalse(os.path.exists(os.path.join(d, 'bin.fields')))
+            store.lookup.close()
+
+    def test_concurrent_readers(self):
+        docs = [GenericDoc(f'id{i}', f'text {i} ' * (i % 40)) for i in range(3000)]
+        layouts = [{}, {'block_size': 2048}, {'field_layout': True}]
+        for file_access in FileAccess.__members__.values():
+            for layout in layouts:
+                with tempfile.TemporaryDirectory() as d:
+                    store = PickleLz4FullStore(d, lambda: iter(docs), GenericDoc, 'doc_id', ['doc_id'], options=DocstoreOptions(file_access=file_access), **layout)
+                    store.build()
+                    store.lookup.close() # so that the lazily-loaded bin and indices are loaded by the threads
+                    errors = []
+                    barrier = threading.Barrier(8)
+                    def reader(seed):
+                        try:
+                            rng = np.random.RandomState(seed)
+                            barrier.wait()
+                            for _ in range(30):
+                                idxs = rng.randint(0, len(docs), size=20)
+                                doc_ids = [docs[i].doc_id for i in idxs]
+                                self.assertEqual(store.get_many(doc_ids), {docs[i].doc_id: docs[i] for i in idxs})
+                                self.assertEqual(store.get(docs[idxs[0]].doc_id), docs[idxs[0]])
+                                start = int(idxs[0])
+                                self.assertEqual(list(store.docs_iter()[start:start+10]), docs[start:start+10])
+                        except Exception as e:
+                            errors.append(e)
+                    threads = [threading.Thread(target=reader, args=(seed,)) for seed in range(8)]
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                    self.assertEqual(errors, [], (file_access, layout))
+                    store.lookup.close()
 
 
 if __name__ == '__main__':
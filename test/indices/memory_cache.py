@@ -0,0 +1,94 @@
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from ir_datasets.indices import Docstore, MemoryCacheDocstore, DocstoreOptions, memory_cache
+from ir_datasets.formats import GenericDoc
+from ir_datasets.datasets.base import Dataset
+
+
+class CountingDocstore(Docstore):
+    def __init__(self, count):
+        super().__init__(GenericDoc)
+        self.docs = {f'id{i}': GenericDoc(f'id{i}', f'text {i}') for i in range(count)}
+        self.requested = []
+
+    def get_many_iter(self, doc_ids):
+        for doc_id in doc_ids:
+            self.requested.append(doc_id)
+            if doc_id in self.docs:
+                yield self.docs[doc_id]
+
+
+class TestMemoryCacheDocstore(unittest.TestCase):
+    def test_lru(self):
+        inner = CountingDocstore(10)
+        store = MemoryCacheDocstore(inner, max_entries=3)
+        self.assertEqual(store.get('id1'), GenericDoc('id1', 'text 1'))
+        self.assertEqual(store.get_many(['id1', 'id2', 'missing']), {'id1': inner.docs['id1'], 'id2': inner.docs['id2']})
+        self.assertEqual(store.get_many(['id1', 'id2'], field='text'), {'id1': 'text 1', 'id2': 'text 2'})
+        self.assertEqual(sorted(inner.requested), ['id1', 'id2', 'missing'])
+        self.assertEqual(store.cache_stats(), {'hits': 3, 'misses': 3, 'entries': 2, 'bytes': 0})
+        store.get_many(['id3', 'id4']) # evicts id1 (least recently used)
+        inner.requested.clear()
+        store.get_many(['id1', 'id2', 'id3', 'id4'])
+        self.assertEqual(inner.requested, ['id1'])
+
+    def test_clock(self):
+        inner = CountingDocstore(10)
+        store = MemoryCacheDocstore(inner, max_entries=3, policy='clock')
+        store.get_many(['id1'])
+        store.get_many(['id2'])
+        store.get_many(['id3'])
+        store.get('id1') # id1 gets a second chance
+        store.get('id4') # evicts id2
+        inner.requested.clear()
+        store.get_many(['id1', 'id3', 'id4'])
+        self.assertEqual(inner.requested, [])
+        store.get('id2')
+        self.assertEqual(inner.requested, ['id2'])
+
+    def test_max_bytes(self):
+        inner = CountingDocstore(100)
+        store = MemoryCacheDocstore(inner, max_bytes=2000)
+        store.get_many([f'id{i}' for i in range(100)])
+        stats = store.cache_stats()
+        self.assertLessEqual(stats['bytes'], 2000)
+        self.assertLess(stats['entries'], 100)
+        self.assertGreater(stats['entries'], 0)
+
+    def test_threads(self):
+        inner = CountingDocstore(1000)
+        store = MemoryCacheDocstore(inner, max_entries=100)
+        def run(i):
+            doc_ids = [f'id{(i * 7 + j) % 1000}' for j in range(50)]
+            return store.get_many(doc_ids) == {doc_id: inner.docs[doc_id] for doc_id in doc_ids}
+        with ThreadPoolExecutor(8) as pool:
+            self.assertTrue(all(pool.map(run, range(500))))
+        stats = store.cache_stats()
+        self.assertEqual(stats['hits'] + stats['misses'], 500 * 50)
+        self.assertLessEqual(stats['entries'], 100)
+
+    def test_options(self):
+        inner = CountingDocstore(10)
+        self.assertIs(memory_cache(inner), inner)
+        self.assertIsInstance(memory_cache(inner, DocstoreOptions(memory_cache_entries=10)), MemoryCacheDocstore)
+
+        class Docs:
+            def docs_store(self, field='doc_id', options=None):
+                return inner
+        dataset = Dataset(Docs())
+        self.assertIs(dataset.docs_store(), inner)
+        self.assertIsInstance(dataset.docs_store(options=DocstoreOptions(memory_cache_entries=10)), MemoryCacheDocstore)
+        self.assertIsInstance(dataset.docs_store('doc_id', DocstoreOptions(memory_cache_bytes=1000)), MemoryCacheDocstore)
+        # the same cache is returned for the same options
+        options = DocstoreOptions(memory_cache_entries=10)
+        store = dataset.docs_store(options=options)
+        self.assertIs(dataset.docs_store(options=DocstoreOptions(memory_cache_entries=10)), store)
+        self.assertIs(Dataset(dataset).docs_store('doc_id', options), store)
+        self.assertIsNot(dataset.docs_store(options=DocstoreOptions(memory_cache_entries=20)), store)
+        store.get('id1')
+        dataset.docs_store(options=options).get('id1')
+        self.assertEqual(store.cache_stats()['hits'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
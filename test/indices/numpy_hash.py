@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from ir_datasets.indices import NumpyHashIndex, NumpySortedIndex, PickleLz4FullStore, FileAccess, DocstoreOptions
+from ir_datasets.formats import GenericDoc
+
+
+class TestNumpyHashIndex(unittest.TestCase):
+    def test_numpy_hash_index(self):
+        for file_access in FileAccess.__members__.values():
+            with tempfile.TemporaryDirectory() as d:
+                idx = NumpyHashIndex(os.path.join(d, 'idx'), file_access=file_access)
+                self.assertEqual(len(idx), 0)
+                self.assertEqual(tuple(iter(idx)), tuple())
+                self.assertEqual(idx['key', 'key1231', 'key', 'missing'], [-1, -1, -1, -1])
+
+                idx.add('k', 1)
+                idx.add('key', 3)
+                idx.add('key4', 2)
+                idx.add('key1231', 4)
+                idx.add('k', 3)
+                idx.commit()
+                self.assertEqual(len(idx), 4)
+                self.assertEqual(idx['key', 'key1231', 'key', 'missing', ''], [3, 4, 3, -1, -1])
+                idx.add('key', 5)
+                idx.add('key4', 1)
+                idx.add('key5', 8)
+                idx.add('élève-with-a-much-longer-key', 9)
+                idx.commit()
+                self.assertEqual(len(idx), 6)
+                self.assertEqual(idx['key', 'key1231', 'key', 'key4', 'élève-with-a-much-longer-key'], [5, 4, 5, 1, 9])
+                idx.close()
+                self.assertEqual(idx['key4'], [1])
+                self.assertEqual(sorted(iter(idx)), ['k', 'key', 'key1231', 'key4', 'key5', 'élève-with-a-much-longer-key'])
+                idx.close()
+
+    def test_matches_sorted_index(self):
+        with tempfile.TemporaryDirectory() as d:
+            hash_idx = NumpyHashIndex(os.path.join(d, 'hash'))
+            sorted_idx = NumpySortedIndex(os.path.join(d, 'sorted'))
+            for i in range(10000):
+                hash_idx.add(f'doc{i * 7}', i)
+                sorted_idx.add(f'doc{i * 7}', i)
+            hash_idx.commit()
+            sorted_idx.commit()
+            keys = [f'doc{i}' for i in range(0, 70000, 3)]
+            self.assertEqual(hash_idx[keys], sorted_idx[keys])
+            hash_idx.close()
+            sorted_idx.close()
+
+    def test_docstore(self):
+        docs = [GenericDoc(f'id{i}', f'text {i}') for i in range(500)]
+        with tempfile.TemporaryDirectory() as d:
+            store = PickleLz4FullStore(d, lambda: iter(docs), GenericDoc, 'doc_id', ['doc_id'], index_cls=NumpyHashIndex)
+            self.assertEqual(store.get_many(['id4', 'id499', 'missing']), {'id4': docs[4], 'id499': docs[499]})
+            self.assertTrue(os.path.exists(os.path.join(d, 'idx.doc_id.htbl')))
+            self.assertFalse(os.path.exists(os.path.join(d, 'idx.doc_id.key')))
+            store.lookup.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
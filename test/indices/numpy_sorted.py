@@ -1,3 +1,4 @@
+import os
 import tempfile
 import unittest
 import numpy as np
@@ -47,6 +48,28 @@ class TestNumpySortedIndex(unittest.TestCase):
             self.assertEqual(tuple(iter(idx)), ('k', 'key', 'key1231', 'key4', 'key5'))
 
             idx.close()
+    def test_deltas(self):
+        with tempfile.TemporaryDirectory() as d:
+            idx = NumpySortedIndex(f'{d}/idx', max_deltas=2)
+            reader = NumpySortedIndex(f'{d}/idx')
+            expected = {}
+            for i in range(6):
+                for j in range(i, 50, 3):
+                    idx.add(f'key{j}' + 'x' * i, i * 100 + j)
+                    expected[f'key{j}' + 'x' * i] = i * 100 + j
+                idx.add('key0', i)
+                expected['key0'] = i
+                idx.commit()
+                keys = sorted(expected) + ['missing', 'key0xxxxxxxxx']
+                self.assertEqual(idx[keys], [expected.get(k, -1) for k in keys])
+                self.assertEqual(reader[keys], [expected.get(k, -1) for k in keys])
+                self.assertEqual(len(idx), len(expected))
+                self.assertEqual(list(idx), sorted(expected))
+                reader.close()
+            self.assertTrue(os.path.exists(f'{d}/idx.deltas')) # 2 deltas after 6 commits: base, d0, d1, base, d0, d1
+            idx.clear()
+            self.assertEqual(os.listdir(d), [])
+            reader.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,134 @@
+import os
+import gzip
+import json
+import pickle
+import hashlib
+import random
+import tempfile
+import unittest
+from pathlib import Path
+import ir_datasets
+from ir_datasets.indices import ZlibCheckpointTable, DocstoreOptions
+from ir_datasets.util import LocalDownload
+from ir_datasets.datasets.c4 import C4Docs
+from ir_datasets.commands import build_c4_checkpoints
+from ir_datasets.commands.build_c4_checkpoints import build_checkpoint as build_c4_checkpoint
+
+
+def write_c4(d, file_count, doc_count, rng):
+    # writes c4-style source files, their checkpoints, and a sources file; returns the docs
+    source_dir, chk_dir = Path(d)/'en.noclean', Path(d)/'checkpoints'
+    source_dir.mkdir()
+    chk_dir.mkdir()
+    sources, docs = [], {}
+    for i in range(file_count):
+        name = f'c4-train.{i:05d}-of-07168.json.gz'
+        with gzip.open(source_dir/name, 'wt') as f:
+            for j in range(doc_count):
+                doc = {'text': ' '.join(f'w{rng.randrange(10000)}' for _ in range(rng.randrange(5, 50))), 'url': f'http://example.com/{i}/{j}', 'timestamp': '2019-04-20T00:00:00Z'}
+                f.write(json.dumps(doc) + '\n')
+                docs[f'en.noclean.{name[:-len(".json.gz")]}.{j}'] = doc
+        build_c4_checkpoint(source_dir/name, chk_dir/f'{name}.chk.pkl.lz4')
+        sources.append({'name': f'en.noclean.{name}', 'url': f'https://example.com/{name}', 'expected_md5': '', 'size_hint': os.path.getsize(source_dir/name), 'checkpoint_freq': 1500, 'doc_count': doc_count})
+    with open(Path(d)/'sources.json', 'wt') as f:
+        json.dump(sources, f)
+    return C4Docs(LocalDownload(Path(d)/'sources.json'), LocalDownload(str(chk_dir)), d), docs
+
+
+class TestZlibCheckpointTable(unittest.TestCase):
+    def test_checkpoint_table(self):
+        with tempfile.TemporaryDirectory() as d:
+            c4_docs, _ = write_c4(d, 1, 5000, random.Random(42))
+            chk_path = os.path.join(d, 'checkpoints', 'c4-train.00000-of-07168.json.gz.chk.pkl.lz4')
+            with ir_datasets.lazy_libs.lz4_frame().frame.open(chk_path) as f:
+                checkpoints = pickle.load(f)
+            table = ZlibCheckpointTable(f'{chk_path}.table', chk_path)
+            self.assertFalse(table.built())
+            table.build(checkpoints)
+            table = ZlibCheckpointTable(f'{chk_path}.table', chk_path)
+            self.assertTrue(table.built())
+            self.assertEqual(len(table), len(checkpoints))
+            for idx in [len(checkpoints) - 1, 0, 1]:
+                self.assertEqual(table[idx], checkpoints[idx])
+            # re-built when the checkpoints change
+            os.utime(chk_path, ns=(0, 0))
+            self.assertFalse(ZlibCheckpointTable(f'{chk_path}.table', chk_path).built())
+
+    def test_c4_docstore(self):
+        rng = random.Random(42)
+        with tempfile.TemporaryDirectory() as d:
+            c4_docs, docs = write_c4(d, 4, 4000, rng)
+            lookup = rng.sample(list(docs), 200) + ['en.noclean.c4-train.00001-of-07168.4000', 'en.noclean.c4-train.00009-of-07168.1', 'missing']
+            lookup += lookup[:5] # duplicates are returned once
+            expected = [d for d in dict.fromkeys(lookup) if d in docs]
+            for options in [DocstoreOptions(), DocstoreOptions(lookup_workers=3), DocstoreOptions(lookup_workers=3, lookup_preserve_order=True)]:
+                store = c4_docs.docs_store(options=options)
+                result = list(store.get_many_iter(lookup))
+                if options.lookup_preserve_order:
+                    self.assertEqual([doc.doc_id for doc in result], expected)
+                else:
+                    self.assertEqual(sorted(doc.doc_id for doc in result), sorted(expected))
+                for doc in result:
+                    self.assertEqual((doc.text, doc.url), (docs[doc.doc_id]['text'], docs[doc.doc_id]['url']))
+                self.assertLessEqual(len(store._handles), 4)
+                # again, with the files already open (including seeking backwards)
+                self.assertEqual(store.get(expected[0]).text, docs[expected[0]]['text'])
+                self.assertEqual(sorted(doc.doc_id for doc in store.get_many_iter(lookup[::-1])), sorted(expected))
+                store.clear_cache()
+            store = c4_docs.docs_store()
+            store.handle_pool_size = 2
+            list(store.get_many_iter(lookup))
+            self.assertEqual(len(store._handles), 2)
+            self.assertTrue(os.path.exists(os.path.join(d, 'checkpoints', 'c4-train.00000-of-07168.json.gz.chk.pkl.lz4.table')))
+
+    def test_build_c4_checkpoints(self):
+        with tempfile.TemporaryDirectory() as d:
+            c4_docs, docs = write_c4(d, 3, 3000, random.Random(42))
+            out_dir, sources_file = os.path.join(d, 'out'), os.path.join(d, 'c4_sources.json')
+            build_c4_checkpoints.main([os.path.join(d, 'en.noclean'), out_dir, '--sources_file', sources_file, '--processes', '2'])
+            with gzip.open(f'{sources_file}.gz', 'rt') as f:
+                sources = json.load(f)
+            self.assertEqual([s['name'] for s in sources], [f'en.noclean.c4-train.{i:05d}-of-07168.json.gz' for i in range(3)])
+            for source in sources:
+                path = os.path.join(d, 'en.noclean', source['name'][len('en.noclean.'):])
+                with open(path, 'rb') as f:
+                    self.assertEqual(source['expected_md5'], hashlib.md5(f.read()).hexdigest())
+                self.assertEqual(source['size_hint'], os.path.getsize(path))
+                self.assertEqual(source['doc_count'], 3000)
+                with ir_datasets.lazy_libs.lz4_frame().frame.open(os.path.join(d, 'checkpoints', f'{os.path.basename(path)}.chk.pkl.lz4')) as f:
+                    expected_checkpoints = pickle.load(f)
+                with ir_datasets.lazy_libs.lz4_frame().frame.open(os.path.join(out_dir, f'{os.path.basename(path)}.chk.pkl.lz4')) as f:
+                    self.assertEqual(pickle.load(f), expected_checkpoints)
+            # only the missing file is re-built, and its source is merged with the others
+            os.remove(os.path.join(out_dir, 'c4-train.00001-of-07168.json.gz.chk.pkl.lz4'))
+            build_c4_checkpoints.main([os.path.join(d, 'en.noclean'), out_dir, '--sources_file', sources_file])
+            with gzip.open(f'{sources_file}.gz', 'rt') as f:
+                self.assertEqual(json.load(f), sources)
+
+    def test_build_c4_checkpoints_errors(self):
+        with tempfile.TemporaryDirectory() as d:
+            c4_docs, docs = write_c4(d, 3, 1000, random.Random(42))
+            out_dir, sources_file = os.path.join(d, 'out'), os.path.join(d, 'c4_sources.json')
+            # a failed file does not stop the others, but the command fails at the end
+            with open(os.path.join(d, 'en.noclean', 'c4-train.00001-of-07168.json.gz'), 'wb') as f:
+                f.write(b'not gzip')
+            with self.assertRaises(SystemExit) as cm:
+                build_c4_checkpoints.main([os.path.join(d, 'en.noclean'), out_dir, '--sources_file', sources_file, '--processes', '2'])
+            self.assertEqual(cm.exception.code, 1)
+            self.assertEqual(sorted(os.listdir(out_dir)), ['c4-train.00000-of-07168.json.gz.chk.pkl.lz4', 'c4-train.00002-of-07168.json.gz.chk.pkl.lz4'])
+            with gzip.open(f'{sources_file}.gz', 'rt') as f:
+                self.assertEqual([s['name'] for s in json.load(f)], ['en.noclean.c4-train.00000-of-07168.json.gz', 'en.noclean.c4-train.00002-of-07168.json.gz'])
+
+            # --skip_last: no checkpoints for the last file, but it's still in the sources
+            os.remove(os.path.join(d, 'en.noclean', 'c4-train.00001-of-07168.json.gz'))
+            out_dir, sources_file = os.path.join(d, 'out2'), os.path.join(d, 'c4_sources2.json')
+            build_c4_checkpoints.main([os.path.join(d, 'en.noclean'), out_dir, '--sources_file', sources_file, '--skip_last'])
+            self.assertEqual(os.listdir(out_dir), ['c4-train.00000-of-07168.json.gz.chk.pkl.lz4'])
+            with gzip.open(f'{sources_file}.gz', 'rt') as f:
+                sources = json.load(f)
+            self.assertEqual([s['name'] for s in sources], ['en.noclean.c4-train.00000-of-07168.json.gz', 'en.noclean.c4-train.00002-of-07168.json.gz'])
+            self.assertEqual(sources[1]['doc_count'], 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
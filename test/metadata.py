@@ -4,7 +4,7 @@ import ir_datasets
 
 class TestMetadata(unittest.TestCase):
     def test_all_metadata_available(self):
-        for dsid in ir_datasets.registry._registered:
+        for dsid in list(ir_datasets.registry):
             self._test_ds(dsid)
 
     # def test_clirmatrix_metadata_available(self):
@@ -20,7 +20,7 @@ def template_instance(Cls):
 
 class TestMetadata(unittest.TestCase):
     def test_all_defualttext(self):
-        for dsid in ir_datasets.registry._registered:
+        for dsid in list(ir_datasets.registry):
             self._test_defaulttet(dsid)
 
     def _test_defaulttet(self, dsid):
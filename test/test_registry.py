@@ -0,0 +1,43 @@
+import sys
+import json
+import unittest
+import subprocess
+import ir_datasets
+
+
+def _run(script):
+    # runs script in a fresh process, so that no dataset modules are imported yet
+    return json.loads(subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True).stdout)
+
+
+class TestRegistry(unittest.TestCase):
+    def test_lazy_load(self):
+        modules = _run('''
+import sys, json
+import ir_datasets
+before = sorted(m for m in sys.modules if m.startswith('ir_datasets.datasets.'))
+ir_datasets.load('vaswani')
+after = sorted(m for m in sys.modules if m.startswith('ir_datasets.datasets.'))
+print(json.dumps([before, after]))
+''')
+        self.assertEqual(modules, [['ir_datasets.datasets.base'], ['ir_datasets.datasets.base', 'ir_datasets.datasets.vaswani']])
+
+    def test_manifest_up_to_date(self):
+        manifest = _run('''
+import json
+import ir_datasets
+print(json.dumps(ir_datasets.datasets.build_manifest()))
+''')
+        with open('ir_datasets/etc/registry.json') as f:
+            self.assertEqual(manifest, json.load(f), 'etc/registry.json is out of date; run `ir_datasets generate_registry`')
+
+    def test_lookups(self):
+        self.assertEqual(ir_datasets.load('touche-image/2022-06-13/touche-2022-task-3').queries_cls().__name__, 'ToucheQuery')
+        with self.assertRaises(KeyError):
+            ir_datasets.load('not-a-dataset')
+        self.assertIn('vaswani', set(ir_datasets.registry))
+        self.assertIs(ir_datasets.datasets.vaswani, sys.modules['ir_datasets.datasets.vaswani'])
+
+
+if __name__ == '__main__':
+    unittest.main()